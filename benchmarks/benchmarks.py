@@ -0,0 +1,226 @@
+"""
+Benchmarks of the plotting pipeline, run with asv from the repository root:
+
+    asv run            # benchmark the last commit of the main branch
+    asv continuous main HEAD    # compare the current work against main
+
+Methods named time_* measure time and peakmem_* the peak memory of the process, timeraw_* time the code they
+return in a new interpreter.
+"""
+
+import os
+import tempfile
+from typing import ClassVar
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+import pyranges as pr
+from pyranges.core.names import CHROM_COL, END_COL, START_COL
+
+import pyranges_plot as prp
+from pyranges_plot.core import cumdelting, get_options
+from pyranges_plot.data_preparation import (
+    get_chromosome_metadata,
+    get_genes_metadata,
+    make_subset,
+    subdf_assigncolor,
+)
+from pyranges_plot.introns_off import introns_resize
+from pyranges_plot.names import ORIEND_COL, ORISTART_COL, PR_INDEX_COL, SHRTHRES_COL
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+ID_COL = ["transcript_id"]
+
+# drawing every transcript is only feasible for small data
+RENDER_SIZES = [1_000, 10_000]
+
+# first plot after importing, including the engine import
+PLOT_CODE = """
+import os, tempfile
+import pyranges as pr
+import pyranges_plot as prp
+df = pr.PyRanges({{"Chromosome": ["1"], "Start": [10], "End": [20], "transcript_id": ["t0"]}})
+prp.set_engine("{engine}")
+with tempfile.TemporaryDirectory() as d:
+    prp.plot(df, id_col="transcript_id", to_file=os.path.join(d, "plot.png"))
+"""
+
+
+def synthetic_annotation(n, seed=0):
+    """Transcripts of 1 to 8 exons over 3 chromosomes, n intervals in total."""
+
+    rng = np.random.default_rng(seed)
+
+    # exons per transcript adding up to n
+    n_exons = rng.integers(1, 9, n)
+    n_exons = n_exons[: np.searchsorted(np.cumsum(n_exons), n) + 1]
+    n_exons[-1] -= n_exons.sum() - n
+    n_exons = n_exons[n_exons > 0]
+    n_tr = len(n_exons)
+    tr_ix = np.repeat(np.arange(n_tr), n_exons)
+
+    # exons and introns lengths, placed from the transcript start
+    exon_len = rng.integers(50, 500, n)
+    step = exon_len + rng.integers(100, 5000, n)
+    offset = np.cumsum(step) - step
+    offset -= np.repeat(offset[np.cumsum(n_exons) - n_exons], n_exons)
+    tr_start = rng.integers(0, max(n, 1000) * 300, n_tr)
+    starts = tr_start[tr_ix] + offset
+
+    return pr.PyRanges(
+        {
+            CHROM_COL: rng.choice(["1", "2", "3"], n_tr)[tr_ix],
+            START_COL: starts,
+            END_COL: starts + exon_len,
+            "Strand": rng.choice(["+", "-"], n_tr)[tr_ix],
+            "Feature": "exon",
+            "transcript_id": np.char.add("t", np.arange(n_tr).astype(str))[tr_ix],
+        }
+    )
+
+
+def layout_input(df, packed):
+    """Data with every transcript as given by the first layout steps of prepare_layout."""
+
+    subdf, _ = make_subset(df, ID_COL, df["transcript_id"].nunique())
+    subdf = subdf.assign(
+        **{PR_INDEX_COL: 0, "__id_col_2count__": subdf["transcript_id"]}
+    )
+    subdf = subdf_assigncolor(
+        subdf, get_options("colormap"), ID_COL, get_options("exon_border")
+    )
+    genesmd_df = get_genes_metadata(
+        subdf,
+        ID_COL,
+        ID_COL,
+        packed,
+        get_options("exon_height"),
+        get_options("v_spacer"),
+    )
+
+    return subdf, genesmd_df
+
+
+class DataPreparation:
+    """Steps computing the layout of every transcript."""
+
+    params: ClassVar[list] = [SIZES, [True, False]]
+    param_names: ClassVar[list] = ["intervals", "packed"]
+    timeout = 300
+
+    def setup(self, n, packed):
+        self.df = synthetic_annotation(n)
+        self.subdf, self.genesmd_df = layout_input(self.df, packed)
+
+        # input of introns_resize
+        self.shrink_df = self.subdf.assign(
+            **{
+                ORISTART_COL: self.subdf[START_COL],
+                ORIEND_COL: self.subdf[END_COL],
+                SHRTHRES_COL: get_options("shrink_threshold"),
+            }
+        )
+        self.ts_data = {}
+        introns_resize(self.shrink_df, self.ts_data)
+
+    def time_make_subset(self, n, packed):
+        make_subset(self.df, ID_COL, 25)
+
+    def time_get_genes_metadata(self, n, packed):
+        get_genes_metadata(
+            self.subdf,
+            ID_COL,
+            ID_COL,
+            packed,
+            get_options("exon_height"),
+            get_options("v_spacer"),
+        )
+
+    def time_get_chromosome_metadata(self, n, packed):
+        get_chromosome_metadata(
+            self.subdf,
+            None,
+            self.genesmd_df,
+            packed,
+            get_options("v_spacer"),
+            get_options("exon_height"),
+        )
+
+    def time_introns_resize(self, n, packed):
+        introns_resize(self.shrink_df, {})
+
+    def time_cumdelting(self, n, packed):
+        for chrom in ["1", "2", "3"]:
+            cumdelting(self.df[START_COL].to_numpy(), self.ts_data, chrom)
+
+    def peakmem_prepare_layout(self, n, packed):
+        prp.prepare_layout(
+            self.df, id_col="transcript_id", packed=packed, max_shown=n, shrink=True
+        )
+
+
+class PlotToFile:
+    """Plots of the first genes written to file, from the data to the image."""
+
+    params: ClassVar[list] = [SIZES, ["plt", "ply"]]
+    param_names: ClassVar[list] = ["intervals", "engine"]
+    timeout = 300
+
+    def setup(self, n, engine):
+        self.df = synthetic_annotation(n)
+        self.dir = tempfile.TemporaryDirectory()
+        self.to_file = os.path.join(self.dir.name, "plot.png")
+        prp.set_engine(engine)
+        prp.set_warnings(False)
+
+    def teardown(self, n, engine):
+        self.dir.cleanup()
+
+    def time_plot(self, n, engine):
+        prp.plot(self.df, id_col="transcript_id", to_file=self.to_file)
+
+    def peakmem_plot(self, n, engine):
+        prp.plot(self.df, id_col="transcript_id", to_file=self.to_file)
+
+
+class RenderToFile:
+    """Drawing of every transcript of a prepared layout, written to file."""
+
+    params: ClassVar[list] = [RENDER_SIZES, ["plt", "ply"], [True, False]]
+    param_names: ClassVar[list] = ["intervals", "engine", "shrink"]
+    timeout = 600
+
+    def setup(self, n, engine, shrink):
+        df = synthetic_annotation(n)
+        self.plan = prp.prepare_layout(
+            df, id_col="transcript_id", max_shown=n, color_col="Strand", shrink=shrink
+        )
+        self.dir = tempfile.TemporaryDirectory()
+        self.to_file = os.path.join(self.dir.name, "plot.png")
+        prp.set_engine(engine)
+        prp.set_warnings(False)
+
+    def teardown(self, n, engine, shrink):
+        self.dir.cleanup()
+
+    def time_render(self, n, engine, shrink):
+        prp.plot(self.plan, to_file=self.to_file)
+
+    def peakmem_render(self, n, engine, shrink):
+        prp.plot(self.plan, to_file=self.to_file)
+
+
+class Import:
+    """Import of the package in a new interpreter, engines are loaded on first plot."""
+
+    def timeraw_import(self):
+        return "import pyranges_plot"
+
+    def timeraw_import_plot_plt(self):
+        return PLOT_CODE.format(engine="plt")
+
+    def timeraw_import_plot_ply(self):
+        return PLOT_CODE.format(engine="ply")
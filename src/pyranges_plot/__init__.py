@@ -11,5 +11,13 @@ from .core import (
     set_options,  # noqa: F401
     reset_options,  # noqa: F401
 )
-from .plot_main import plot  # noqa: F401
+from .data_preparation import (
+    get_layout_cache_info,  # noqa: F401
+    clear_layout_cache,  # noqa: F401
+    clear_region_index,  # noqa: F401
+)
+from .plot_main import plot, prepare_layout, LayoutPlan  # noqa: F401
+from .plot_many import plot_many  # noqa: F401
+from .plotly_base.export import get_export_times  # noqa: F401
+from .read_files import read_annotation  # noqa: F401
 from .pr_register_plot import register_plot  # noqa: F401
@@ -1,7 +1,8 @@
+import numpy as np
 import pandas as pd
-from pyranges.core.names import END_COL
+from pyranges.core.names import START_COL, END_COL
 
-from .names import CUM_DELTA_COL
+from .names import CUM_DELTA_COL, ADJSTART_COL, ADJEND_COL
 from .plot_features import (
     plot_features_dict,
     plot_features_dict_in_use,
@@ -388,7 +389,19 @@ def print_options(return_keys=False):
             )
         ].copy()
         other_feat_df = feat_df[
-            feat_df.index.isin(["shrink_threshold", "plotly_port"])
+            feat_df.index.isin(
+                [
+                    "shrink_threshold",
+                    "plotly_port",
+                    "batched",
+                    "webgl",
+                    "webgl_threshold",
+                    "layout_cache_size",
+                    "browse",
+                    "detail",
+                    "detail_threshold",
+                ]
+            )
         ].copy()
 
         # Create table rows
@@ -421,17 +434,52 @@ def print_options(return_keys=False):
         return set(plot_features_dict_in_use.keys())
 
 
-def cumdelting(num_l, ts_data, chrom):
-    """Update a list of coordinates according to cumdelta."""
+def cumdelting(num_l, ts_data, chrom, inverse=False):
+    """Update an array of coordinates according to cumdelta.
 
-    for i in range(len(num_l)):
-        cdel = 0
-        # get proper cumdelta
-        for ix, row in ts_data[chrom].iterrows():
-            if row[END_COL] <= num_l[i]:
-                cdel = row[CUM_DELTA_COL]
-            else:
-                break
-        num_l[i] -= cdel
+    Original coordinates are mapped to the shrinked ones, or shrinked coordinates are
+    mapped back to the original ones if inverse is True.
+    """
+
+    coords = np.asarray(num_l)
+    ts_chrom = ts_data[chrom]
+
+    # nothing to shrink
+    if ts_chrom.empty:
+        return coords.copy()
+
+    # ends of the shrinked regions in the space of the given coordinates
+    ends = ts_chrom[ADJEND_COL if inverse else END_COL].to_numpy()
+    cdel = np.concatenate(([0], ts_chrom[CUM_DELTA_COL].to_numpy()))
+
+    # get cumdelta of the last shrinked region ending before each coordinate
+    cdel = cdel[np.searchsorted(ends, coords, side="right")]
+
+    if inverse:
+        return coords + cdel
+    else:
+        return coords - cdel
+
+
+def cumdelting_interp(num_l, ts_data, chrom, inverse=False):
+    """Map coordinates like cumdelting, interpolating the ones within shrinked regions."""
+
+    coords = np.asarray(num_l, dtype=float)
+    ts_chrom = ts_data[chrom]
+
+    # nothing to shrink
+    if ts_chrom.empty:
+        return coords.copy()
+
+    # shrinked regions limits in original and shrinked coordinates
+    ori = ts_chrom[[START_COL, END_COL]].to_numpy().ravel()
+    adj = ts_chrom[[ADJSTART_COL, ADJEND_COL]].to_numpy().ravel()
+    if inverse:
+        ori, adj = adj, ori
+
+    # coordinates out of the regions are shifted, the ones within are interpolated
+    mapped = np.interp(coords, ori, adj)
+    mapped[coords < ori[0]] = coords[coords < ori[0]]
+    mapped[coords > ori[-1]] = coords[coords > ori[-1]] + adj[-1] - ori[-1]
 
-    return num_l
+    return mapped
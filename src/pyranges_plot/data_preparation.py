@@ -1,9 +1,12 @@
+import bisect
+import hashlib
+import heapq
+import weakref
+from collections import OrderedDict
 import numpy as np
-from intervaltree import IntervalTree
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
+import pandas as pd
+import sys
 import pyranges as pr
-import plotly.colors as pc
 from pyranges.core.names import CHROM_COL, START_COL, END_COL
 
 from .names import (
@@ -13,9 +16,11 @@ from .names import (
     COLOR_INFO,
     COLOR_TAG_COL,
     BORDER_COLOR_COL,
+    ORISTART_COL,
+    ORIEND_COL,
+    EXON_IX_COL,
 )
 from .core import cumdelting, get_engine, get_warnings
-from .matplotlib_base.core import plt_popup_warning
 
 
 ############ COMPUTE INTRONS OFF THRESHOLD
@@ -44,22 +49,285 @@ def compute_tpad(df, chrmd_df_grouped):
 
 ############ SUBSET
 def make_subset(df, id_col, max_shown):
-    """Reduce the number of genes to work with."""
+    """Reduce the number of genes to work with, without copying the not selected rows."""
 
-    # create a column indexing all the genes in the df
-    df["gene_index"] = df.groupby(id_col, group_keys=False).ngroup()
-    tot_ngenes = max(df["gene_index"])
+    if isinstance(id_col, str):
+        id_col = [id_col]
 
-    # select maximum number of genes
-    if max(df.gene_index) + 1 <= max_shown:
-        subdf = df
+    # index the genes in order of appearance, -1 for missing id
+    gene_index, _ = pd.factorize(df[id_col[0]])
+    for col in id_col[1:]:
+        codes, uniques = pd.factorize(df[col])
+        gene_index = np.where(
+            (gene_index < 0) | (codes < 0), -1, gene_index * len(uniques) + codes
+        )
+        known = gene_index >= 0
+        gene_index[known] = np.unique(gene_index[known], return_inverse=True)[1]
+    ngenes = gene_index.max() + 1
+    tot_ngenes = ngenes - 1
+
+    if ngenes <= max_shown:
+        return df, tot_ngenes
+
+    # select the genes with smallest ids, as sorted by groupby
+    known = np.flatnonzero(gene_index >= 0)
+    first_row = np.empty(ngenes, dtype=int)
+    first_row[gene_index[known[::-1]]] = known[::-1]
+    id_keys = [
+        (
+            df[col].cat.codes
+            if isinstance(df[col].dtype, pd.CategoricalDtype)
+            else df[col]
+        ).to_numpy()[first_row]
+        for col in id_col
+    ]
+    id_keys = list(zip(*id_keys)) if len(id_keys) > 1 else id_keys[0].tolist()
+    selected = np.zeros(ngenes + 1, dtype=bool)
+    selected[-1] = True  # rows with missing id are kept
+    selected[heapq.nsmallest(max_shown, range(ngenes), key=id_keys.__getitem__)] = True
+    subdf = df[selected[gene_index]]
+
+    return subdf, tot_ngenes
+
+
+############ REGION
+region_indexes = {}  # id of data: (weak references to data and coordinate arrays, index)
+
+
+def parse_region(region):
+    """Convert the region to a 0-based dict {chrom: (start, end)}, None meaning unbounded."""
+
+    if isinstance(region, dict):
+        return {
+            str(chrom): (None, None) if lims is None else tuple(lims)
+            for chrom, lims in region.items()
+        }
+
+    # 'chrom:start-end' or 'chrom' string, 1-based like in genome browsers
+    chrom, _, coords = region.partition(":")
+    if not coords:
+        return {chrom: (None, None)}
+    start, _, end = coords.replace(",", "").partition("-")
+    try:
+        return {chrom: (int(start) - 1, int(end))}
+    except ValueError:
+        raise ValueError(
+            "The region should be provided as 'chrom:start-end', 'chrom' or a dict {chrom: (start, end)}."
+        ) from None
+
+
+def coordinate_arrays(df):
+    """Provide the arrays holding the coordinate columns, which are new if the columns are set again."""
+
+    arrays = []
+    for col in [CHROM_COL, START_COL, END_COL]:
+        values = df[col].values
+        if isinstance(values, np.ndarray) and values.base is not None:
+            values = values.base  # array of the block holding the column
+        arrays.append(values)
+
+    return arrays
+
+
+def get_region_index(df):
+    """Sort the intervals by chromosome and start, reusing the index built for the same data."""
+
+    # the coordinate columns may have been set again since the index was built
+    arrays = coordinate_arrays(df)
+    cached = region_indexes.get(id(df))
+    if (
+        cached is not None
+        and cached[0][0]() is df
+        and all(ref() is array for ref, array in zip(cached[0][1:], arrays))
+    ):
+        return cached[1]
+
+    starts = df[START_COL].to_numpy()
+    ends = df[END_COL].to_numpy()
+
+    codes, chroms = pd.factorize(df[CHROM_COL])
+    order = np.lexsort((starts, codes))
+    sorted_codes = codes[order]
+    starts = starts[order]
+    ends = ends[order]
+
+    # running max of ends within every chromosome, offsetting chromosomes to not mix
+    span = int(ends.max()) - int(ends.min()) + 1 if len(ends) else 1
+    max_ends = np.maximum.accumulate(ends + sorted_codes * span) - sorted_codes * span
+
+    index = {
+        "codes": {str(chrom): code for code, chrom in enumerate(chroms)},
+        "bounds": np.searchsorted(sorted_codes, np.arange(len(chroms) + 1)),
+        "order": order,
+        "starts": starts,
+        "ends": ends,
+        "max_ends": max_ends,
+    }
+
+    if id(df) not in region_indexes:
+        weakref.finalize(df, region_indexes.pop, id(df), None)
+    refs = [weakref.ref(obj) for obj in [df] + arrays]
+    region_indexes[id(df)] = (refs, index)
+
+    return index
+
+
+def clear_region_index(df=None):
+    """
+    Removes the region index of the data, or of all data if None.
+
+    The index is rebuilt when the coordinate columns are set again, but not when their values are changed in
+    place, as with df.loc[0, "Start"] = 100. Clear it after such changes.
+
+    Examples
+    --------
+    >>> import pyranges_plot as prp
+
+    >>> p.loc[0, "Start"] = 100
+
+    >>> prp.clear_region_index(p)
+
+    """
+
+    if df is None:
+        region_indexes.clear()
     else:
-        subdf = df[df.gene_index < max_shown]
+        region_indexes.pop(id(df), None)
 
-    # remove the gene_index column from the original df
-    df.drop("gene_index", axis=1, inplace=True)
 
-    return subdf, tot_ngenes
+def region_subset(df, region_d):
+    """Keep the intervals overlapping the region, found by binary search."""
+
+    index = get_region_index(df)
+    rows = []
+    for chrom, (start, end) in region_d.items():
+        code = index["codes"].get(chrom)
+        if code is None:
+            continue
+        lo, hi = index["bounds"][code], index["bounds"][code + 1]
+
+        # intervals starting before the region end and not ending before its start
+        first, last = lo, hi
+        if start is not None:
+            first += np.searchsorted(index["max_ends"][lo:hi], start, side="right")
+        if end is not None:
+            last = lo + np.searchsorted(index["starts"][lo:hi], end, side="left")
+        ix = np.arange(first, last)
+        if start is not None:
+            ix = ix[index["ends"][ix] > start]
+        rows.append(index["order"][ix])
+
+    rows = np.sort(np.concatenate(rows)) if rows else np.array([], dtype=int)
+    return df.iloc[rows]
+
+
+############ LAYOUT CACHE
+layout_cache = OrderedDict()  # key: layout plan, least recently used first
+layout_cache_stats = {"hits": 0, "misses": 0}
+
+
+def frame_fingerprint(df):
+    """Provide a digest of all the values of the data, hashing numbers and categories by their bytes."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        repr((len(df), list(zip(df.columns, df.dtypes.astype(str))))).encode()
+    )
+
+    index = df.index
+    if isinstance(index, pd.RangeIndex):
+        digest.update(repr(index).encode())
+        values_l = [df[col] for col in df.columns]
+    else:
+        values_l = [index.to_series()] + [df[col] for col in df.columns]
+
+    for values in values_l:
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            digest.update(values.cat.codes.to_numpy().tobytes())
+            digest.update(
+                pd.util.hash_array(values.cat.categories.to_numpy()).tobytes()
+            )
+        elif isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufmM":
+            digest.update(np.ascontiguousarray(values.to_numpy()).tobytes())
+        else:
+            # text, like ids or names, joined at once if the separator is not in it
+            values = values.to_numpy()
+            try:
+                text = "\0".join(values)
+            except TypeError:  # not only strings
+                text = None
+            if text is not None and text.count("\0") == len(values) - 1:
+                digest.update(text.encode("utf-8", "surrogatepass"))
+            else:
+                digest.update(pd.util.hash_array(values, categorize=False).tobytes())
+
+    return digest.hexdigest()
+
+
+def layout_key(obj):
+    """Convert a layout parameter to a hashable key, data being given by its content."""
+
+    if isinstance(obj, pd.DataFrame):
+        return frame_fingerprint(obj)
+    if isinstance(obj, dict):
+        return tuple(sorted((repr(k), layout_key(v)) for k, v in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__,) + tuple(layout_key(v) for v in obj)
+    try:
+        hash(obj)
+        return obj
+    except TypeError:
+        return repr(obj)
+
+
+def get_cached_layout(key):
+    """Provide the layout stored for the key, if any, counting hits and misses."""
+
+    plan = layout_cache.get(key)
+    if plan is None:
+        layout_cache_stats["misses"] += 1
+    else:
+        layout_cache_stats["hits"] += 1
+        layout_cache.move_to_end(key)
+    return plan
+
+
+def cache_layout(key, plan, maxsize):
+    """Store the layout, removing the least recently used ones over maxsize."""
+
+    layout_cache[key] = plan
+    while len(layout_cache) > maxsize:
+        layout_cache.popitem(last=False)
+
+
+def get_layout_cache_info():
+    """
+    Shows the usage of the layout cache.
+
+    Returns
+    -------
+    dict
+        Number of hits and misses since the cache was cleared, and number of stored layouts.
+
+    Examples
+    --------
+    >>> import pyranges_plot as prp
+
+    >>> prp.set_options("layout_cache_size", 8)
+
+    >>> prp.get_layout_cache_info()
+    {'hits': 0, 'misses': 0, 'size': 0}
+
+    """
+
+    return {**layout_cache_stats, "size": len(layout_cache)}
+
+
+def clear_layout_cache():
+    """Removes the stored layouts and resets the hit and miss counters."""
+
+    layout_cache.clear()
+    layout_cache_stats.update(hits=0, misses=0)
 
 
 ############ GENESMD_DF
@@ -67,23 +335,52 @@ def make_subset(df, id_col, max_shown):
 
 ###packed
 def genesmd_packed(genesmd_df):
-    """xxx"""
-
-    # Initialize IntervalTree and used y-coordinates list
-    trees = [IntervalTree()]
+    """Assign packed y-coordinates to the genes of every (chrix, pr_ix) group.
+
+    Genes are placed in data order, each one in the lowest row where it overlaps
+    no gene placed before. The genes of a row are kept sorted by start, so the
+    only one it can overlap is found by binary search.
+    """
+
+    chrix = genesmd_df["chrix"].to_numpy()
+    pr_ix = genesmd_df[PR_INDEX_COL].to_numpy()
+    starts = genesmd_df[START_COL].to_numpy()
+    ends = genesmd_df[END_COL].to_numpy()
+
+    # genes by group, keeping data order within groups
+    order = np.lexsort((pr_ix, chrix))
+    group_change = np.ones(len(order), dtype=bool)
+    group_change[1:] = (np.diff(chrix[order]) != 0) | (np.diff(pr_ix[order]) != 0)
+
+    ycoord = np.zeros(len(genesmd_df), dtype=int)
+    rows = []  # (starts, ends) of the genes in every row, sorted by start
+
+    for i, new_group, start, end in zip(
+        order.tolist(),
+        group_change.tolist(),
+        starts[order].tolist(),
+        ends[order].tolist(),
+    ):
+        # new group starts with no rows
+        if new_group:
+            rows = []
+
+        # lowest row free for the gene, only the gene starting last before its end can overlap
+        for row, (row_starts, row_ends) in enumerate(rows):
+            j = bisect.bisect_left(row_starts, end) - 1
+            if j < 0 or row_ends[j] <= start:
+                break
+        else:
+            row = len(rows)
+            rows.append(([], []))
 
-    def find_tree(row):
-        for tree in trees:
-            if not tree.overlaps(row[START_COL], row[END_COL]):
-                return tree
-        trees.append(IntervalTree())
-        return trees[-1]
+        row_starts, row_ends = rows[row]
+        j = bisect.bisect_left(row_starts, end)
+        row_starts.insert(j, start)
+        row_ends.insert(j, end)
+        ycoord[i] = row
 
-    # Assign y-coordinates
-    for idx, row in genesmd_df.iterrows():
-        tree = find_tree(row)
-        tree.addi(row[START_COL], row[END_COL], idx)
-        genesmd_df.at[idx, "ycoord"] = trees.index(tree)
+    genesmd_df["ycoord"] = ycoord
 
     return genesmd_df
 
@@ -113,80 +410,110 @@ def update_y(genesmd_df, exon_height, v_spacer):
 
 
 ###colors for genes
-def is_pltcolormap(colormap_string):
-    """Checks whether the string given is a valid plt colormap name."""
-    try:
-        colormap = plt.colormaps[colormap_string]
-        if colormap is not None and isinstance(colormap, mcolors.Colormap):
-            return True
-        else:
-            return False
+# colors of the colormap names used, filled on first use of each name
+colormap_registry = {}
+
+
+def rgb_to_hex(colors):
+    """Convert plotly 'rgb(r, g, b)' colors to hex, leaving the rest as given."""
+
+    hex_colors = []
+    for color in colors:
+        if isinstance(color, str) and color[:3] == "rgb":
+            r, g, b = color[color.find("(") + 1 : color.find(")")].split(",")[:3]
+            color = "#{:02x}{:02x}{:02x}".format(int(r), int(g), int(b))
+        hex_colors.append(color)
 
-    except KeyError:
-        return False
+    return hex_colors
 
 
-def is_plycolormap(colormap_string):
-    """Checks whether the string given is a valid plotly color object name."""
+def get_colormap_colors(colormap_string, n_colors):
+    """Provide the colors of a plt or plotly colormap name as hex strings, plt names first if installed."""
 
-    if hasattr(pc.sequential, colormap_string):
-        return True
-    elif hasattr(pc.diverging, colormap_string):
-        return True
-    elif hasattr(pc.cyclical, colormap_string):
-        return True
-    elif hasattr(pc.qualitative, colormap_string):
-        return True
+    colors = colormap_registry.get(colormap_string)
+    if colors is None:
+        colors = colormap_registry[colormap_string] = find_colormap(colormap_string)
 
+    # continuous plt colormaps sampled across the whole map
+    if not isinstance(colors, tuple):
+        import matplotlib
 
-def get_plycolormap(colormap_string):
-    """Provides the plotly color object corresponding to the string given."""
+        samples = colors(np.linspace(0, 1, max(n_colors, 1)))
+        colors = tuple(matplotlib.colors.to_hex(color) for color in samples)
 
-    if hasattr(pc.sequential, colormap_string):
-        return getattr(pc.sequential, colormap_string)
-    elif hasattr(pc.diverging, colormap_string):
-        return getattr(pc.diverging, colormap_string)
-    elif hasattr(pc.cyclical, colormap_string):
-        return getattr(pc.cyclical, colormap_string)
-    elif hasattr(pc.qualitative, colormap_string):
-        return getattr(pc.qualitative, colormap_string)
+    return colors
+
+
+def find_colormap(colormap_string):
+    """Provide the hex colors of a colormap name, or the plt colormap if it is continuous."""
+
+    try:
+        import matplotlib
+    except ImportError:
+        colormap = None  # only the plotly names are available
+    else:
+        colormap = matplotlib.colormaps.get(colormap_string)
+    if colormap is not None:
+        if isinstance(colormap, matplotlib.colors.ListedColormap):
+            return tuple(matplotlib.colors.to_hex(color) for color in colormap.colors)
+        return colormap
+
+    import plotly.colors as pc
+
+    for module in [pc.sequential, pc.diverging, pc.cyclical, pc.qualitative]:
+        sequence = getattr(module, colormap_string, None)
+        if isinstance(sequence, list):
+            return tuple(rgb_to_hex(sequence))
+
+    raise Exception("The provided string does not match any plt or plotly colormap.")
 
 
 def subdf_assigncolor(subdf, colormap, color_col, exon_border):
     """Add color information to data."""
 
-    # Create COLOR_COL column
+    # Code each color tag by order of appearance, labels are the tags as strings
     if len(color_col) > 1:
-        subdf[COLOR_TAG_COL] = list(zip(*[subdf[c] for c in color_col]))
+        tag_codes = (
+            subdf.groupby(color_col, sort=False, dropna=False, observed=True)
+            .ngroup()
+            .to_numpy()
+        )
+        color_tags = [
+            str(tag)
+            for tag in subdf[color_col]
+            .drop_duplicates()
+            .itertuples(index=False, name=None)
+        ]
     else:
-        subdf[COLOR_TAG_COL] = subdf[color_col[0]]
-
-    # Assign colors to
-    color_tags = subdf[COLOR_TAG_COL].drop_duplicates()
+        tag_codes, color_tags = pd.factorize(subdf[color_col[0]], use_na_sentinel=False)
+        color_tags = [str(tag) for tag in color_tags]
+    color_tags = np.array(color_tags, dtype=object)
+    subdf[COLOR_TAG_COL] = color_tags[tag_codes]
     n_color_tags = len(color_tags)
 
-    # 0-string to colormap object if possible
+    # 0-string to its colors, already as hex
     if isinstance(colormap, str):
-        if is_pltcolormap(colormap):
-            colormap = plt.get_cmap(colormap)
-        elif is_plycolormap(colormap):
-            colormap = get_plycolormap(colormap)
-        else:
-            raise Exception(
-                "The provided string does not match any plt or plotly colormap."
-            )
+        colormap = list(get_colormap_colors(colormap, n_color_tags))
 
-    # 1-plt colormap to list
-    if isinstance(colormap, mcolors.ListedColormap):
-        colormap = list(colormap.colors)  # colors of plt object
+    # 1-plt colormap to list, matplotlib already imported if given
+    else:
+        mcolors = sys.modules.get("matplotlib.colors")
+        if mcolors is not None and isinstance(colormap, mcolors.ListedColormap):
+            colormap = list(colormap.colors)  # colors of plt object
 
-    # 2-list to dict
+        # make plotly rgb colors compatible with plt
+        elif isinstance(colormap, list):
+            colormap = rgb_to_hex(colormap)
+
+    # 2-list to colors of the tags
     if isinstance(colormap, list):
         # adjust number of colors
         if n_color_tags > len(colormap):
             engine = get_engine()
             warnings = get_warnings()
             if engine in ["plt", "matplotlib"] and warnings:
+                from .matplotlib_base.core import plt_popup_warning
+
                 plt_popup_warning(
                     "The genes are colored by iterating over the given color list."
                 )
@@ -194,37 +521,37 @@ def subdf_assigncolor(subdf, colormap, color_col, exon_border):
                 subdf["_iterwarning!"] = [1] * len(subdf)
         else:
             colormap = colormap[:n_color_tags]
-        # make plotly rgb colors compatible with plt
-        if colormap[0][:3] == "rgb":
-            numb_list = [
-                rgb[rgb.find("(") + 1 : rgb.find(")")].split(",") for rgb in colormap
-            ]
-            colormap = [
-                "#{:02x}{:02x}{:02x}".format(int(r), int(g), int(b))
-                for r, g, b in numb_list
-            ]
-        # create dict of colors
-        colormap = {
-            str(color_tags.iloc[i]): colormap[i % len(colormap)]
-            for i in range(n_color_tags)
-        }
+        # color of each tag iterating over the list, colors may be rgb sequences
+        palette = np.empty(len(colormap), dtype=object)
+        for i, color in enumerate(colormap):
+            palette[i] = color
+        tag_colors = palette[np.arange(n_color_tags) % len(colormap)]
 
-    # 3- Use dict to assign color to gene
-    if isinstance(colormap, dict):
-        subdf[COLOR_TAG_COL] = subdf[COLOR_TAG_COL].astype(str)
-        subdf[COLOR_INFO] = subdf[COLOR_TAG_COL].map(colormap)
+    # 3- Use dict to get the color of each tag
+    elif isinstance(colormap, dict):
+        tag_colors = pd.Series(color_tags).map(colormap).to_numpy()
 
         # add black genes warning if needed
-        if subdf[COLOR_INFO].isna().any():
+        if pd.isna(tag_colors).any():
             engine = get_engine()
             warnings = get_warnings()
             if engine in ["plt", "matplotlib"] and warnings:
+                from .matplotlib_base.core import plt_popup_warning
+
                 plt_popup_warning(
                     "Some genes do not have a color assigned so they are colored in black."
                 )
             elif engine in ["ply", "plotly"] and warnings:
                 subdf["_blackwarning!"] = [1] * len(subdf)
-            subdf[COLOR_INFO].fillna("black", inplace=True)  # black for not specified
+            tag_colors[pd.isna(tag_colors)] = "black"  # black for not specified
+
+    else:
+        raise TypeError(
+            "The provided colormap should be a list, dict, plt ListedColormap or colormap name."
+        )
+
+    # 4- Assign color to gene
+    subdf[COLOR_INFO] = tag_colors[tag_codes]
 
     if exon_border:
         subdf[BORDER_COLOR_COL] = [exon_border] * len(subdf)
@@ -278,10 +605,7 @@ def get_genes_metadata(df, id_col, color_col, packed, exon_height, v_spacer):
 
     # Assign y-coordinate to genes
     if packed:
-        genesmd_df["ycoord"] = -1
-        genesmd_df = genesmd_df.groupby(
-            ["chrix", PR_INDEX_COL], group_keys=False, observed=True
-        ).apply(genesmd_packed)  # add packed ycoord column
+        genesmd_df = genesmd_packed(genesmd_df)  # add packed ycoord column
         genesmd_df = genesmd_df.groupby(CHROM_COL).apply(
             lambda x: update_y(x, exon_height, v_spacer)
         )
@@ -333,75 +657,67 @@ def get_genes_metadata(df, id_col, color_col, packed, exon_height, v_spacer):
 
 ##limits
 def chrmd_limits(chrmd_df, limits):
-    """Compute 'min_max' column for chromosome metadata"""
+    """Provide the given plot limits of each chromosome metadata row, unknown limits are nan."""
 
-    # 1- create min_max column containing (plot min, plot max)
+    chroms = chrmd_df.index.get_level_values(CHROM_COL)
 
     # no limits no info
     if limits is None:
-        chrmd_df["min_max"] = [(np.nan, np.nan)] * len(chrmd_df)
+        limits_df = pd.DataFrame(index=chroms, columns=["min", "max"], dtype=object)
 
     # one tuple for all chromosomes
     elif type(limits) is tuple:
-        chrmd_df["min_max"] = [limits] * len(chrmd_df)
+        limits_df = pd.DataFrame(
+            [limits] * len(chroms), index=chroms, columns=["min", "max"], dtype=object
+        )
 
-    # pyranges object
+    # pyranges object, chromosomes matched as strings
     elif type(limits) is pr.PyRanges:
-        # create dict to map limits
-        limits_df = limits.df
-        limits_chrmd_df = limits_df.groupby(
-            CHROM_COL, group_keys=False, observed=True
-        ).agg({START_COL: "min", END_COL: "max"})
-        limits_chrmd_dict = limits_chrmd_df.to_dict(orient="index")
-
-        # function to get matching values from limits_chrmd_df
-        def make_min_max(row):
-            chromosome = str(row.name)
-            limits = limits_chrmd_dict.get(chromosome)
-            if limits:
-                return (
-                    limits[START_COL],
-                    limits[END_COL],
-                )  # chromosome in both sets of data
-            else:
-                return (np.nan, np.nan)  # chromosome does not match
-
-        # create limits column in plotting data
-        chrmd_df["min_max"] = chrmd_df.apply(make_min_max, axis=1)
+        limits_chrmd_df = (
+            limits.groupby(CHROM_COL, group_keys=False, observed=True)
+            .agg({START_COL: "min", END_COL: "max"})
+            .set_axis(["min", "max"], axis=1)
+        )
+        limits_chrmd_df.index = limits_chrmd_df.index.astype(str)
+        limits_df = limits_chrmd_df.astype(object).reindex(chroms.astype(str))
 
-    # dictionary as limits
+    # dictionary as limits, the chromosomes not specified or None are unknown
     else:
-        chrmd_df["min_max"] = [
-            limits.get(index) for index in chrmd_df.index
-        ]  # fills with None the chromosomes not specified
-
+        limits_chrmd_df = pd.DataFrame(
+            [(np.nan, np.nan) if lims is None else lims for lims in limits.values()],
+            index=list(limits.keys()),
+            columns=["min", "max"],
+            dtype=object,
+        )
+        limits_df = limits_chrmd_df[
+            ~limits_chrmd_df.index.duplicated(keep="last")
+        ].reindex(chroms)
 
-def fill_min_max(row, ts_data):
-    """Complete min_max column for chromosome metadata if needed."""
+    limits_df.index = chrmd_df.index
+    return limits_df
 
-    minmax_t = row["min_max"]
-    # deal with empty rows
-    if minmax_t is None:
-        minmax_t = (np.nan, np.nan)
 
-    # check both items and put default if necessary
-    minmax_l = list(minmax_t)
+def fill_min_max(chrmd_df, limits_df, ts_data):
+    """Complete min_max column for chromosome metadata with the data limits when unknown."""
 
     # add default to lower limit
-    if minmax_l[0] is None or np.isnan(minmax_l[0]):
-        minmax_l[0] = row["min"]
-    # add default to higher limit
-    if minmax_l[1] is None or np.isnan(minmax_l[1]):
-        minmax_l[1] = row["max"]
-    # consider introns off for higher limit
-    else:
-        if len(row) == 5:
-            new_upper_lim = cumdelting([minmax_l[1]], ts_data, row.name[0], row.name[1])
-            minmax_l[1] = new_upper_lim[0]
+    lower = limits_df["min"].where(limits_df["min"].notna(), chrmd_df["min"])
+
+    # add default to higher limit, considering introns off for the given ones
+    given = limits_df["max"].notna()
+    upper = limits_df["max"].where(given, chrmd_df["max"])
+    if ts_data:
+        chroms = chrmd_df.index.get_level_values(CHROM_COL)
+        for chrom in chroms[given.to_numpy()].unique():
+            if chrom not in ts_data:
+                continue
+            in_chrom = given.to_numpy() & (chroms == chrom)
+            upper[in_chrom] = cumdelting(
+                pd.to_numeric(upper[in_chrom]).to_numpy(), ts_data, chrom
+            )
 
     # put plot coordinates in min_max
-    row["min_max"] = minmax_l
-    return row
+    chrmd_df["min_max"] = list(map(list, zip(lower, upper)))
 
 
 def get_chromosome_metadata(
@@ -432,8 +748,8 @@ def get_chromosome_metadata(
         ].transform("max")
 
     # Add limits
-    chrmd_limits(chrmd_df, limits)  # unknown limits are nan
-    chrmd_df = chrmd_df.apply(lambda x: fill_min_max(x, ts_data), axis=1)
+    limits_df = chrmd_limits(chrmd_df, limits)  # unknown limits are nan
+    fill_min_max(chrmd_df, limits_df, ts_data)
 
     chrmd_df_grouped = (
         chrmd_df.reset_index(level=PR_INDEX_COL)
@@ -443,11 +759,21 @@ def get_chromosome_metadata(
                 "min": "first",
                 "max": "first",
                 "min_max": "first",
-                PR_INDEX_COL: ["size", list],
+                PR_INDEX_COL: "size",
             }
         )
     )
-    chrmd_df_grouped.columns = ["min", "max", "min_max", "n_pr_ix", "present_pr"]
+    chrmd_df_grouped.columns = ["min", "max", "min_max", "n_pr_ix"]
+
+    # pr objects of each chromosome, rows are sorted by chromosome and pr
+    n_pr_ix = chrmd_df_grouped["n_pr_ix"].to_numpy()
+    chrmd_df_grouped["present_pr"] = [
+        pr_ixs.tolist()
+        for pr_ixs in np.split(
+            chrmd_df.index.get_level_values(PR_INDEX_COL).to_numpy(),
+            np.cumsum(n_pr_ix)[:-1],
+        )
+    ]
 
     # Store plot y height
     chrmd_df_grouped = chrmd_df_grouped.join(
@@ -465,7 +791,7 @@ def get_chromosome_metadata(
         ].max()
     )
     chrmd_df.rename(columns={"ycoord": "pr_line"}, inplace=True)
-    chrmd_df["pr_line"] = chrmd_df.groupby(CHROM_COL)["pr_line"].shift(
+    chrmd_df["pr_line"] = chrmd_df.groupby(CHROM_COL, observed=True)["pr_line"].shift(
         -1, fill_value=-(0.5 + exon_height / 2 + v_spacer)
     )
 
@@ -479,3 +805,64 @@ def get_chromosome_metadata(
     ).ngroup()
 
     return chrmd_df, chrmd_df_grouped
+
+
+############ LEVEL OF DETAIL
+def subdf_detail(subdf, chrmd_df_grouped, id_col, detail, detail_threshold, width):
+    """Collapse to one interval the genes whose structure is not to be drawn."""
+
+    if detail == "full":
+        return subdf
+    if detail not in ["genes", "auto"]:
+        raise ValueError(
+            "The detail option should be either 'full', 'genes' or 'auto'."
+        )
+
+    genes = subdf.groupby([CHROM_COL, PR_INDEX_COL] + id_col, observed=True, sort=False)
+    gene_start = genes[START_COL].transform("min").to_numpy()
+    gene_end = genes[END_COL].transform("max").to_numpy()
+
+    # collapse all or the genes with too few pixels per interval
+    if detail == "genes":
+        collapse = np.ones(len(subdf), dtype=bool)
+    else:
+        # plotted range of the chromosome, including margins
+        x_rang = {
+            chrom: (x_max - x_min) * 1.1
+            for chrom, (x_min, x_max) in chrmd_df_grouped["min_max"].items()
+        }
+        px_per_base = width / subdf[CHROM_COL].map(x_rang).astype(float).to_numpy()
+        n_intervals = genes[START_COL].transform("size").to_numpy()
+        gene_px = (gene_end - gene_start) * px_per_base
+        collapse = gene_px / n_intervals < detail_threshold
+
+    if not collapse.any():
+        return subdf
+
+    # keep first interval of collapsed genes spanning the whole gene
+    keep = ~collapse | (subdf[EXON_IX_COL] == 0).to_numpy()
+    collapsed = collapse[keep]
+    result = subdf[keep].copy()
+    result[START_COL] = np.where(collapsed, gene_start[keep], result[START_COL])
+    result[END_COL] = np.where(collapsed, gene_end[keep], result[END_COL])
+    for col, agg in [(ORISTART_COL, "min"), (ORIEND_COL, "max")]:
+        result[col] = np.where(
+            collapsed, genes[col].transform(agg).to_numpy()[keep], result[col]
+        )
+
+    # drawn thick if coding when showing transcript structure
+    if "Feature" in result.columns:
+        has_cds = (
+            subdf["Feature"]
+            .astype(str)
+            .str.contains("CDS")
+            .groupby(genes.ngroup().to_numpy())
+            .transform("any")
+        )
+        result["Feature"] = np.where(
+            collapsed,
+            np.where(has_cds.to_numpy()[keep], "CDS", "exon"),
+            result["Feature"].astype(str),
+        )
+
+    return result
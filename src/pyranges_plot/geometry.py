@@ -0,0 +1,454 @@
+import string
+
+import numpy as np
+import pandas as pd
+from pyranges.core.names import CHROM_COL, END_COL, START_COL, STRAND_COL
+
+from .names import (
+    ADJEND_COL,
+    ADJSTART_COL,
+    BORDER_COLOR_COL,
+    COLOR_INFO,
+    COLOR_TAG_COL,
+    EXON_IX_COL,
+    GENE_INFO_COL,
+    ORIEND_COL,
+    ORISTART_COL,
+    PR_INDEX_COL,
+    ROW_INFO_COL,
+    TEXT_COL,
+    TEXT_PAD_COL,
+)
+
+############ TEXTS
+CONVERSIONS = {None: lambda value: value, "s": str, "r": repr, "a": ascii}
+
+
+def format_values(values, format_spec="", conversion=None):
+    """Format the values as str.format would, formatting every distinct value once."""
+
+    try:
+        codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=False)
+    except TypeError:  # unhashable values
+        codes, uniques = np.arange(len(values)), list(values)
+    convert = CONVERSIONS[conversion]
+    formatted = np.empty(len(uniques), dtype=object)
+    for i, value in enumerate(uniques):
+        formatted[i] = format(convert(value), format_spec)
+
+    return formatted[codes]
+
+
+def format_rows(df, template):
+    """Fill the template with the columns of every row, as template.format_map(row) would."""
+
+    parts = list(string.Formatter().parse(template))
+
+    # fields other than column names, like '{col[0]}', are filled row by row
+    if any(
+        field is not None
+        and (not field or field.isdigit() or "." in field or "[" in field)
+        or "{" in (format_spec or "")
+        for _, field, format_spec, _ in parts
+    ):
+        texts = np.empty(len(df), dtype=object)
+        for i, row_dict in enumerate(df.to_dict(orient="records")):
+            texts[i] = template.format_map(row_dict)
+        return texts
+
+    texts = np.full(len(df), "", dtype=object)
+    for literal, field, format_spec, conversion in parts:
+        if literal:
+            texts = texts + literal
+        if field is not None:
+            texts = texts + format_values(df[field], format_spec, conversion)
+
+    return texts
+
+
+def get_default_info(strand, start, end, genename, newline):
+    """Provide the default hover information, with strand when known."""
+
+    info = (
+        "("
+        + format_values(start)
+        + ", "
+        + format_values(end)
+        + ")"
+        + newline
+        + "ID: "
+        + format_values(genename)
+    )
+    with_strand = pd.Series(strand).astype(bool).to_numpy()
+
+    return np.where(with_strand, "[" + format_values(strand) + "] " + info, info)
+
+
+def get_rows_info(rows, strand, showinfo, newline):
+    """Provide the hover information of every interval."""
+
+    info = get_default_info(
+        strand, rows[ORISTART_COL], rows[ORIEND_COL], rows["__id_col_2count__"], newline
+    )
+
+    # customized
+    if showinfo:
+        info = info + newline + format_rows(rows, showinfo.replace("\n", newline))
+
+    return info
+
+
+def get_genes_info(rows, gene, strand, newline):
+    """Provide the default hover information of the gene of every interval."""
+
+    gby = rows.groupby(gene, sort=False, observed=True)
+
+    return get_default_info(
+        strand,
+        gby[ORISTART_COL].transform("min"),
+        gby[ORIEND_COL].transform("max"),
+        rows["__id_col_2count__"],
+        newline,
+    )
+
+
+def get_genes_text(rows, text):
+    """Provide the gene annotation of every interval, its ID or the text filled."""
+
+    # text == '{string}'
+    if isinstance(text, str):
+        return format_rows(rows, text)
+    # text == True
+    return rows["__id_col_2count__"].to_numpy()
+
+
+def get_texts_by_row(subdf, id_col, showinfo, text, newline):
+    """Add the hover information of every interval and of its gene, and the gene annotation."""
+
+    # strand of the first interval of the gene
+    gene = subdf.groupby(id_col + [PR_INDEX_COL], sort=False, observed=True).ngroup()
+    gene = gene.to_numpy()
+    genes, first = np.unique(gene, return_index=True)
+    first = first[np.searchsorted(genes, gene)]
+    if STRAND_COL in subdf.columns:
+        strand = subdf[STRAND_COL].to_numpy()[first]
+    else:
+        strand = np.full(len(subdf), "", dtype=object)
+
+    return subdf.assign(
+        **{
+            ROW_INFO_COL: get_rows_info(subdf, strand, showinfo, newline),
+            GENE_INFO_COL: get_genes_info(subdf, gene, strand, newline),
+            TEXT_COL: get_genes_text(subdf, text),
+        }
+    )
+
+
+############ GENES
+def get_items(subdf, genesmd_df, chrmd_df_grouped, id_col, exon_border):
+    """Add gene position, strand and line color to every interval."""
+
+    gene_cols = id_col + [PR_INDEX_COL]
+    items = subdf.reset_index(drop=True)
+    items["gene"] = items.groupby(gene_cols, sort=False, observed=True).ngroup()
+    items = items[items["gene"] >= 0]
+    gby = items.groupby("gene", sort=False)
+
+    # y position of the gene
+    genes_y = genesmd_df[gene_cols + ["ycoord"]].reset_index(drop=True)
+    items = items.merge(genes_y, on=gene_cols, how="left")
+    items["gene_ix"] = items["ycoord"] + 0.5
+
+    # subplot of the gene and coordinates range of the subplot axis
+    chrom = gby[CHROM_COL].transform("first")
+    items["chrom_ix"] = chrom.map(chrmd_df_grouped["chrom_ix"]).to_numpy()
+    x_span = chrmd_df_grouped["min_max"].map(lambda x: 1.1 * (x[1] - x[0]))
+    items["x_span"] = chrom.map(x_span).to_numpy()  # limits + 5% on each side
+
+    # strand of the gene
+    if STRAND_COL in items.columns:
+        items["strand"] = gby[STRAND_COL].transform("first").to_numpy()
+    else:
+        items["strand"] = ""
+
+    # color of border of first interval used as intron and utr color for simplicity
+    if exon_border is None:
+        items["gene_color"] = gby[BORDER_COLOR_COL].transform("first").to_numpy()
+    else:
+        items["gene_color"] = exon_border
+
+    return items
+
+
+############ EXONS
+def get_rows(items, transcript_str, exon_height, transcript_utr_width):
+    """Provide the intervals to plot with their height, and the utrs of every gene."""
+
+    # intervals to plot and their height
+    if not transcript_str:
+        rows = items
+        height = np.full(len(rows), exon_height)
+        utrs = items.iloc[:0]
+
+    else:
+        feature = items["Feature"].astype(str)
+        has_cds = feature.str.contains("CDS").groupby(items["gene"]).transform("any")
+        has_exon = feature.str.contains("exon").groupby(items["gene"]).transform("any")
+
+        # transcript has CDS and exon: plot CDS and utrs, only exon: plot as utr
+        both = has_cds & has_exon
+        keep = (both & (feature == "CDS")) | (has_cds ^ has_exon)
+        rows = items[keep]
+        height = np.where(
+            (~has_cds & has_exon)[keep], transcript_utr_width, exon_height
+        )
+
+        # utrs from exon and CDS limits, keeping first row data of the gene
+        cds = items[both & (feature == "CDS")].groupby("gene", sort=False)
+        exons = items[both & (feature == "exon")].groupby("gene", sort=False)
+        utrs = items[both].drop_duplicates("gene").set_index("gene")
+        utrs["tr_start"] = exons[START_COL].min()
+        utrs["cds_start"] = cds[START_COL].min()
+        utrs["cds_end"] = cds[END_COL].max()
+        utrs["tr_end"] = exons[END_COL].max()
+        utrs = utrs.reset_index()
+
+    return rows.assign(height=height), utrs
+
+
+def get_rects(rows, utrs, transcript_utr_width, showinfo, newline):
+    """Provide the rectangles of the intervals and utrs to plot."""
+
+    # get the gene information to print on hover
+    rects = pd.DataFrame(
+        {
+            "chrom_ix": rows["chrom_ix"].to_numpy(),
+            "x0": rows[START_COL].to_numpy(),
+            "x1": rows[END_COL].to_numpy(),
+            "y0": (rows["gene_ix"] - rows["height"] / 2).to_numpy(),
+            "y1": (rows["gene_ix"] + rows["height"] / 2).to_numpy(),
+            "fillcolor": rows[COLOR_INFO].to_numpy(),
+            "linecolor": rows[BORDER_COLOR_COL].to_numpy(),
+            "tag": rows[COLOR_TAG_COL].astype(str).to_numpy(),
+            "info": get_rows_info(rows, rows["strand"], showinfo, newline),
+            "gene": rows["gene"].to_numpy(),
+            "utr": False,
+        }
+    )
+
+    if not utrs.empty:
+        utr_rects = []
+        for x0, x1 in [("tr_start", "cds_start"), ("cds_end", "tr_end")]:
+            utr_rects.append(
+                pd.DataFrame(
+                    {
+                        "chrom_ix": utrs["chrom_ix"].to_numpy(),
+                        "x0": utrs[x0].to_numpy(),
+                        "x1": utrs[x1].to_numpy(),
+                        "y0": utrs["gene_ix"].to_numpy() - transcript_utr_width / 2,
+                        "y1": utrs["gene_ix"].to_numpy() + transcript_utr_width / 2,
+                        "fillcolor": utrs["gene_color"].to_numpy(),
+                        "linecolor": utrs["gene_color"].to_numpy(),
+                        "tag": utrs[COLOR_TAG_COL].astype(str).to_numpy(),
+                        "info": get_default_info(
+                            utrs["strand"],
+                            utrs[x0],
+                            utrs[x1],
+                            utrs["__id_col_2count__"],
+                            newline,
+                        ),
+                        "gene": utrs["gene"].to_numpy(),
+                        "utr": True,
+                    }
+                )
+            )
+        rects = pd.concat([rects] + utr_rects, ignore_index=True)
+
+    return rects
+
+
+def get_texts(rows, utrs, text):
+    """Provide the ID annotations placed beside the genes."""
+
+    # first interval of every gene
+    first_rows = rows[rows[EXON_IX_COL] == 0]
+    texts = pd.DataFrame(
+        {
+            "chrom_ix": first_rows["chrom_ix"].to_numpy(),
+            "x": (first_rows[START_COL] - first_rows[TEXT_PAD_COL]).to_numpy(),
+            "y": first_rows["gene_ix"].to_numpy(),
+        }
+    )
+    annotated = [first_rows]
+
+    # beside the start utr
+    if not utrs.empty:
+        texts = pd.concat(
+            [
+                texts,
+                pd.DataFrame(
+                    {
+                        "chrom_ix": utrs["chrom_ix"].to_numpy(),
+                        "x": (utrs["tr_start"] - utrs[TEXT_PAD_COL]).to_numpy(),
+                        "y": utrs["gene_ix"].to_numpy(),
+                    }
+                ),
+            ],
+            ignore_index=True,
+        )
+        annotated.append(utrs)
+
+    texts["text"] = np.concatenate([get_genes_text(df, text) for df in annotated])
+
+    return texts
+
+
+############ INTRONS
+def get_introns(items):
+    """Provide the introns between consecutive intervals of every gene."""
+
+    # intervals of every gene sorted by start
+    order = np.lexsort((items[START_COL].to_numpy(), items["gene"].to_numpy()))
+    sorted_items = items.iloc[order]
+    same_gene = sorted_items["gene"].to_numpy()
+    same_gene = same_gene[1:] == same_gene[:-1]
+
+    # intron start is the end of an interval and intron end the start of the next
+    introns = sorted_items.iloc[:-1][same_gene].reset_index(drop=True)
+    introns["start"] = sorted_items[END_COL].to_numpy()[:-1][same_gene]
+    introns["stop"] = sorted_items[START_COL].to_numpy()[1:][same_gene]
+
+    return introns
+
+
+def get_intron_lines(introns, ts_data, chrmd_df_grouped):
+    """Split introns in fixed and shrinked lines."""
+
+    start = introns["start"].to_numpy()
+    stop = introns["stop"].to_numpy()
+    chrom_ix = introns["chrom_ix"].to_numpy()
+
+    # shrinked regions of all chromosomes, offset by subplot to be searched at once
+    ts_l = [
+        (chrmd_df_grouped.loc[chrom]["chrom_ix"], ts_chrom)
+        for chrom, ts_chrom in ts_data.items()
+        if not ts_chrom.empty
+    ]
+    if ts_l:
+        ts_ix = np.concatenate([np.full(len(ts), ix) for ix, ts in ts_l])
+        ts_adjstart = np.concatenate([ts[ADJSTART_COL].to_numpy() for _, ts in ts_l])
+        ts_adjend = np.concatenate([ts[ADJEND_COL].to_numpy() for _, ts in ts_l])
+        chrom_len = max(ts_adjend.max(), start.max(initial=0), stop.max(initial=0)) + 1
+        ts_key = ts_adjstart + ts_ix * chrom_len
+        ts_order = np.argsort(ts_key, kind="stable")
+        ts_key, ts_adjstart, ts_adjend = (
+            ts_key[ts_order],
+            ts_adjstart[ts_order],
+            ts_adjend[ts_order],
+        )
+
+        # shrinked regions starting inside every intron
+        first = np.searchsorted(ts_key, start + chrom_ix * chrom_len, side="left")
+        last = np.searchsorted(ts_key, stop + chrom_ix * chrom_len, side="left")
+        n_ts = np.maximum(last - first, 0)
+    else:
+        ts_adjstart = ts_adjend = np.array([], dtype=int)
+        first = np.zeros(len(introns), dtype=int)
+        n_ts = np.zeros(len(introns), dtype=int)
+
+    # shrinked lines
+    intron_rep = np.repeat(np.arange(len(introns)), n_ts)
+    region_ix = first[intron_rep] + (
+        np.arange(len(intron_rep)) - np.repeat(np.cumsum(n_ts) - n_ts, n_ts)
+    )
+    dashed = introns.iloc[intron_rep].reset_index(drop=True)
+    dashed["x0"] = ts_adjstart[region_ix]
+    dashed["x1"] = ts_adjend[region_ix]
+    dashed["dashed"] = True
+
+    # fixed lines, before, between and after shrinked regions
+    fixed_rep = np.repeat(np.arange(len(introns)), n_ts + 1)
+    piece_ix = np.arange(len(fixed_rep)) - np.repeat(
+        np.cumsum(n_ts + 1) - n_ts - 1, n_ts + 1
+    )
+    region_ix = first[fixed_rep] + piece_ix
+    x0 = start[fixed_rep]
+    after_ts = piece_ix > 0
+    x0[after_ts] = ts_adjend[region_ix[after_ts] - 1]
+    x1 = stop[fixed_rep]
+    before_ts = piece_ix < n_ts[fixed_rep]
+    x1[before_ts] = ts_adjstart[region_ix[before_ts]]
+    fixed = introns.iloc[fixed_rep].reset_index(drop=True)
+    fixed["x0"] = x0
+    fixed["x1"] = x1
+    fixed["dashed"] = False
+
+    # do not keep empty fixed lines between intron limits and shrinked regions
+    fixed = fixed[(n_ts[fixed_rep] == 0) | (fixed["x0"] != fixed["x1"])]
+
+    return pd.concat([fixed, dashed], ignore_index=True)
+
+
+############ DIRECTION ARROWS
+def get_arrows(
+    introns,
+    rows,
+    exon_height,
+    arrow_intron_threshold,
+    arrow_size,
+    arrow_size_min,
+):
+    """Provide direction arrows for introns and, if none in a gene, for intervals."""
+
+    # introns bigger than the threshold
+    x_span = introns["x_span"].to_numpy()
+    if isinstance(arrow_intron_threshold, int):
+        arrow_intron_threshold = arrow_intron_threshold / x_span
+    if isinstance(arrow_size, int):
+        arrow_size = arrow_size / x_span
+    intron_size = (introns["stop"] - introns["start"]).to_numpy() / x_span
+    has_strand = introns["strand"].astype(bool).to_numpy()
+    intron_arrow = has_strand & (intron_size > arrow_intron_threshold)
+    intron_arrows = pd.DataFrame(
+        {
+            "chrom_ix": introns["chrom_ix"].to_numpy(),
+            "strand": introns["strand"].to_numpy(),
+            "x": ((introns["start"] + introns["stop"]) / 2).to_numpy(),
+            "incl": arrow_size / 2 * x_span,
+            "y": introns["gene_ix"].to_numpy(),
+            "height": exon_height,
+            "intron": True,
+        }
+    )[intron_arrow]
+
+    # genes with no intron arrows get arrows in big enough intervals
+    dir_flag = introns["gene"][intron_arrow].unique()
+    size = (rows[END_COL] - rows[START_COL]).to_numpy()
+    exon_arrow = (
+        rows["strand"].astype(bool).to_numpy()
+        & ~np.isin(rows["gene"].to_numpy(), dir_flag)
+        & (0.05 * size / rows["x_span"].to_numpy() > arrow_size_min)
+    )
+    exon_arrows = pd.DataFrame(
+        {
+            "chrom_ix": rows["chrom_ix"].to_numpy(),
+            "strand": rows["strand"].to_numpy(),
+            "x": ((rows[START_COL] + rows[END_COL]) / 2).to_numpy(),
+            "incl": 0.025 * size,
+            "y": rows["gene_ix"].to_numpy(),
+            "height": rows["height"].to_numpy(),
+            "intron": False,
+        }
+    )[exon_arrow]
+
+    arrows = pd.concat([intron_arrows, exon_arrows], ignore_index=True)
+    arrows = arrows[arrows["strand"].isin(["+", "-"])]
+
+    # chevron pointing to the strand direction (tip, then both ends)
+    sign = np.where(arrows["strand"] == "+", 1, -1)
+    arrows["x_tip"] = arrows["x"] + sign * arrows["incl"]
+    arrows["x_end"] = arrows["x"] - sign * arrows["incl"]
+    arrows["y_low"] = arrows["y"] - arrows["height"] / 2 + 0.01
+    arrows["y_high"] = arrows["y"] + arrows["height"] / 2 - 0.01
+
+    return arrows
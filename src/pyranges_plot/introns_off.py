@@ -1,3 +1,4 @@
+import numpy as np
 import pyranges as pr
 import pandas as pd
 from pyranges.core.names import CHROM_COL, START_COL, END_COL
@@ -66,82 +67,85 @@ def get_introns(p, id_cols) -> "pr.PyRanges":
     return introns
 
 
-def introns_resize(df, ts_data, id_col):
-    """Calculate intron resizes and provide info for plotting"""
+def introns_resize(df, ts_data):
+    """Calculate intron resizes and provide info for plotting.
 
-    chrom = df[CHROM_COL].iloc[0]
-    p = df
-    thresh = df[SHRTHRES_COL].iloc[0]
+    The shrinkable regions of all chromosomes are obtained at once as the gaps between
+    the intervals sorted by start, using the cumulative maximum of their ends.
+    """
+
+    # offset coordinates by chromosome so all of them are sorted and searched at once
+    chrom_codes, chroms = pd.factorize(df[CHROM_COL])
+    chrom_len = int(df[END_COL].max()) + 1
+    starts = df[START_COL].to_numpy() + chrom_codes * chrom_len
+    ends = df[END_COL].to_numpy() + chrom_codes * chrom_len
+
+    # sort intervals and get the end covered by the previous ones
+    order = np.argsort(starts, kind="stable")
+    sorted_codes = chrom_codes[order]
+    sorted_starts = starts[order]
+    covered_ends = np.maximum.accumulate(ends[order])
 
     # Calculate shrinkable intron ranges
-    # get flexible introns
-    exons = p.copy()
-    # introns = get_introns(p, [PR_INDEX_COL] + id_col)
-    introns = p.complement(use_strand=False)
-    introns.reset_index(drop=True, inplace=True)  # reset duplicate labels in index
-
-    to_shrink = pr.PyRanges()
-
-    if not introns.empty:
-        flex_introns = introns.subtract_ranges(exons, strand_behavior="ignore")
-
-        # obtain shrinkable regions
-        to_shrink = flex_introns.merge_overlaps(use_strand=False)  # unique ranges
-        if not to_shrink.empty:
-            to_shrink = to_shrink[
-                to_shrink[END_COL] - to_shrink[START_COL] > thresh
-            ]  # filtered
-
-    # nohing to shrink
-    if to_shrink.empty:
-        ts_data[chrom] = pd.DataFrame(
-            columns=[
-                CHROM_COL,
-                START_COL,
-                END_COL,
-                ADJSTART_COL,
-                ADJEND_COL,
-                CUM_DELTA_COL,
-            ]
+    # gaps between consecutive intervals of the same chromosome
+    gap_ix = (
+        np.flatnonzero(
+            (sorted_starts[1:] > covered_ends[:-1])
+            & (sorted_codes[1:] == sorted_codes[:-1])
         )
-        result = p
-        result[ADJSTART_COL] = result[START_COL]
-        result[ADJEND_COL] = result[END_COL]
-        result[DELTA_COL] = [0] * len(result)
-        result[CUM_DELTA_COL] = [0] * len(result)
-
-        return result
+        + 1
+    )
+    gap_thresh = df[SHRTHRES_COL].to_numpy()[order][gap_ix]
+    gap_starts = covered_ends[gap_ix - 1]
+    gap_ends = sorted_starts[gap_ix]
+
+    # obtain shrinkable regions
+    keep = gap_ends - gap_starts > gap_thresh  # filtered
+    ts_codes = sorted_codes[gap_ix][keep]
+    ts_ends = gap_ends[keep]
+    to_shrink = pd.DataFrame(
+        {
+            CHROM_COL: chroms[ts_codes],
+            START_COL: gap_starts[keep] - ts_codes * chrom_len,
+            END_COL: ts_ends - ts_codes * chrom_len,
+        }
+    )
 
     # get coordinate shift (delta) and cumulative coordinate shift (cumdelta)
     to_shrink[DELTA_COL] = (
-        to_shrink[END_COL] - to_shrink[START_COL]
-    ) - thresh  # calculate coord shift considering margins
-    assert to_shrink.sort_values(START_COL).equals(to_shrink), "PyRanges not sorted."
-    to_shrink[CUM_DELTA_COL] = to_shrink[DELTA_COL].cumsum()
+        to_shrink[END_COL] - to_shrink[START_COL] - gap_thresh[keep]
+    )  # calculate coord shift considering margins
+    to_shrink[CUM_DELTA_COL] = to_shrink.groupby(
+        CHROM_COL, group_keys=False, observed=True
+    )[DELTA_COL].cumsum()
 
     # store adjusted coord to plot shrinked intron regions
-    to_shrink[ADJSTART_COL] = to_shrink[
-        START_COL
-    ] - to_shrink.__cumdelta__.shift().fillna(0)
-    to_shrink[ADJEND_COL] = to_shrink[END_COL] - to_shrink.__cumdelta__
+    to_shrink[ADJSTART_COL] = (
+        to_shrink[START_COL] - to_shrink[CUM_DELTA_COL] + to_shrink[DELTA_COL]
+    )
+    to_shrink[ADJEND_COL] = to_shrink[END_COL] - to_shrink[CUM_DELTA_COL]
 
-    # store to shrink data
-    ts_data[chrom] = to_shrink
+    # store to shrink data, empty for chromosomes with nothing to shrink
+    ts_groups = dict(list(to_shrink.groupby(CHROM_COL, observed=True, sort=False)))
+    for chrom in chroms:
+        ts_data[chrom] = ts_groups.get(chrom, to_shrink.iloc[:0]).reset_index(drop=True)
 
     # Calculate exons coordinate shift
-    exons = pr.concat([exons, to_shrink])
-    exons.sort_values(START_COL, inplace=True)
-    exons[CUM_DELTA_COL] = exons[CUM_DELTA_COL].ffill()
-    exons = exons.fillna({CUM_DELTA_COL: 0})
-    # match exons with its cumdelta
-    result = exons.dropna(subset=id_col)
+    # match exons with the last shrinked region ending before them, first for none
+    ts_ix = np.searchsorted(ts_ends, starts, side="right")
+    ts_codes = np.concatenate(([-1], ts_codes))
+    ts_cumdelta = np.concatenate(([0], to_shrink[CUM_DELTA_COL].to_numpy()))
+    result = df.copy()
+    result[CUM_DELTA_COL] = np.where(
+        ts_codes[ts_ix] == chrom_codes, ts_cumdelta[ts_ix], 0
+    )
 
     # Adjust coordinates
     result[ADJSTART_COL] = result[START_COL] - result[CUM_DELTA_COL]
     result[ADJEND_COL] = result[END_COL] - result[CUM_DELTA_COL]
 
     # Provide result
-    return result[list(p.columns) + [ADJSTART_COL, ADJEND_COL, DELTA_COL]]
+    return result
 
 
 def recalc_axis(ts_data, tick_pos_d, ori_tick_pos_d):
@@ -1,24 +1,9 @@
 import tkinter as tk
+import weakref
 
-
-def coord2percent(ax, X0, X1):
-    """Provides the plot percentage length from the points given. Matplotlib friendly"""
-
-    x_min, x_max = ax.get_xlim()
-    x_rang = x_max - x_min
-    percent_size = float(((X1 - X0) / x_rang))
-
-    return percent_size
-
-
-def percent2coord(ax, x_percent):
-    """Provides the coordinates distance from the plot percentage given. Matplotlib friendly"""
-
-    x_min, x_max = ax.get_xlim()
-    x_rang = x_max - x_min
-    percent_coord = float(x_percent * x_rang)
-
-    return percent_coord
+import numpy as np
+from matplotlib.lines import Line2D
+from matplotlib.text import Annotation
 
 
 def plt_popup_warning(txt, bkg="#1f1f1f", txtcol="white", botcol="#D6AA00"):
@@ -44,36 +29,154 @@ def plt_popup_warning(txt, bkg="#1f1f1f", txtcol="white", botcol="#D6AA00"):
     warn.wait_window()
 
 
+class HoverIndex:
+    """Interval index of the hoverable items of a figure, sharing one annotation.
+
+    Items are sorted by start and searched with the running maximum of their
+    ends, so a hover only checks the items between the first one that may reach
+    the point and the last one starting before it. This window stays small for
+    short, evenly spread items, but an item spanning most of the axes (e.g. a
+    long intron line) widens it for every point to its right, and the search
+    then degrades to a linear scan of the items in between.
+    """
+
+    def __init__(self, fig, tag_background):
+        self.fig = fig
+        self.items = {}  # axes: list of (x0, x1, y0, y1, info) arrays
+        self.index = {}  # axes: items sorted by start, built on first hover
+        self.background = None
+
+        # create annotation and make it not visible
+        self.annotation = Annotation(
+            "",
+            xy=(0, 0),
+            xycoords="figure pixels",
+            xytext=(20, 20),
+            textcoords="offset points",
+            bbox=dict(
+                boxstyle="round",
+                edgecolor=tag_background,
+                facecolor=tag_background,
+            ),
+            arrowprops=dict(arrowstyle="->"),
+            color="white",
+            animated=True,
+            visible=False,
+        )
+        fig.add_artist(self.annotation)
+
+        fig.canvas.mpl_connect("draw_event", self.on_draw)
+        fig.canvas.mpl_connect("motion_notify_event", self.on_hover)
+
+    def add(self, ax, x0, x1, y0, y1, info):
+        """Add items given by their extents and hover information."""
+
+        self.items.setdefault(ax, []).append(
+            (
+                np.asarray(x0, dtype=float),
+                np.asarray(x1, dtype=float),
+                np.asarray(y0, dtype=float),
+                np.asarray(y1, dtype=float),
+                np.asarray(info, dtype=object),
+            )
+        )
+        self.index.pop(ax, None)
+
+    def build(self, ax):
+        """Sort the items of an axes by start, keeping the order they were added."""
+
+        x0, x1, y0, y1, info = [np.concatenate(col) for col in zip(*self.items[ax])]
+        order = np.argsort(x0, kind="stable")
+        x1 = x1[order]
+        self.index[ax] = (
+            x0[order],
+            x1,
+            np.maximum.accumulate(x1),  # to find first item that may reach a point
+            y0[order],
+            y1[order],
+            info[order],
+            order,
+        )
+
+    def find(self, ax, x, y):
+        """Provide the information of the last added item under the point, if any."""
+
+        if ax not in self.items:
+            return None
+        if ax not in self.index:
+            self.build(ax)
+        x0, x1, x1_max, y0, y1, info, order = self.index[ax]
+
+        # items starting before the point and not ending before it
+        first = np.searchsorted(x1_max, x, side="left")
+        last = np.searchsorted(x0, x, side="right")
+        ix = np.arange(first, last)
+
+        # lines are hovered a few pixels around them
+        to_data = ax.transData.inverted()
+        tol = abs(to_data.transform((0, 5))[1] - to_data.transform((0, 0))[1])
+        tol = np.where(y0[ix] == y1[ix], tol, 0)
+
+        ix = ix[(x1[ix] >= x) & (y0[ix] - tol <= y) & (y <= y1[ix] + tol)]
+        if not len(ix):
+            return None
+        return info[ix[np.argmax(order[ix])]]
+
+    def on_draw(self, event):
+        """Store the figure without annotation to restore it on hover."""
+
+        if self.fig.canvas.supports_blit:
+            self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        if self.annotation.get_visible():
+            self.fig.draw_artist(self.annotation)
+
+    def on_hover(self, event):
+        """Show the information of the item under the mouse."""
+
+        info = None
+        if event.inaxes is not None:
+            info = self.find(event.inaxes, event.xdata, event.ydata)
+
+        if info is not None:
+            self.annotation.set_text(info)
+            self.annotation.xy = (event.x, event.y)
+            self.annotation.set_visible(True)
+            self.refresh()
+        elif self.annotation.get_visible():
+            self.annotation.set_visible(False)
+            self.refresh()
+
+    def refresh(self):
+        """Redraw only the annotation over the stored figure if possible."""
+
+        if self.background is None:
+            self.fig.canvas.draw_idle()
+            return
+        self.fig.canvas.restore_region(self.background)
+        if self.annotation.get_visible():
+            self.fig.draw_artist(self.annotation)
+        self.fig.canvas.blit(self.fig.bbox)
+
+
+hover_indexes = weakref.WeakKeyDictionary()
+
+
+def get_hover_index(fig, tag_background):
+    """Provide the hover index of the figure, creating it if needed."""
+
+    if fig not in hover_indexes:
+        hover_indexes[fig] = HoverIndex(fig, tag_background)
+    return hover_indexes[fig]
+
+
 def make_annotation(item, fig, ax, geneinfo, tag_background):
-    """Create annotation for a given plot item."""
-
-    # create annotation and make it not visible
-    annotation = ax.annotate(
-        "",
-        xy=(0, 0),
-        xytext=(20, 20),
-        textcoords="offset points",
-        bbox=dict(
-            boxstyle="round",
-            edgecolor=tag_background,
-            facecolor=tag_background,
-        ),
-        arrowprops=dict(arrowstyle="->"),
-        color="white",
-    )
-    annotation.set_visible(False)
-
-    # make annotation visible when over the gene line
-    def on_hover(event):
-        visible = annotation.get_visible()
-        contains_item, _ = item.contains(event)  # Check if mouse is over the gene line
-        if contains_item:
-            annotation.set_text(geneinfo)
-            annotation.xy = (event.xdata, event.ydata)
-            annotation.set_visible(True)
-            fig.canvas.draw()
-        elif visible:
-            annotation.set_visible(False)
-            fig.canvas.draw()
-
-    fig.canvas.mpl_connect("motion_notify_event", on_hover)
+    """Show the given information when hovering a Rectangle or Line2D plot item."""
+
+    if isinstance(item, Line2D):
+        xy = item.get_xydata()
+        x0, y0 = xy.min(axis=0)
+        x1, y1 = xy.max(axis=0)
+    else:
+        x0, y0, x1, y1 = item.get_bbox().extents
+
+    get_hover_index(fig, tag_background).add(ax, [x0], [x1], [y0], [y1], [geneinfo])
@@ -1,9 +1,21 @@
 from pyranges.core.names import START_COL, END_COL
 
-from .core import coord2percent, percent2coord, make_annotation
+from .core import make_annotation, get_hover_index
+from matplotlib.collections import LineCollection, PolyCollection
 from matplotlib.patches import Rectangle
+import numpy as np
 import pandas as pd
 
+from ..geometry import (
+    get_items,
+    get_genes_info,
+    get_rows,
+    get_rects,
+    get_texts,
+    get_introns,
+    get_intron_lines,
+    get_arrows,
+)
 from ..names import (
     ADJSTART_COL,
     ADJEND_COL,
@@ -11,84 +23,34 @@ from ..names import (
     TEXT_PAD_COL,
     COLOR_INFO,
     BORDER_COLOR_COL,
+    ROW_INFO_COL,
+    TEXT_COL,
 )
 
 
-def plot_direction(
-    ax,
-    strand,
-    item_size,
-    item_threshold,
-    start,
-    stop,
-    incl,
-    gene_ix,
-    exon_height,
-    arrow_color,
-    arrow_style,
-    arrow_width,
-):
-    """Plot the direction arrow in the given item if it proceeds."""
-
-    dir_flag = 0
-
-    if strand:
-        # create and plot direction lines
-        if item_size > item_threshold:
-            dir_flag = 1
-            ##diagonal_line = OX arrow extension(item middle point +- incl), OY arrow extension (item middle point + half of exon width)
-            top_plus = (
-                [(start + stop) / 2 + incl, (start + stop) / 2 - incl],
-                [gene_ix, gene_ix + exon_height / 2 - 0.01],
-            )
-            bot_plus = (
-                [(start + stop) / 2 - incl, (start + stop) / 2 + incl],
-                [gene_ix - exon_height / 2 + 0.01, gene_ix],
+def plot_arrows(axes, arrows, arrow_color, arrow_style, arrow_width):
+    """Plot the direction arrows as one line collection per subplot."""
+
+    for chrom_ix, chrom_arrows in arrows.groupby("chrom_ix", sort=False):
+        # chevron from one end to the tip and back to the other end
+        chevrons = np.column_stack(
+            [
+                chrom_arrows["x_end"],
+                chrom_arrows["y_low"],
+                chrom_arrows["x_tip"],
+                chrom_arrows["y"],
+                chrom_arrows["x_end"],
+                chrom_arrows["y_high"],
+            ]
+        ).reshape(-1, 3, 2)
+        axes[chrom_ix].add_collection(
+            LineCollection(
+                chevrons,
+                colors=arrow_color,
+                linewidths=arrow_width,
+                capstyle=arrow_style,
             )
-            top_minus = (
-                [(start + stop) / 2 + incl, (start + stop) / 2 - incl],
-                [gene_ix - exon_height / 2 + 0.01, gene_ix],
-            )
-            bot_minus = (
-                [(start + stop) / 2 - incl, (start + stop) / 2 + incl],
-                [gene_ix, gene_ix + exon_height / 2 - 0.01],
-            )
-
-            if strand == "+":
-                ax.plot(
-                    bot_plus[0],
-                    bot_plus[1],
-                    color=arrow_color,
-                    linewidth=arrow_width,
-                    solid_capstyle=arrow_style,
-                )
-
-                ax.plot(
-                    top_plus[0],
-                    top_plus[1],
-                    color=arrow_color,
-                    linewidth=arrow_width,
-                    solid_capstyle=arrow_style,
-                )
-
-            elif strand == "-":
-                ax.plot(
-                    bot_minus[0],
-                    bot_minus[1],
-                    color=arrow_color,
-                    linewidth=arrow_width,
-                    solid_capstyle=arrow_style,
-                )
-
-                ax.plot(
-                    top_minus[0],
-                    top_minus[1],
-                    color=arrow_color,
-                    linewidth=arrow_width,
-                    solid_capstyle=arrow_style,
-                )
-
-    return dir_flag
+        )
 
 
 def apply_gene_bridge(
@@ -105,14 +67,8 @@ def apply_gene_bridge(
     tag_background,
     plot_border,
     genename,
-    showinfo,
     exon_height,
     transcript_utr_width,
-    arrow_size_min,
-    arrow_color,
-    arrow_style,
-    arrow_width,
-    dir_flag,
 ):
     """Evaluate data and provide plot_row with right parameters."""
     # NOT transcript strucutre
@@ -122,18 +78,11 @@ def apply_gene_bridge(
             args=(
                 fig,
                 ax,
-                strand,
                 gene_ix,
                 tag_background,
                 plot_border,
                 genename,
-                showinfo,
                 exon_height,
-                arrow_size_min,
-                arrow_color,
-                arrow_style,
-                arrow_width,
-                dir_flag,
                 text,
                 text_size,
             ),
@@ -178,13 +127,7 @@ def apply_gene_bridge(
             # add ID annotation for utr
             if text:
                 text_pad = df[TEXT_PAD_COL].iloc[0]
-                # text == True
-                if isinstance(text, bool):
-                    ann = genename
-                # text == '{string}'
-                else:
-                    row_dict = df.iloc[0].to_dict()  # use first row
-                    ann = text.format_map(row_dict)
+                ann = df[TEXT_COL].iloc[0]  # id or text filled with first row
                 ax.annotate(
                     ann,
                     xy=(tr_start - text_pad, gene_ix),
@@ -216,18 +159,11 @@ def apply_gene_bridge(
                 args=(
                     fig,
                     ax,
-                    strand,
                     gene_ix,
                     tag_background,
                     plot_border,
                     genename,
-                    showinfo,
                     exon_height,
-                    arrow_size_min,
-                    arrow_color,
-                    arrow_style,
-                    arrow_width,
-                    dir_flag,
                     text,
                     text_size,
                 ),
@@ -245,18 +181,11 @@ def apply_gene_bridge(
                 args=(
                     fig,
                     ax,
-                    strand,
                     gene_ix,
                     tag_background,
                     plot_border,
                     genename,
-                    showinfo,
                     transcript_utr_width,
-                    arrow_size_min,
-                    arrow_color,
-                    arrow_style,
-                    arrow_width,
-                    dir_flag,
                     text,
                     text_size,
                 ),
@@ -273,18 +202,11 @@ def apply_gene_bridge(
                 args=(
                     fig,
                     ax,
-                    strand,
                     gene_ix,
                     tag_background,
                     plot_border,
                     genename,
-                    showinfo,
                     exon_height,
-                    arrow_size_min,
-                    arrow_color,
-                    arrow_style,
-                    arrow_width,
-                    dir_flag,
                     text,
                     text_size,
                 ),
@@ -300,35 +222,19 @@ def plot_row(
     row,
     fig,
     ax,
-    strand,
     gene_ix,
     tag_background,
     plot_border,
     genename,
-    showinfo,
     exon_height,
-    arrow_size_min,
-    arrow_color,
-    arrow_style,
-    arrow_width,
-    dir_flag,
     text,
     text_size,
 ):
     """Plot elements corresponding to one row of one gene."""
 
     # Make gene annotation
-    # get the gene information to print on hover
-    # default
-    if strand:
-        geneinfo = f"[{strand}] ({row.__oriStart__}, {row.__oriEnd__})\nID: {genename}"  # default with strand
-    else:
-        geneinfo = f"({row.__oriStart__}, {row.__oriEnd__})\nID: {genename}"  # default without strand
-
-    # customized
-    showinfo_dict = row.to_dict()  # first element of gene rows
-    if showinfo:
-        geneinfo += "\n" + showinfo.format(**showinfo_dict)
+    # get the gene information to print on hover, made for all rows at once
+    geneinfo = row[ROW_INFO_COL]
 
     # Exon start, stop and color
     start = int(row[START_COL])
@@ -353,13 +259,7 @@ def plot_row(
     # Add ID annotation if it is the first exon
     if row[EXON_IX_COL] == 0 and text:
         text_pad = row[TEXT_PAD_COL]
-        # text == True
-        if isinstance(text, bool):
-            ann = genename
-        # text == '{string}'
-        else:
-            row_dict = row.to_dict()
-            ann = text.format_map(row_dict)
+        ann = row[TEXT_COL]  # id or text filled with the row
 
         ax.annotate(
             ann,
@@ -370,28 +270,6 @@ def plot_row(
             fontsize=text_size,
         )
 
-    # Plot DIRECTION ARROW in EXON
-    # decide about placing a direction arrow
-    arrow_size = coord2percent(ax, 0.05 * start, 0.05 * stop)
-    incl = percent2coord(ax, arrow_size / 2)  # how long in the plot (OX)
-
-    # create and plot lines
-    if not dir_flag:
-        plot_direction(
-            ax,
-            strand,
-            arrow_size,
-            arrow_size_min,
-            start,
-            stop,
-            incl,
-            gene_ix,
-            exon_height,
-            arrow_color,
-            arrow_style,
-            arrow_width,
-        )
-
 
 def plot_introns(
     sorted_exons,
@@ -402,18 +280,9 @@ def plot_introns(
     tag_background,
     gene_ix,
     exon_color,
-    strand,
-    intron_threshold,
-    exon_height,
-    arrow_color,
-    arrow_style,
-    arrow_width,
-    arrow_size,
 ):
     """Plot intron lines as needed."""
 
-    dir_flag = []
-
     for i in range(len(sorted_exons) - 1):
         # define intron
         start = sorted_exons[END_COL].iloc[i]
@@ -495,30 +364,127 @@ def plot_introns(
                 # store interval end for next iteration
                 prev_tsend = row[ADJEND_COL]
 
-        intron_size = coord2percent(ax, start, stop)
-        incl = percent2coord(
-            ax, arrow_size / 2
-        )  # how long is the arrow in the plot (OX)
 
-        # Plot DIRECTION ARROW in INTRONS if strand is known
-        dir_flag.append(
-            plot_direction(
+def plot_batched(
+    subdf,
+    axes,
+    fig,
+    chrmd_df_grouped,
+    genesmd_df,
+    ts_data,
+    id_col,
+    showinfo,
+    tag_background,
+    plot_border,
+    transcript_str,
+    text,
+    text_size,
+    exon_height,
+    exon_border,
+    transcript_utr_width,
+    arrow_intron_threshold,
+    arrow_color,
+    arrow_size_min,
+    arrow_size,
+    arrow_style,
+    arrow_width,
+):
+    """Plot the elements of all genes as one collection per element kind and subplot."""
+
+    # Get the geometry of all genes
+    items = get_items(subdf, genesmd_df, chrmd_df_grouped, id_col, exon_border)
+    items["gene_info"] = get_genes_info(items, "gene", items["strand"], "\n")
+    rows, utrs = get_rows(items, transcript_str, exon_height, transcript_utr_width)
+    rects = get_rects(rows, utrs, transcript_utr_width, showinfo, "\n")
+    introns = get_introns(items)
+    lines = get_intron_lines(introns, ts_data, chrmd_df_grouped)
+    arrows = get_arrows(
+        introns,
+        rows,
+        exon_height,
+        arrow_intron_threshold,
+        arrow_size,
+        arrow_size_min,
+    )
+
+    for chrom_ix, ax in enumerate(axes):
+        # Plot INTRON lines, continuous and shrinked
+        chrom_lines = lines[lines["chrom_ix"] == chrom_ix]
+        for dashed, linewidth, linestyle in [(False, 1, "-"), (True, 0.5, "--")]:
+            kind_lines = chrom_lines[chrom_lines["dashed"] == dashed]
+            if kind_lines.empty:
+                continue
+            segments = np.column_stack(
+                [
+                    kind_lines["x0"],
+                    kind_lines["gene_ix"],
+                    kind_lines["x1"],
+                    kind_lines["gene_ix"],
+                ]
+            ).reshape(-1, 2, 2)
+            intron_lines = LineCollection(
+                segments,
+                colors=kind_lines["gene_color"].tolist(),
+                linewidths=linewidth,
+                linestyles=linestyle,
+                zorder=1,
+            )
+            ax.add_collection(intron_lines)
+            get_hover_index(fig, tag_background).add(
                 ax,
-                strand,
-                intron_size,
-                intron_threshold,
-                start,
-                stop,
-                incl,
-                gene_ix,
-                exon_height,
-                arrow_color,
-                arrow_style,
-                arrow_width,
+                kind_lines["x0"],
+                kind_lines["x1"],
+                kind_lines["gene_ix"],
+                kind_lines["gene_ix"],
+                kind_lines["gene_info"],
             )
-        )
 
-    if 1 in dir_flag:
-        return 1
-    else:
-        return 0
+        # Plot EXONS and utrs as rectangles
+        chrom_rects = rects[rects["chrom_ix"] == chrom_ix]
+        if not chrom_rects.empty:
+            verts = np.column_stack(
+                [
+                    chrom_rects["x0"],
+                    chrom_rects["y0"],
+                    chrom_rects["x1"],
+                    chrom_rects["y0"],
+                    chrom_rects["x1"],
+                    chrom_rects["y1"],
+                    chrom_rects["x0"],
+                    chrom_rects["y1"],
+                ]
+            ).reshape(-1, 4, 2)
+            exon_rects = PolyCollection(
+                verts,
+                facecolors=chrom_rects["fillcolor"].tolist(),
+                edgecolors=chrom_rects["linecolor"].tolist(),
+                joinstyle="miter",
+                zorder=1,
+            )
+            ax.add_collection(exon_rects)
+            get_hover_index(fig, tag_background).add(
+                ax,
+                chrom_rects["x0"],
+                chrom_rects["x1"],
+                chrom_rects["y0"],
+                chrom_rects["y1"],
+                chrom_rects["info"],
+            )
+
+    # Plot DIRECTION ARROWS
+    plot_arrows(axes, arrows, arrow_color, arrow_style, arrow_width)
+
+    # Add ID annotations
+    if text:
+        texts = get_texts(rows, utrs, text)
+        for chrom_ix, x, y, ann in texts[["chrom_ix", "x", "y", "text"]].itertuples(
+            index=False
+        ):
+            axes[chrom_ix].annotate(
+                ann,
+                xy=(x, y),
+                horizontalalignment="right",
+                verticalalignment="center",
+                color=plot_border,
+                fontsize=text_size,
+            )
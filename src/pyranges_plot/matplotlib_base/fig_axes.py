@@ -155,8 +155,7 @@ def create_fig(
                 to_add_val += original_ticks
 
             # compute new coordinates of conserved previous ticks
-            to_add = to_add_val.copy()
-            to_add = cumdelting(to_add, ts_data, chrom)
+            to_add = cumdelting(to_add_val, ts_data, chrom).tolist()
 
             # set new ticks
             x_ticks_val = sorted(to_add)
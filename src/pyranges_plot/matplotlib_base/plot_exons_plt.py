@@ -2,43 +2,63 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from pyranges.core.names import CHROM_COL, START_COL, END_COL, STRAND_COL
 
-from .core import plt_popup_warning, coord2percent
+from .core import plt_popup_warning
 from .fig_axes import create_fig
 from .data2plot import (
     apply_gene_bridge,
     plot_introns,
+    plot_arrows,
+    plot_batched,
 )
-from ..names import PR_INDEX_COL, BORDER_COLOR_COL
+from ..data_preparation import subdf_detail
+from ..geometry import get_texts_by_row, get_items, get_rows, get_introns, get_arrows
+from ..profiling import stage
+from ..names import PR_INDEX_COL, BORDER_COLOR_COL, GENE_INFO_COL
 
 arrow_style = "round"
 
 
 def plot_exons_plt(
-    subdf,
-    tot_ngenes_l,
+    plan,
     feat_dict,
-    genesmd_df,
-    chrmd_df,
-    chrmd_df_grouped,
-    ts_data,
     legend_item_d,
-    id_col,
-    max_shown=25,
     transcript_str=False,
     tooltip=None,
     legend=False,
     y_labels=False,
     text=True,
     title_chr=None,
-    packed=True,
     to_file=None,
     file_size=None,
     warnings=None,
-    tick_pos_d=None,
-    ori_tick_pos_d=None,
 ):
     """Create Matplotlib plot."""
 
+    # Get prepared layout
+    subdf = plan.subdf
+    genesmd_df = plan.genesmd_df
+    chrmd_df = plan.chrmd_df
+    chrmd_df_grouped = plan.chrmd_df_grouped
+    ts_data = plan.ts_data
+    tick_pos_d = plan.tick_pos_d
+    ori_tick_pos_d = plan.ori_tick_pos_d
+    tot_ngenes_l = plan.tot_ngenes_l
+    id_col = plan.id_col
+    max_shown = plan.max_shown
+    packed = plan.packed
+
+    # Collapse genes too small to show their structure
+    with stage("detail") as counts:
+        subdf = subdf_detail(
+            subdf,
+            chrmd_df_grouped,
+            id_col,
+            feat_dict["detail"],
+            feat_dict["detail_threshold"],
+            file_size[0],
+        )
+        counts["rows"] = len(subdf)
+
     # Get default plot features
     tag_bkg = feat_dict["tag_bkg"]
     fig_bkg = feat_dict["fig_bkg"]
@@ -58,6 +78,7 @@ def plot_exons_plt(
     arrow_intron_threshold = feat_dict["arrow_intron_threshold"]
     shrinked_bkg = feat_dict["shrinked_bkg"]
     shrinked_alpha = feat_dict["shrinked_alpha"]
+    batched = feat_dict["batched"]
 
     # Create figure and axes
     # pixel in inches
@@ -65,59 +86,101 @@ def plot_exons_plt(
     x = file_size[0] * px
     y = file_size[1] * px
 
-    fig, axes = create_fig(
-        x,
-        y,
-        chrmd_df,
-        chrmd_df_grouped,
-        genesmd_df,
-        ts_data,
-        legend_item_d,
-        title_chr,
-        title_dict_plt,
-        plot_bkg,
-        plot_border,
-        grid_color,
-        packed,
-        legend,
-        y_labels,
-        tick_pos_d,
-        ori_tick_pos_d,
-        tag_bkg,
-        fig_bkg,
-        shrinked_bkg,
-        shrinked_alpha,
-        v_spacer,
-        exon_height,
-    )
-
-    # Plot genes
-    subdf.groupby(id_col + [PR_INDEX_COL], group_keys=False, observed=True).apply(
-        lambda subdf: gby_plot_exons(
-            subdf,
-            axes,
-            fig,
+    with stage("create_fig"):
+        fig, axes = create_fig(
+            x,
+            y,
             chrmd_df,
             chrmd_df_grouped,
             genesmd_df,
             ts_data,
-            id_col,
-            tooltip,
-            tag_bkg,
+            legend_item_d,
+            title_chr,
+            title_dict_plt,
+            plot_bkg,
             plot_border,
-            transcript_str,
-            text,
-            text_size,
+            grid_color,
+            packed,
+            legend,
+            y_labels,
+            tick_pos_d,
+            ori_tick_pos_d,
+            tag_bkg,
+            fig_bkg,
+            shrinked_bkg,
+            shrinked_alpha,
+            v_spacer,
             exon_height,
-            exon_border,
-            transcript_utr_width,
-            arrow_intron_threshold,
-            arrow_line_width,
-            arrow_color,
-            arrow_size_min,
-            arrow_size,
         )
-    )
+
+    # Plot genes
+    with stage("draw") as counts:
+        if batched:
+            plot_batched(
+                subdf,
+                axes,
+                fig,
+                chrmd_df_grouped,
+                genesmd_df,
+                ts_data,
+                id_col,
+                tooltip,
+                tag_bkg,
+                plot_border,
+                transcript_str,
+                text,
+                text_size,
+                exon_height,
+                exon_border,
+                transcript_utr_width,
+                arrow_intron_threshold,
+                arrow_color,
+                arrow_size_min,
+                arrow_size,
+                arrow_style,
+                arrow_line_width,
+            )
+        else:
+            subdf = get_texts_by_row(subdf, id_col, tooltip, text, "\n")
+            subdf.groupby(
+                id_col + [PR_INDEX_COL], group_keys=False, observed=True
+            ).apply(
+                lambda subdf: gby_plot_exons(
+                    subdf,
+                    axes,
+                    fig,
+                    chrmd_df,
+                    chrmd_df_grouped,
+                    genesmd_df,
+                    ts_data,
+                    id_col,
+                    tag_bkg,
+                    plot_border,
+                    transcript_str,
+                    text,
+                    text_size,
+                    exon_height,
+                    exon_border,
+                    transcript_utr_width,
+                )
+            )
+
+            # Plot DIRECTION ARROWS of all genes at once
+            items = get_items(subdf, genesmd_df, chrmd_df_grouped, id_col, exon_border)
+            rows, _ = get_rows(items, transcript_str, exon_height, transcript_utr_width)
+            arrows = get_arrows(
+                get_introns(items),
+                rows,
+                exon_height,
+                arrow_intron_threshold,
+                arrow_size,
+                arrow_size_min,
+            )
+            plot_arrows(axes, arrows, arrow_color, arrow_style, arrow_line_width)
+        counts["artists"] = sum(
+            len(ax.patches) + len(ax.lines) + len(ax.collections) + len(ax.texts)
+            for ax in axes
+        )
 
     # Prevent zoom in y axis
     # for ax in axes:
@@ -139,7 +202,8 @@ def plot_exons_plt(
                 )
         plt.show()
     else:
-        plt.savefig(to_file, format=to_file[-3:], dpi=400)
+        with stage("export"):
+            plt.savefig(to_file, format=to_file[-3:], dpi=400)
 
 
 def gby_plot_exons(
@@ -151,7 +215,6 @@ def gby_plot_exons(
     genesmd_df,
     ts_data,
     id_col,
-    showinfo,
     tag_bkg,
     plot_border,
     transcript_str,
@@ -160,11 +223,6 @@ def gby_plot_exons(
     exon_height,
     exon_border,
     transcript_utr_width,
-    arrow_intron_threshold,
-    arrow_line_width,
-    arrow_color,
-    arrow_size_min,
-    arrow_size,
 ):
     """Plot elements corresponding to the df rows of one gene."""
 
@@ -192,11 +250,8 @@ def gby_plot_exons(
         strand = ""
 
     # Make gene annotation
-    # get the gene information to print on hover
-    if strand:
-        geneinfo = f"[{strand}] ({min(df.__oriStart__)}, {max(df.__oriEnd__)})\nID: {genename}"  # default with strand
-    else:
-        geneinfo = f"({min(df.__oriStart__)}, {max(df.__oriEnd__)})\nID: {genename}"  # default without strand
+    # get the gene information to print on hover, made for all genes at once
+    geneinfo = df[GENE_INFO_COL].iloc[0]
 
     # Plot INTRON lines
     sorted_exons = df[[START_COL, END_COL]].sort_values(by=START_COL)
@@ -206,12 +261,7 @@ def gby_plot_exons(
     else:
         ts_chrom = pd.DataFrame()
 
-    if isinstance(arrow_intron_threshold, int):
-        arrow_intron_threshold = coord2percent(ax, 0, arrow_intron_threshold)
-    if isinstance(arrow_size, int):
-        arrow_size = coord2percent(ax, 0, arrow_size)
-
-    dir_flag = plot_introns(
+    plot_introns(
         sorted_exons,
         ts_chrom,
         fig,
@@ -220,13 +270,6 @@ def gby_plot_exons(
         tag_bkg,
         gene_ix,
         exon_border,
-        strand,
-        arrow_intron_threshold,
-        exon_height,
-        arrow_color,
-        arrow_style,
-        arrow_line_width,
-        arrow_size,
     )
 
     # Plot the gene rows as EXONS
@@ -244,12 +287,6 @@ def gby_plot_exons(
         tag_bkg,
         plot_border,
         genename,
-        showinfo,
         exon_height,
         transcript_utr_width,
-        arrow_size_min,
-        arrow_color,
-        arrow_style,
-        arrow_line_width,
-        dir_flag,
     )
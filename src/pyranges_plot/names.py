@@ -19,3 +19,6 @@ COLOR_INFO = "__color_col__"
 BORDER_COLOR_COL = "__exon_border__"
 EXON_IX_COL = "__exon_ix__"
 TEXT_PAD_COL = "__text_pad__"
+ROW_INFO_COL = "__row_info__"
+GENE_INFO_COL = "__gene_info__"
+TEXT_COL = "__text__"
@@ -23,15 +23,40 @@ plot_features_dict = {
         "Minimum size of the arrow to plot direction in exons if necessary. Provided as a float corresponding to the plot fraction.",
         " ",
     ),
+    "batched": (
+        False,
+        "Whether to draw all the intervals, introns and arrows of a plot as Matplotlib collections or Plotly traces shared by elements of the same style, instead of individual elements. Faster for plots with many genes.",
+        " ",
+    ),
+    "browse": (
+        False,
+        "Whether the Plotly app should plot again the intervals of the visible window when zooming or panning, so that up to “max_shown” genes are shown within it.",
+        " ",
+    ),
     "colormap": (
         "Alphabet",
         "Sequence of colors to assign to every group of intervals sharing the same “color_col” value. It can be provided as a Matplotlib colormap, a Plotly color sequence (built as lists), a string naming the previously mentioned color objects from Matplotlib and Plotly, or a dictionary with the following structure {color_column_value1: color1, color_column_value2: color2, ...}. When a specific color_col value is not specified in the dictionary it will be colored in black.",
         " ",
     ),
+    "detail": (
+        "full",
+        "Level of detail of the genes. Use 'full' to draw all their intervals, 'genes' to draw each gene as one interval spanning it, or 'auto' to draw as one interval only the genes with less than “detail_threshold” pixels per interval in the plot.",
+        " ",
+    ),
+    "detail_threshold": (
+        2,
+        "Minimum number of pixels per interval of a gene to draw all its intervals when “detail” is 'auto'.",
+        " ",
+    ),
     "exon_border": (None, "Color of the interval's rectangle border.", " "),
     "exon_height": (0.6, "Height of the exon rectangle in the plot.", " "),
     "fig_bkg": ("white", "Bakground color of the whole figure.", " "),
     "grid_color": ("lightgrey", "Color of x coordinates grid lines.", " "),
+    "layout_cache_size": (
+        0,
+        "Number of prepared layouts kept in memory to be reused when plotting the same data with the same layout parameters, only changing other options. 0 disables the cache.",
+        " ",
+    ),
     "plot_bkg": ("white", "Background color of the plots.", " "),
     "plot_border": ("black", "Color of the line delimiting the plots.", " "),
     "plotly_port": (8050, "Port to run plotly app.", " "),
@@ -64,6 +89,16 @@ plot_features_dict = {
     "title_color": ("black", "Color of the plots' titles.", " "),
     "title_size": (18, "Size of the plots' titles.", " "),
     "v_spacer": (0.5, "Vertical distance between the intervals and plot border.", " "),
+    "webgl": (
+        None,
+        "Whether to draw the Plotly plot with WebGL traces, which keeps pan and zoom smooth for many intervals. WebGL plots are always batched. When None, WebGL is used if the number of intervals is over “webgl_threshold”.",
+        " ",
+    ),
+    "webgl_threshold": (
+        20000,
+        "Number of plotted intervals over which Plotly plots use WebGL, if “webgl” is None.",
+        " ",
+    ),
 }
 
 # Normal (light theme)
@@ -1,46 +1,543 @@
+import copy
+from collections import namedtuple
+
+import numpy as np
 import pandas as pd
-from matplotlib.patches import Rectangle
+from pyranges.core.names import (
+    CHROM_COL,
+    END_COL,
+    START_COL,
+)
 
 # import pyranges as pr
 from .core import (
-    get_id_col,
     get_engine,
-    print_options,
+    get_id_col,
     get_options,
-    get_warnings,
-    set_theme,
     get_theme,
+    get_warnings,
+    print_options,
     set_options,
+    set_theme,
 )
 from .data_preparation import (
-    make_subset,
-    get_genes_metadata,
-    get_chromosome_metadata,
+    cache_layout,
     compute_thresh,
     compute_tpad,
+    get_cached_layout,
+    get_chromosome_metadata,
+    get_genes_metadata,
+    layout_key,
+    make_subset,
+    parse_region,
+    region_subset,
     subdf_assigncolor,
 )
 from .introns_off import introns_resize, recalc_axis
-from .matplotlib_base.plot_exons_plt import plot_exons_plt
-from .plotly_base.plot_exons_ply import plot_exons_ply
-from pyranges.core.names import (
-    CHROM_COL,
-    START_COL,
-    END_COL,
-)
 from .names import (
-    PR_INDEX_COL,
-    ORISTART_COL,
-    ORIEND_COL,
-    SHRTHRES_COL,
-    ADJSTART_COL,
     ADJEND_COL,
+    ADJSTART_COL,
+    COLOR_INFO,
+    COLOR_TAG_COL,
     CUM_DELTA_COL,
     EXON_IX_COL,
+    ORIEND_COL,
+    ORISTART_COL,
+    PR_INDEX_COL,
+    SHRTHRES_COL,
     TEXT_PAD_COL,
-    COLOR_TAG_COL,
-    COLOR_INFO,
 )
+from .profiling import profiling, stage
+from .read_files import PLOT_COLUMNS, is_file, read_annotation, template_columns
+
+
+class EmptyDataError(Exception):
+    """Raised when there are no intervals left to plot."""
+
+
+# plot features used to compute the layout, fixed once it is prepared
+LAYOUT_FEATURES = [
+    "colormap",
+    "exon_border",
+    "exon_height",
+    "v_spacer",
+    "text_pad",
+    "shrink_threshold",
+]
+
+
+class LayoutPlan(
+    namedtuple(
+        "LayoutPlan",
+        [
+            "subdf",
+            "genesmd_df",
+            "chrmd_df",
+            "chrmd_df_grouped",
+            "ts_data",
+            "tick_pos_d",
+            "ori_tick_pos_d",
+            "tot_ngenes_l",
+            "id_col",
+            "max_shown",
+            "packed",
+            "layout_feat",
+        ],
+    )
+):
+    """Data and metadata of a plot prepared by prepare_layout, not to be modified."""
+
+    __slots__ = ()
+
+    def copy(self):
+        """Provide a plan with copies of the data and metadata, independent from this one."""
+
+        return self._replace(
+            subdf=self.subdf.copy(),
+            genesmd_df=self.genesmd_df.copy(),
+            chrmd_df=self.chrmd_df.copy(),
+            chrmd_df_grouped=self.chrmd_df_grouped.copy(),
+            ts_data={chrom: ts.copy() for chrom, ts in self.ts_data.items()},
+            tick_pos_d=copy.deepcopy(self.tick_pos_d),
+            ori_tick_pos_d=copy.deepcopy(self.ori_tick_pos_d),
+            tot_ngenes_l=list(self.tot_ngenes_l),
+            layout_feat=copy.deepcopy(self.layout_feat),
+        )
+
+
+def get_feat_dict(theme, kargs):
+    """Provide plot features given as kargs, by the theme or set as options."""
+
+    # Deal with plot features as kargs
+    wrong_keys = [k for k in kargs if k not in print_options(return_keys=True)]
+    if wrong_keys:
+        raise Exception(
+            f"The following keys do not match any customizable features: {wrong_keys}.\nCheck the customizable variable names using the print_options function."
+        )
+
+    def getvalue(key):
+        if key in kargs:
+            value = kargs[key]
+            return value  ## add invalid data type??
+        else:
+            return get_options(key)
+
+    # Get default plot features
+    # store old options to reset them after the plot
+    oldtheme = get_theme()
+    oldfeat_dict = get_options("values")
+
+    # check option modifications in params
+    if theme is None:  # not specified in params, check if it was set
+        theme = get_theme()
+    set_theme(theme)
+
+    feat_dict = {
+        "colormap": getvalue("colormap"),
+        "tag_bkg": getvalue("tag_bkg"),
+        "fig_bkg": getvalue("fig_bkg"),
+        "plot_bkg": getvalue("plot_bkg"),
+        "plot_border": getvalue("plot_border"),
+        "title_dict_plt": {
+            "family": "sans-serif",
+            "color": getvalue("title_color"),
+            "size": int(getvalue("title_size")) - 5,
+        },
+        "title_dict_ply": {
+            "family": "Arial",
+            "color": getvalue("title_color"),
+            "size": int(getvalue("title_size")),
+        },
+        "grid_color": getvalue("grid_color"),
+        "exon_border": getvalue("exon_border"),
+        "exon_height": float(getvalue("exon_height")),
+        "transcript_utr_width": 0.3 * float(getvalue("exon_height")),
+        "v_spacer": getvalue("v_spacer"),
+        "text_size": float(getvalue("text_size")),
+        "text_pad": getvalue("text_pad"),
+        "plotly_port": getvalue("plotly_port"),
+        "arrow_line_width": float(getvalue("arrow_line_width")),
+        "arrow_color": getvalue("arrow_color"),
+        "arrow_size_min": float(getvalue("arrow_size_min")),
+        "arrow_size": float(getvalue("arrow_size")),
+        "arrow_intron_threshold": getvalue("arrow_intron_threshold"),
+        "shrink_threshold": getvalue("shrink_threshold"),
+        "shrinked_bkg": getvalue("shrinked_bkg"),
+        "shrinked_alpha": float(getvalue("shrinked_alpha")),
+        "batched": getvalue("batched"),
+        "webgl": getvalue("webgl"),
+        "webgl_threshold": int(getvalue("webgl_threshold")),
+        "browse": getvalue("browse"),
+        "detail": getvalue("detail"),
+        "detail_threshold": float(getvalue("detail_threshold")),
+    }
+
+    # restore options set before plot is called
+    set_theme(oldtheme)
+    set_options(oldfeat_dict)
+
+    return feat_dict
+
+
+def prepare_layout(
+    data,
+    *,
+    id_col=None,
+    max_shown=25,
+    packed=True,
+    color_col=None,
+    shrink=False,
+    limits=None,
+    region=None,
+    ids=None,
+    features=None,
+    theme=None,
+    columns=None,
+    **kargs,
+):
+    """
+    Compute the layout of a genes plot once, to render it with plot as many times as needed.
+
+    Parameters
+    ----------
+    data: {pyranges.PyRanges, str or list of them}
+        Pyranges, derived dataframe, annotation file or list of them with annotation data.
+
+    id_col, max_shown, packed, color_col, shrink, limits, region, ids, features, theme
+        As in plot.
+
+    columns: list, default None
+        Columns used besides the plotted ones, such as those in tooltip or text. If given, the rest of columns are
+        dropped before computing the layout and not read from annotation files, otherwise all are kept.
+
+    **kargs
+        Customizable plot features. Those defining the layout (colormap, exon_border, exon_height, v_spacer,
+        text_pad and shrink_threshold) are stored in the plan and used whenever it is plotted, the rest are
+        ignored. If layout_cache_size is set, the plan is stored and returned again for the same data content and
+        layout parameters, also when calling plot. The data content is compared through a hash of all its values.
+
+    Returns
+    -------
+    LayoutPlan
+        Prepared data and metadata to be given to plot instead of the data. Changing the theme, tooltip, text,
+        engine or export file of the plot does not need a new plan.
+
+    Examples
+    --------
+
+    >>> import pyranges as pr, pyranges_plot as prp
+
+    >>> p = pr.PyRanges({"Chromosome": [1]*5, "Strand": ["+"]*3 + ["-"]*2, "Start": [10,20,30,25,40], "End": [15,25,35,30,50], "transcript_id": ["t1"]*3 + ["t2"]*2})
+
+    >>> plan = prp.prepare_layout(p, id_col="transcript_id", shrink=True)
+
+    >>> prp.plot(plan, to_file="my_plot.png")
+
+    >>> prp.plot(plan, theme="dark", to_file="my_plot.pdf")
+    """
+
+    # Treat input data as list
+    if not isinstance(data, list):
+        data = [data]
+
+    # Deal with id column
+    if id_col is None:
+        ID_COL = get_id_col()
+    else:
+        ID_COL = id_col
+    # treat as list
+    if isinstance(ID_COL, str):
+        ID_COL = [ID_COL]
+
+    # Read annotation files, only the region and the needed columns
+    if region is not None:
+        region = parse_region(region)
+    if any(is_file(df_item) for df_item in data):
+        read_cols = [color_col] if isinstance(color_col, str) else color_col or []
+        read_cols = list(read_cols) + list(columns or [])
+        with stage("read") as counts:
+            data = [
+                read_annotation(
+                    df_item,
+                    columns=read_cols,
+                    region=region,
+                    id_col=ID_COL,
+                    ids=ids,
+                    features=features,
+                )
+                if is_file(df_item)
+                else df_item
+                for df_item in data
+            ]
+            counts["rows"] = sum(len(df_item) for df_item in data)
+
+    for df_item in data:
+        for id_str in ID_COL:
+            if id_str is not None and id_str not in df_item.columns:
+                raise Exception(
+                    "Please define a correct name of the ID column using either set_id_col() function or plot_generic parameter as plot_generic(..., id_col = 'your_id_col')"
+                )
+
+    # PREPARE DATA for plot
+    feat_dict = get_feat_dict(theme, kargs)
+    shrink_threshold = feat_dict["shrink_threshold"]
+    colormap = feat_dict["colormap"]
+    layout_feat = {key: feat_dict[key] for key in LAYOUT_FEATURES}
+
+    # Look for the same layout in cache if enabled, regardless of theme
+    key = None
+    cache_size = int(kargs.get("layout_cache_size", get_options("layout_cache_size")))
+    if cache_size:
+        try:
+            key = layout_key(
+                [
+                    data,
+                    ID_COL,
+                    max_shown,
+                    packed,
+                    color_col,
+                    shrink,
+                    limits,
+                    region,
+                    ids,
+                    features,
+                    columns,
+                    layout_feat,
+                    get_engine(),
+                    get_warnings(),
+                ]
+            )
+        except TypeError:  # data not hashable, do not cache
+            pass
+        else:
+            with stage("layout_cache") as counts:
+                plan = get_cached_layout(key)
+                counts["hit"] = plan is not None
+            # changes to the returned plan do not reach the cache
+            if plan is not None:
+                return plan.copy()
+
+    # Columns used by the plot, None to keep all
+    if columns is not None:
+        used_cols = PLOT_COLUMNS + [col for col in ID_COL if col is not None]
+        used_cols += [color_col] if isinstance(color_col, str) else color_col or []
+        used_cols = set(used_cols + list(columns) + ["__id_col__"])
+
+    # Make DataFrame subset if needed
+    with stage("subset") as counts:
+        df_d = {}
+        tot_ngenes_l = []
+        for pr_ix, df_item in enumerate(data):
+            # keep intervals in region
+            if region is not None:
+                df_item = region_subset(df_item, region)
+
+            # keep intervals of the ids and features given
+            if ids is not None:
+                if ID_COL is None or len(ID_COL) != 1:
+                    raise ValueError("Selecting ids requires a single id_col.")
+                df_item = df_item[df_item[ID_COL[0]].isin(ids)]
+            if features is not None:
+                df_item = df_item[df_item["Feature"].isin(features)]
+
+            # deal with empty PyRanges
+            if df_item.empty:
+                continue
+
+            # consider not known id_col, plot each interval individually
+            if ID_COL is None:
+                ids = pd.DataFrame({"__id_col__": np.arange(len(df_item)).astype(str)})
+                ids, tot_ngenes = make_subset(ids, "__id_col__", max_shown)
+                df_d[pr_ix] = df_item.iloc[ids.index].assign(
+                    __id_col__=ids["__id_col__"].to_numpy()
+                )
+                tot_ngenes_l.append(tot_ngenes)
+
+            # known id_col
+            else:
+                df_d[pr_ix], tot_ngenes = make_subset(df_item, ID_COL, max_shown)
+                tot_ngenes_l.append(tot_ngenes)
+
+            # drop the columns not used before copying the data
+            if columns is not None:
+                df_d[pr_ix] = df_d[pr_ix][
+                    [col for col in df_d[pr_ix].columns if col in used_cols]
+                ]
+
+        # set not known id_col as assigned name
+        if ID_COL is None:
+            ID_COL = ["__id_col__"]
+
+        # concat subset dataframes and create new column with input list index
+        if not df_d:
+            raise EmptyDataError("The provided PyRanges object/s are empty.")
+        subdf = pd.concat(df_d, names=[PR_INDEX_COL]).reset_index(
+            level=PR_INDEX_COL
+        )  ### change to pr but doesn't work yet!!
+        counts["rows"] = len(subdf)
+
+        # chromosome and ids as categories for the grouping and sorting to come
+        for col in [CHROM_COL] + ID_COL:
+            if subdf[col].dtype == object:
+                subdf[col] = subdf[col].astype("category")
+
+        # coordinates as int32 when they fit
+        int32 = np.iinfo(np.int32)
+        for col in [START_COL, END_COL]:
+            coords = subdf[col]
+            if (
+                isinstance(coords.dtype, np.dtype)
+                and coords.dtype.kind == "i"
+                and coords.dtype.itemsize > 4
+                and coords.between(int32.min, int32.max).all()
+            ):
+                subdf[col] = coords.astype(np.int32)
+
+    # plot the region if no limits given
+    if region is not None and limits is None:
+        limits = {
+            chrom: region[str(chrom)] for chrom in subdf[CHROM_COL].drop_duplicates()
+        }
+
+    # group id_cols in one column to count genes in chrmd
+    if len(ID_COL) > 1:
+        subdf["__id_col_2count__"] = list(zip(*[subdf[c] for c in ID_COL]))
+    else:
+        subdf["__id_col_2count__"] = subdf[ID_COL[0]]
+
+    # Store color information in data
+    # color_col as list
+    if color_col is None:
+        color_col = ID_COL
+    elif isinstance(color_col, str):
+        color_col = [color_col]
+
+    with stage("colors"):
+        subdf = subdf_assigncolor(subdf, colormap, color_col, feat_dict["exon_border"])
+
+    # Create genes metadata DataFrame
+    with stage("genes_metadata") as counts:
+        genesmd_df = get_genes_metadata(
+            subdf,
+            ID_COL,
+            color_col,
+            packed,
+            feat_dict["exon_height"],
+            feat_dict["v_spacer"],
+        )
+        counts["genes"] = len(genesmd_df)
+
+    # Create chromosome metadata DataFrame
+    with stage("chromosome_metadata") as counts:
+        chrmd_df, chrmd_df_grouped = get_chromosome_metadata(
+            subdf,
+            limits,
+            genesmd_df,
+            packed,
+            feat_dict["v_spacer"],
+            feat_dict["exon_height"],
+        )
+        counts["rows"] = len(chrmd_df)
+
+    # Deal with introns off
+    # adapt coordinates to shrinked
+    ts_data = {}
+    subdf[ORISTART_COL] = subdf[START_COL]
+    subdf[ORIEND_COL] = subdf[END_COL]
+    tick_pos_d = {}
+    ori_tick_pos_d = {}
+
+    if shrink:
+        with stage("shrink"):
+            # compute threshold
+            if isinstance(shrink_threshold, int):
+                subdf[SHRTHRES_COL] = [shrink_threshold] * len(subdf)
+            elif isinstance(shrink_threshold, float):
+                subdf[SHRTHRES_COL] = [shrink_threshold] * len(subdf)
+                subdf = subdf.groupby(CHROM_COL, group_keys=False, observed=True).apply(
+                    lambda x: (
+                        compute_thresh(x, chrmd_df_grouped) if not x.empty else None
+                    )
+                )
+
+            subdf = introns_resize(subdf, ts_data)
+            subdf[START_COL] = subdf[ADJSTART_COL]
+            subdf[END_COL] = subdf[ADJEND_COL]
+
+            # recompute limits
+            chrmd_df, chrmd_df_grouped = get_chromosome_metadata(
+                subdf,
+                limits,
+                genesmd_df,
+                packed,
+                feat_dict["v_spacer"],
+                feat_dict["exon_height"],
+                ts_data=ts_data,
+            )
+
+            # compute new axis values and positions if needed
+            if ts_data:
+                tick_pos_d, ori_tick_pos_d = recalc_axis(
+                    ts_data, tick_pos_d, ori_tick_pos_d
+                )
+
+    else:
+        subdf[CUM_DELTA_COL] = [0] * len(subdf)
+
+    # Sort data to plot chromosomes and pr objects in order
+    with stage("arrange"):
+        subdf.sort_values(
+            [CHROM_COL, PR_INDEX_COL] + ID_COL + [START_COL], inplace=True
+        )
+        chrmd_df.sort_values([CHROM_COL, PR_INDEX_COL], inplace=True)
+        subdf[EXON_IX_COL] = subdf.groupby(
+            [CHROM_COL, PR_INDEX_COL] + ID_COL, group_keys=False, observed=True
+        ).cumcount()
+        genesmd_df.sort_index(inplace=True)
+
+        # Deal with text_pad
+        text_pad = feat_dict["text_pad"]
+        if isinstance(text_pad, int):
+            subdf[TEXT_PAD_COL] = [text_pad] * len(subdf)
+        elif isinstance(text_pad, float):
+            subdf[TEXT_PAD_COL] = [text_pad] * len(subdf)
+            subdf = subdf.groupby(CHROM_COL, group_keys=False, observed=True).apply(
+                lambda x: compute_tpad(x, chrmd_df_grouped) if not x.empty else None
+            )
+
+    # print("genesmd")
+    # print(genesmd_df)
+    # print("\n\n")
+    # print("chrmd")
+    # print(chrmd_df)
+    # print("\n\n")
+    # print("grouped_chrmd")
+    # print(chrmd_df_grouped)
+    # print("\n\n")
+    # print("original data")
+    # print(data)
+    # print("\n\n")
+    # print("data used for plotting")
+    # print(subdf)
+
+    plan = LayoutPlan(
+        subdf=subdf,
+        genesmd_df=genesmd_df,
+        chrmd_df=chrmd_df,
+        chrmd_df_grouped=chrmd_df_grouped,
+        ts_data=ts_data,
+        tick_pos_d=tick_pos_d,
+        ori_tick_pos_d=ori_tick_pos_d,
+        tot_ngenes_l=tot_ngenes_l,
+        id_col=ID_COL,
+        max_shown=max_shown,
+        packed=packed,
+        layout_feat=layout_feat,
+    )
+    if key is not None:
+        cache_layout(key, plan.copy(), cache_size)
+
+    return plan
 
 
 def plot(
@@ -53,6 +550,9 @@ def plot(
     color_col=None,
     shrink=False,
     limits=None,
+    region=None,
+    ids=None,
+    features=None,
     thick_cds=False,
     text=False,
     legend=False,
@@ -61,6 +561,7 @@ def plot(
     tooltip=None,
     to_file=None,
     theme=None,
+    profile=False,
     **kargs,
 ):
     """
@@ -68,8 +569,12 @@ def plot(
 
     Parameters
     ----------
-    data: {pyranges.PyRanges or list of pyranges.PyRanges}
-        Pyranges, derived dataframe or list of them with annotation data.
+    data: {pyranges.PyRanges, str, list of them or LayoutPlan}
+        Pyranges, derived dataframe, annotation file or list of them with annotation data. GTF, GFF3 and BED files
+        are scanned keeping only the intervals in region, ids and features and the columns used by the plot. A
+        layout prepared with prepare_layout can be given instead to skip its computation, then id_col, max_shown,
+        packed, color_col, shrink, limits, region, ids, features and the layout plot features are the ones given
+        to prepare_layout.
 
     id_col: str, default None
         Name of the column containing gene ID.
@@ -102,6 +607,22 @@ def plot(
         in the pyranges object defined as limits. If some plotted chromosomes are not present they
         will be left as default.
 
+    region: {None, str, dict}, default None
+        Genomic window to plot, as a 'chrom:start-end' or 'chrom' string or as a dict {chr_name: (start, end), ...}
+        where a coordinate or the whole window can be None to leave it unbounded. String coordinates are 1-based
+        and inclusive, like in genome browsers, while dict ones are 0-based like the data. Only the intervals
+        overlapping it are used, found through a sorted index of the data which is reused while its coordinate
+        columns are not set again. After changing coordinate values in place, call clear_region_index. If limits
+        are not given, the region is used as limits.
+
+    ids: list, default None
+        Values of id_col to plot, requiring a single id_col. Annotation files are scanned keeping only their
+        intervals.
+
+    features: list, default None
+        Values of the Feature column to plot, like ['exon', 'CDS']. Annotation files are scanned keeping only
+        their intervals.
+
     thick_cds: bool, default False
         Display differentially transcript regions belonging and not belonging to CDS. The CDS/exon information
         must be stored in the 'Feature' column of the PyRanges object or the dataframe.
@@ -137,6 +658,11 @@ def plot(
     theme: str, default "light"
         General color appearance of the plot. Available modes: "light", "dark".
 
+    profile: bool, default False
+        Whether to record the wall time, peak memory and counts of rows, genes, artists or traces of each stage
+        of the plot. The profile is returned, its to_frame method gives a DataFrame and its log method emits it
+        to the 'pyranges_plot' logger. Memory is traced while profiling, which makes the plot slower.
+
     **kargs
         Customizable plot features can be defined using kargs. Use print_options() function to check the variables'
         nomenclature, description and default values.
@@ -158,9 +684,42 @@ def plot(
 
     >>> plot(p, engine='plotly', id_col="transcript_id", shrink=True, tooltip = "Feature1: {feature1}")
 
+    >>> plot(p, engine='plt', id_col="transcript_id", region="1:20-40")
+
+    >>> plot(prepare_layout(p, id_col="transcript_id"), engine='plt', theme="dark")
+
     >>> plot(data, engine='plt', id_col="transcript_id", color_col='Strand', packed=False, to_file='my_plot.pdf')
+
+    >>> plot(p, id_col="transcript_id", to_file='my_plot.png', profile=True).to_frame()
     """
 
+    # Record the stages of the plot if profiling
+    if profile:
+        with profiling() as plot_profile:
+            plot(
+                data,
+                id_col=id_col,
+                warnings=warnings,
+                max_shown=max_shown,
+                packed=packed,
+                color_col=color_col,
+                shrink=shrink,
+                limits=limits,
+                region=region,
+                ids=ids,
+                features=features,
+                thick_cds=thick_cds,
+                text=text,
+                legend=legend,
+                title_chr=title_chr,
+                y_labels=y_labels,
+                tooltip=tooltip,
+                to_file=to_file,
+                theme=theme,
+                **kargs,
+            )
+        return plot_profile
+
     # Treat input data as list
     if not isinstance(data, list):
         data = [data]
@@ -188,29 +747,31 @@ def plot(
     else:
         file_size = (1600, 800)
 
-    # Deal with id column
-    if id_col is None:
-        ID_COL = get_id_col()
+    # Deal with layout, prepare it if not given
+    if len(data) == 1 and isinstance(data[0], LayoutPlan):
+        plan = data[0]
     else:
-        ID_COL = id_col
-    # treat as list
-    if isinstance(ID_COL, str):
-        ID_COL = [ID_COL]
-
-    for df_item in data:
-        for id_str in ID_COL:
-            if id_str is not None and id_str not in df_item.columns:
-                raise Exception(
-                    "Please define a correct name of the ID column using either set_id_col() function or plot_generic parameter as plot_generic(..., id_col = 'your_id_col')"
-                )
+        plan = prepare_layout(
+            data,
+            id_col=id_col,
+            max_shown=max_shown,
+            packed=packed,
+            color_col=color_col,
+            shrink=shrink,
+            limits=limits,
+            region=region,
+            ids=ids,
+            features=features,
+            theme=theme,
+            columns=template_columns(tooltip, text),
+            **kargs,
+        )
 
     # Deal with transcript structure
-    if thick_cds:
-        for df_item in data:
-            if "Feature" not in df_item.columns:
-                raise Exception(
-                    "The transcript structure information must be stored in 'Feature' column of the data."
-                )
+    if thick_cds and "Feature" not in plan.subdf.columns:
+        raise Exception(
+            "The transcript structure information must be stored in 'Feature' column of the data."
+        )
 
     # Deal with warnings
     if warnings is None:
@@ -219,219 +780,19 @@ def plot(
     # Deal with engine
     engine = get_engine()
 
-    # PREPARE DATA for plot
-    # Deal with plot features as kargs
-    wrong_keys = [k for k in kargs if k not in print_options(return_keys=True)]
-    if wrong_keys:
-        raise Exception(
-            f"The following keys do not match any customizable features: {wrong_keys}.\nCheck the customizable variable names using the print_options function."
-        )
-
-    def getvalue(key):
-        if key in kargs:
-            value = kargs[key]
-            return value  ## add invalid data type??
-        else:
-            return get_options(key)
-
-    # Get default plot features
-    # store old options to reset them after the plot
-    oldtheme = get_theme()
-    oldfeat_dict = get_options("values")
+    # Get plot features, keeping the ones the layout was computed with
+    feat_dict = get_feat_dict(theme, {**kargs, **plan.layout_feat})
 
-    # check option modifications in params
-    if theme is None:  # not specified in params, check if it was set
-        theme = get_theme()
-    set_theme(theme)
-
-    feat_dict = {
-        "colormap": getvalue("colormap"),
-        "tag_bkg": getvalue("tag_bkg"),
-        "fig_bkg": getvalue("fig_bkg"),
-        "plot_bkg": getvalue("plot_bkg"),
-        "plot_border": getvalue("plot_border"),
-        "title_dict_plt": {
-            "family": "sans-serif",
-            "color": getvalue("title_color"),
-            "size": int(getvalue("title_size")) - 5,
-        },
-        "title_dict_ply": {
-            "family": "Arial",
-            "color": getvalue("title_color"),
-            "size": int(getvalue("title_size")),
-        },
-        "grid_color": getvalue("grid_color"),
-        "exon_border": getvalue("exon_border"),
-        "exon_height": float(getvalue("exon_height")),
-        "transcript_utr_width": 0.3 * float(getvalue("exon_height")),
-        "v_spacer": getvalue("v_spacer"),
-        "text_size": float(getvalue("text_size")),
-        "text_pad": getvalue("text_pad"),
-        "plotly_port": getvalue("plotly_port"),
-        "arrow_line_width": float(getvalue("arrow_line_width")),
-        "arrow_color": getvalue("arrow_color"),
-        "arrow_size_min": float(getvalue("arrow_size_min")),
-        "arrow_size": float(getvalue("arrow_size")),
-        "arrow_intron_threshold": getvalue("arrow_intron_threshold"),
-        "shrink_threshold": getvalue("shrink_threshold"),
-        "shrinked_bkg": getvalue("shrinked_bkg"),
-        "shrinked_alpha": float(getvalue("shrinked_alpha")),
-    }
-    shrink_threshold = feat_dict["shrink_threshold"]
-    colormap = feat_dict["colormap"]
-
-    # restore options set before plot is called
-    set_theme(oldtheme)
-    set_options(oldfeat_dict)
-
-    # Make DataFrame subset if needed
-    df_d = {}
-    tot_ngenes_l = []
-    for pr_ix, df_item in enumerate(data):
-        # deal with empty PyRanges
-        if df_item.empty:
-            continue
-        df_item = df_item.copy()
-
-        # consider not known id_col, plot each interval individually
-        if ID_COL is None:
-            df_item["__id_col__"] = [str(i) for i in range(len(df_item))]
-            df_d[pr_ix], tot_ngenes = make_subset(df_item, "__id_col__", max_shown)
-            tot_ngenes_l.append(tot_ngenes)
-
-        # known id_col
-        else:
-            df_d[pr_ix], tot_ngenes = make_subset(df_item, ID_COL, max_shown)
-            tot_ngenes_l.append(tot_ngenes)
-
-    # set not known id_col as assigned name
-    if ID_COL is None:
-        ID_COL = ["__id_col__"]
-
-    # concat subset dataframes and create new column with input list index
-    if not df_d:
-        raise Exception("The provided PyRanges object/s are empty.")
-    subdf = pd.concat(df_d, names=[PR_INDEX_COL]).reset_index(
-        level=PR_INDEX_COL
-    )  ### change to pr but doesn't work yet!!
-
-    # group id_cols in one column to count genes in chrmd
-    if len(ID_COL) > 1:
-        subdf["__id_col_2count__"] = list(zip(*[subdf[c] for c in ID_COL]))
-    else:
-        subdf["__id_col_2count__"] = subdf[ID_COL[0]]
-
-    # Store color information in data
-    # color_col as list
-    if color_col is None:
-        color_col = ID_COL
-    elif isinstance(color_col, str):
-        color_col = [color_col]
-
-    subdf = subdf_assigncolor(subdf, colormap, color_col, feat_dict["exon_border"])
-
-    # Create genes metadata DataFrame
-    genesmd_df = get_genes_metadata(
-        subdf,
-        ID_COL,
-        color_col,
-        packed,
-        feat_dict["exon_height"],
-        feat_dict["v_spacer"],
-    )
-
-    # Create chromosome metadata DataFrame
-    chrmd_df, chrmd_df_grouped = get_chromosome_metadata(
-        subdf,
-        limits,
-        genesmd_df,
-        packed,
-        feat_dict["v_spacer"],
-        feat_dict["exon_height"],
-    )
-
-    # Deal with introns off
-    # adapt coordinates to shrinked
-    ts_data = {}
-    subdf[ORISTART_COL] = subdf[START_COL]
-    subdf[ORIEND_COL] = subdf[END_COL]
-    tick_pos_d = {}
-    ori_tick_pos_d = {}
-
-    if shrink:
-        # compute threshold
-        if isinstance(shrink_threshold, int):
-            subdf[SHRTHRES_COL] = [shrink_threshold] * len(subdf)
-        elif isinstance(shrink_threshold, float):
-            subdf[SHRTHRES_COL] = [shrink_threshold] * len(subdf)
-            subdf = subdf.groupby(CHROM_COL, group_keys=False, observed=True).apply(
-                lambda x: compute_thresh(x, chrmd_df_grouped) if not x.empty else None
-            )
-
-        subdf = subdf.groupby(CHROM_COL, group_keys=False, observed=True).apply(
-            lambda x: introns_resize(x, ts_data, ID_COL)  # if not x.empty else None
-        )  # empty rows when subset
-        subdf[START_COL] = subdf[ADJSTART_COL]
-        subdf[END_COL] = subdf[ADJEND_COL]
-
-        # recompute limits
-        chrmd_df, chrmd_df_grouped = get_chromosome_metadata(
-            subdf,
-            limits,
-            genesmd_df,
-            packed,
-            feat_dict["v_spacer"],
-            feat_dict["exon_height"],
-            ts_data=ts_data,
-        )
-
-        # compute new axis values and positions if needed
-        if ts_data:
-            tick_pos_d, ori_tick_pos_d = recalc_axis(
-                ts_data, tick_pos_d, ori_tick_pos_d
-            )
-
-    else:
-        subdf[CUM_DELTA_COL] = [0] * len(subdf)
-
-    # Sort data to plot chromosomes and pr objects in order
-    subdf.sort_values([CHROM_COL, PR_INDEX_COL] + ID_COL + [START_COL], inplace=True)
-    chrmd_df.sort_values([CHROM_COL, PR_INDEX_COL], inplace=True)
-    subdf[EXON_IX_COL] = subdf.groupby(
-        [CHROM_COL, PR_INDEX_COL] + ID_COL, group_keys=False, observed=True
-    ).cumcount()
-    genesmd_df.sort_index(inplace=True)
-
-    # Deal with text_pad
-    text_pad = feat_dict["text_pad"]
-    if isinstance(text_pad, int):
-        subdf[TEXT_PAD_COL] = [text_pad] * len(subdf)
-    elif isinstance(text_pad, float):
-        subdf[TEXT_PAD_COL] = [text_pad] * len(subdf)
-        subdf = subdf.groupby(CHROM_COL, group_keys=False, observed=True).apply(
-            lambda x: compute_tpad(x, chrmd_df_grouped) if not x.empty else None
-        )
+    # Engines are imported on first use
+    if engine in ["plt", "matplotlib"]:
+        from matplotlib.patches import Rectangle
 
-    # print("genesmd")
-    # print(genesmd_df)
-    # print("\n\n")
-    # print("chrmd")
-    # print(chrmd_df)
-    # print("\n\n")
-    # print("grouped_chrmd")
-    # print(chrmd_df_grouped)
-    # print("\n\n")
-    # print("original data")
-    # print(data)
-    # print("\n\n")
-    # print("data used for plotting")
-    # print(subdf)
+        from .matplotlib_base.plot_exons_plt import plot_exons_plt
 
-    if engine in ["plt", "matplotlib"]:
         # Create legend items list
         if legend:
             legend_item_d = (
-                subdf.groupby(COLOR_TAG_COL)[COLOR_INFO]
+                plan.subdf.groupby(COLOR_TAG_COL)[COLOR_INFO]
                 .apply(lambda x: Rectangle((0, 0), 1, 1, color=list(x)[0]))
                 .to_dict()
             )
@@ -439,52 +800,70 @@ def plot(
             legend_item_d = {}
 
         plot_exons_plt(
-            subdf=subdf,
-            tot_ngenes_l=tot_ngenes_l,
+            plan=plan,
             feat_dict=feat_dict,
-            genesmd_df=genesmd_df,
-            chrmd_df=chrmd_df,
-            chrmd_df_grouped=chrmd_df_grouped,
-            ts_data=ts_data,
             legend_item_d=legend_item_d,
-            max_shown=max_shown,
-            id_col=ID_COL,
             transcript_str=thick_cds,
             tooltip=tooltip,
             legend=legend,
             y_labels=y_labels,
             text=text,
             title_chr=title_chr,
-            packed=packed,
             to_file=to_file,
             file_size=file_size,
             warnings=warnings,
-            tick_pos_d=tick_pos_d,
-            ori_tick_pos_d=ori_tick_pos_d,
         )
 
     elif engine == "ply" or engine == "plotly":
+        from .plotly_base.plot_exons_ply import plot_exons_ply
+
+        # Deal with browsing, windows start as the region
+        browse_layout = None
+        windows = None
+        if feat_dict["browse"] and to_file is None:
+            if plan is data[0]:
+                raise ValueError(
+                    "Browsing the plot requires the data instead of a prepared layout."
+                )
+            region_d = parse_region(region) if region is not None else {}
+            windows = {
+                str(chrom): region_d.get(str(chrom), (None, None))
+                for chrom in plan.chrmd_df_grouped.index
+            }
+
+            def browse_layout(windows):
+                try:
+                    return prepare_layout(
+                        data,
+                        id_col=id_col,
+                        max_shown=max_shown,
+                        packed=packed,
+                        color_col=color_col,
+                        shrink=shrink,
+                        region=windows,
+                        ids=ids,
+                        features=features,
+                        theme=theme,
+                        columns=template_columns(tooltip, text),
+                        **kargs,
+                    )
+                except EmptyDataError:  # no intervals in the windows
+                    return None
+
         plot_exons_ply(
-            subdf=subdf,
+            plan=plan,
             feat_dict=feat_dict,
-            genesmd_df=genesmd_df,
-            chrmd_df=chrmd_df,
-            chrmd_df_grouped=chrmd_df_grouped,
-            ts_data=ts_data,
-            max_shown=max_shown,
-            id_col=ID_COL,
             transcript_str=thick_cds,
             tooltip=tooltip,
             legend=legend,
             y_labels=y_labels,
             text=text,
             title_chr=title_chr,
-            packed=packed,
             to_file=to_file,
             file_size=file_size,
             warnings=warnings,
-            tick_pos_d=tick_pos_d,
-            ori_tick_pos_d=ori_tick_pos_d,
+            browse_layout=browse_layout,
+            windows=windows,
         )
 
     else:
@@ -0,0 +1,221 @@
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .core import (
+    get_engine,
+    get_id_col,
+    get_options,
+    get_theme,
+    get_warnings,
+    set_engine,
+    set_id_col,
+    set_options,
+    set_theme,
+    set_warnings,
+)
+from .plot_main import plot
+from .plotly_base.export import get_image_exporter
+
+# data of the worker process, given once when it starts
+worker_data = None
+
+
+def plot_many(
+    data,
+    regions,
+    to_dir,
+    *,
+    workers=1,
+    ext="png",
+    file_size=None,
+    progress=False,
+    **kargs,
+):
+    """
+    Export one plot per region to files, optionally in parallel processes.
+
+    Parameters
+    ----------
+    data: {pyranges.PyRanges or list of pyranges.PyRanges}
+        Pyranges, derived dataframe or list of them with annotation data.
+
+    regions: {list, dict}
+        Regions to plot as accepted by plot. The files are named after the 'chrom:start-end' strings, or after
+        the keys if a dict {file_name: region, ...} is given.
+
+    to_dir: str
+        Directory where the files are written, created if needed.
+
+    workers: int, default 1
+        Number of processes plotting the regions. Each process receives the data once and reuses its region
+        index and its Plotly image exporter for all the regions it plots.
+
+    ext: str, default "png"
+        Extension of the files, either "png" or "pdf".
+
+    file_size: tuple, default None
+        Width and height of the figures in px. If None, the plot default is used.
+
+    progress: bool, default False
+        Whether to print each region as it is done.
+
+    **kargs
+        Parameters of plot, except region and to_file. The engine, id column, theme and options currently set
+        are also used.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Region, file, seconds to plot it, seconds to write its Plotly image and error message if it could not be
+        plotted, in the order they were done.
+
+    Examples
+    --------
+    >>> import pyranges_plot as prp
+
+    >>> prp.plot_many(p, ["1:1000-5000", "2:100-900"], "plots", id_col="transcript_id", workers=4)
+
+    >>> prp.plot_many(p, {"gene_a": "1:1000-5000", "gene_b": "2:100-900"}, "plots", ext="pdf")
+    """
+
+    # Name files after regions
+    if isinstance(regions, dict):
+        names = list(regions.keys())
+        regions = list(regions.values())
+    else:
+        regions = list(regions)
+        names = [
+            region.replace(",", "").replace(":", "_")
+            if isinstance(region, str)
+            else f"region{i + 1}"
+            for i, region in enumerate(regions)
+        ]
+
+    os.makedirs(to_dir, exist_ok=True)
+    to_files = [os.path.join(to_dir, f"{name}.{ext}") for name in names]
+    if file_size is not None:
+        to_files = [(to_file, file_size) for to_file in to_files]
+
+    # Plot in this process or in workers set as this one
+    exporter = get_image_exporter()
+    warnings = get_warnings()
+    if workers == 1:
+        set_warnings(False)  # no popup for every region, as in workers
+
+        # write Plotly images while plotting next regions, if the renderer has its own cpu
+        exporter.deferred = get_engine() in ["plotly", "ply"] and os.cpu_count() > 1
+        if exporter.deferred:
+            exporter.start()
+        results = (
+            plot_region(data, region, to_file, kargs)
+            for region, to_file in zip(regions, to_files)
+        )
+        executor = None
+    else:
+        state = (get_engine(), get_id_col(), get_theme(), get_options("values"))
+        # workers not forked, this process may be running the Plotly export thread
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+        executor = ProcessPoolExecutor(
+            workers, mp_context=context, initializer=init_worker, initargs=(data, state)
+        )
+        futures = [
+            executor.submit(plot_region_worker, region, to_file, kargs)
+            for region, to_file in zip(regions, to_files)
+        ]
+        results = (future.result() for future in as_completed(futures))
+
+    # Collect results as they are done
+    stats = []
+    try:
+        for result in results:
+            stats.append(result)
+            if progress:
+                region, to_file, seconds, _, error = result
+                status = f"error: {error}" if error else f"{seconds:.2f} s"
+                print(f"[{len(stats)}/{len(regions)}] {region} -> {to_file} ({status})")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        else:
+            exporter.wait()
+            exporter.deferred = False
+            set_warnings(warnings)
+
+    stats = pd.DataFrame(
+        stats, columns=["region", "file", "time", "export_time", "error"]
+    )
+    stats["export_time"] = stats["export_time"].astype(float)
+
+    # Add results of deferred image writing
+    if executor is None:
+        export_time = stats["file"].map(exporter.times)
+        stats["export_time"] = stats["export_time"].fillna(export_time)
+        export_error = stats["file"].map(exporter.pop_error)
+        stats["error"] = stats["error"].fillna(export_error.dropna().map(str))
+
+    return stats
+
+
+def init_worker(data, state):
+    """Store the data and set the plot state in a worker process."""
+
+    global worker_data
+    worker_data = data
+
+    engine, id_col, theme, options = state
+    if engine in ["plt", "matplotlib"]:
+        import matplotlib
+
+        matplotlib.use("Agg")
+    set_engine(engine)
+    set_id_col(id_col)
+    set_theme(theme)
+    set_options(options)
+    set_warnings(False)  # no popups out of the main process
+    if engine in ["plotly", "ply"]:
+        get_image_exporter().start()  # renderer starts while waiting for regions
+
+
+def plot_region_worker(region, to_file, kargs):
+    """Plot a region with the data of the worker process."""
+
+    return plot_region(worker_data, region, to_file, kargs)
+
+
+def plot_region(data, region, to_file, kargs):
+    """Plot a region to file, providing the time it took or the error raised."""
+
+    if isinstance(to_file, tuple):
+        file = to_file[0]
+    else:
+        file = to_file
+    get_image_exporter().times.pop(file, None)  # from a previous export
+
+    start = time.perf_counter()
+    error = None
+    try:
+        plot(data, region=region, to_file=to_file, **kargs)
+    except Exception as e:  # noqa: BLE001 - reported, the other regions are plotted
+        error = str(e)
+    finally:
+        # do not keep figures of exported plots
+        if "matplotlib.pyplot" in sys.modules:
+            sys.modules["matplotlib.pyplot"].close("all")
+    seconds = time.perf_counter() - start
+
+    # time writing the image is not plotting time, unknown yet if deferred
+    exporter = get_image_exporter()
+    export_seconds = None
+    if not exporter.deferred:
+        export_seconds = exporter.times.get(file)
+    if export_seconds is not None:
+        seconds -= export_seconds
+    return region, file, seconds, export_seconds, error
@@ -1,41 +1,13 @@
-from dash import Dash, dcc, html, Input, Output
-import dash_bootstrap_components as dbc
-
-
-def coord2percent(fig, trace, X0, X1):
-    """Provides the plot percentage length from the points given. Plotly friendly"""
-
-    if trace == 1:
-        trace = ""
-    else:
-        trace = str(trace)
-
-    x_min, x_max = fig["layout"]["xaxis" + trace]["range"]
-    x_rang = x_max - x_min
-
-    percent_size = float(((X1 - X0) / x_rang))
-
-    return percent_size
-
-
-def percent2coord(fig, trace, x_percent):
-    """Provides the coordinates distance from the plot percentage given. Plotly friendly"""
-
-    if trace == 1:
-        trace = ""
-    else:
-        trace = str(trace)
-
-    x_min, x_max = fig["layout"]["xaxis" + trace]["range"]
-    x_rang = x_max - x_min
-
-    percent_coord = float(x_percent * x_rang)
-
-    return percent_coord
+import json
 
 
 # Plotly - Function to initialize Dash app layout and callbacks
-def initialize_dash_app(fig, max_shown):
+def initialize_dash_app(fig, max_shown, on_relayout=None):
+    # import Dash only when showing plots
+    from dash import Dash, dcc, html, Input, Output, Patch
+    from dash.exceptions import PreventUpdate
+    import dash_bootstrap_components as dbc
+
     app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
     # create alert and graph components
@@ -104,4 +76,41 @@ def initialize_dash_app(fig, max_shown):
         if sign == 91321:
             return True
 
+    # browsing, plot the visible window again when zooming or panning
+    if on_relayout is not None:
+        shown_layout = json.loads(fig.to_json())["layout"]
+
+        @app.callback(
+            Output("genes-plot", "figure"),
+            Input("genes-plot", "relayoutData"),
+            prevent_initial_call=True,
+        )
+        def update_window(relayout_data):
+            newfig = on_relayout(relayout_data or {})
+            if newfig is None:
+                raise PreventUpdate
+
+            return window_patch(Patch(), newfig, shown_layout)
+
     return app
+
+
+def window_patch(patched_fig, newfig, shown_layout):
+    """Patch the traces of the new window, and the layout it changes from the shown one."""
+
+    newfig = json.loads(newfig.to_json())
+    patched_fig["data"] = newfig["data"]
+
+    # layout of the window, like the ticks of other genes, not the zoom already shown
+    for key, value in newfig["layout"].items():
+        shown = shown_layout.get(key)
+        if isinstance(value, dict) and isinstance(shown, dict):
+            for subkey, subvalue in value.items():
+                if shown.get(subkey) != subvalue:
+                    patched_fig["layout"][key][subkey] = subvalue
+                    shown[subkey] = subvalue
+        elif shown != value:
+            patched_fig["layout"][key] = value
+            shown_layout[key] = value
+
+    return patched_fig
@@ -1,9 +1,19 @@
 from pyranges.core.names import START_COL, END_COL
 
-from .core import coord2percent, percent2coord
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 
+from ..geometry import (
+    get_items,
+    get_genes_info,
+    get_rows,
+    get_rects,
+    get_texts,
+    get_introns,
+    get_intron_lines,
+    get_arrows,
+)
 from ..names import (
     ADJSTART_COL,
     ADJEND_COL,
@@ -12,117 +22,25 @@ from ..names import (
     COLOR_INFO,
     COLOR_TAG_COL,
     BORDER_COLOR_COL,
+    ROW_INFO_COL,
+    TEXT_COL,
 )
 
 
-def plot_direction(
-    fig,
-    strand,
-    genename,
-    item_size,
-    item_threshold,
-    start,
-    stop,
-    incl,
-    gene_ix,
-    chrom_ix,
-    exon_height,
-    arrow_color,
-    arrow_line_width,
-):
-    """Plot the direction arrow in the given item if it proceeds."""
-
-    dir_flag = 0
-
-    if strand:
-        # create and plot direction lines
-        if item_size > item_threshold:
-            dir_flag = 1
-            ##diagonal_line = OX arrow extension(item middle point +- incl), OY arrow extension (item middle point + half of exon width)
-            top_plus = (
-                [(start + stop) / 2 + incl, (start + stop) / 2 - incl],
-                [gene_ix, gene_ix + exon_height / 2 - 0.01],
-            )
-            bot_plus = (
-                [(start + stop) / 2 - incl, (start + stop) / 2 + incl],
-                [gene_ix - exon_height / 2 + 0.01, gene_ix],
-            )
-            top_minus = (
-                [(start + stop) / 2 + incl, (start + stop) / 2 - incl],
-                [gene_ix - exon_height / 2 + 0.01, gene_ix],
-            )
-            bot_minus = (
-                [(start + stop) / 2 - incl, (start + stop) / 2 + incl],
-                [gene_ix, gene_ix + exon_height / 2 - 0.01],
-            )
-
-            if strand == "+":
-                arrow_bot = go.Scatter(
-                    x=bot_plus[0],
-                    y=bot_plus[1],
-                    mode="lines",
-                    line=go.scatter.Line(color=arrow_color, width=arrow_line_width),
-                    showlegend=False,
-                    name=str(genename),
-                    hoverinfo="skip",
-                )
-                arrow_top = go.Scatter(
-                    x=top_plus[0],
-                    y=top_plus[1],
-                    mode="lines",
-                    line=go.scatter.Line(color=arrow_color, width=arrow_line_width),
-                    showlegend=False,
-                    name=str(genename),
-                    hoverinfo="skip",
-                )
-                fig.add_trace(arrow_bot, row=chrom_ix + 1, col=1)
-                fig.add_trace(arrow_top, row=chrom_ix + 1, col=1)
-
-            elif strand == "-":
-                arrow_bot = go.Scatter(
-                    x=bot_minus[0],
-                    y=bot_minus[1],
-                    mode="lines",
-                    line=go.scatter.Line(color=arrow_color, width=arrow_line_width),
-                    showlegend=False,
-                    name=str(genename),
-                    hoverinfo="skip",
-                )
-                arrow_top = go.Scatter(
-                    x=top_minus[0],
-                    y=top_minus[1],
-                    mode="lines",
-                    line=go.scatter.Line(color=arrow_color, width=arrow_line_width),
-                    showlegend=False,
-                    name=str(genename),
-                    hoverinfo="skip",
-                )
-                fig.add_trace(arrow_bot, row=chrom_ix + 1, col=1)
-                fig.add_trace(arrow_top, row=chrom_ix + 1, col=1)
-    return dir_flag
-
-
 def apply_gene_bridge(
     transcript_str,
     text,
     text_size,
     df,
     fig,
-    strand,
-    genename,
     gene_ix,
     exon_color,
     exon_border,
     chrom_ix,
     geneinfo,
-    showinfo,
     exon_height,
     transcript_utr_width,
     legend,
-    arrow_size_min,
-    arrow_color,
-    arrow_line_width,
-    dir_flag,
 ):
     """Evaluate data and provide plot_row with right parameters."""
 
@@ -132,18 +50,11 @@ def apply_gene_bridge(
             plot_row,
             args=(
                 fig,
-                strand,
-                genename,
                 gene_ix,
                 # exon_border,
                 chrom_ix,
-                showinfo,
                 exon_height,
                 legend,
-                arrow_size_min,
-                arrow_color,
-                arrow_line_width,
-                dir_flag,
                 text,
                 text_size,
             ),
@@ -191,13 +102,7 @@ def apply_gene_bridge(
             # add ID annotaion before start utr
             if text:
                 text_pad = df[TEXT_PAD_COL].iloc[0]
-                # text == True
-                if isinstance(text, bool):
-                    ann = str(genename)
-                # text == '{string}'
-                else:
-                    row_dict = df.iloc[0].to_dict()  # use first row
-                    ann = text.format_map(row_dict)
+                ann = str(df[TEXT_COL].iloc[0])  # id or text filled with first row
 
                 fig.add_annotation(
                     dict(
@@ -242,18 +147,11 @@ def apply_gene_bridge(
                 plot_row,
                 args=(
                     fig,
-                    strand,
-                    genename,
                     gene_ix,
                     # exon_border,
                     chrom_ix,
-                    showinfo,
                     exon_height,
                     legend,
-                    arrow_size_min,
-                    arrow_color,
-                    arrow_line_width,
-                    dir_flag,
                     text,
                     text_size,
                 ),
@@ -269,18 +167,11 @@ def apply_gene_bridge(
                 plot_row,
                 args=(
                     fig,
-                    strand,
-                    genename,
                     gene_ix,
                     # exon_border,
                     chrom_ix,
-                    showinfo,
                     exon_height,
                     legend,
-                    arrow_size_min,
-                    arrow_color,
-                    arrow_line_width,
-                    dir_flag,
                     text,
                     text_size,
                 ),
@@ -297,18 +188,11 @@ def apply_gene_bridge(
                 plot_row,
                 args=(
                     fig,
-                    strand,
-                    genename,
                     gene_ix,
                     # exon_border,
                     chrom_ix,
-                    showinfo,
                     transcript_utr_width,
                     legend,
-                    arrow_size_min,
-                    arrow_color,
-                    arrow_line_width,
-                    dir_flag,
                     text,
                     text_size,
                 ),
@@ -323,34 +207,17 @@ def apply_gene_bridge(
 def plot_row(
     row,
     fig,
-    strand,
-    genename,
     gene_ix,
     chrom_ix,
-    showinfo,
     exon_height,
     legend,
-    arrow_size_min,
-    arrow_color,
-    arrow_line_width,
-    dir_flag,
     text,
     text_size,
 ):
     """Plot elements corresponding to one row of one gene."""
 
-    # Get the gene information to print on hover
-    # default
-    if strand:
-        geneinfo = f"[{strand}] ({row.__oriStart__}, {row.__oriEnd__})<br>ID: {genename}"  # default with strand
-    else:
-        geneinfo = f"({row.__oriStart__}, {row.__oriEnd__})<br>ID: {genename}"  # default without strand
-
-    # customized
-    showinfo_dict = row.to_dict()  # first element of gene rows
-    if showinfo:
-        showinfo = showinfo.replace("\n", "<br>")
-        geneinfo += "<br>" + showinfo.format(**showinfo_dict)
+    # Get the gene information to print on hover, made for all rows at once
+    geneinfo = row[ROW_INFO_COL]
 
     # consider legend
     if legend:
@@ -390,13 +257,7 @@ def plot_row(
     # Add ID annotation if it is the first exon
     if row[EXON_IX_COL] == 0 and text:
         text_pad = row[TEXT_PAD_COL]
-        # text == True
-        if isinstance(text, bool):
-            ann = str(genename)
-        # text == '{string}'
-        else:
-            row_dict = row.to_dict()
-            ann = text.format(**row_dict)
+        ann = str(row[TEXT_COL])  # id or text filled with the row
 
         fig.add_annotation(
             dict(
@@ -412,29 +273,6 @@ def plot_row(
             font={"size": text_size},
         )
 
-    # Plot DIRECTION ARROW in EXON
-    # decide about placing a direction arrow
-    arrow_size = coord2percent(fig, chrom_ix + 1, 0.05 * start, 0.05 * stop)
-    incl = percent2coord(fig, chrom_ix + 1, arrow_size / 2)  # how long in the plot (OX)
-
-    # create and plot lines
-    if not dir_flag:
-        plot_direction(
-            fig,
-            strand,
-            genename,
-            arrow_size,
-            arrow_size_min,
-            start,
-            stop,
-            incl,
-            gene_ix,
-            chrom_ix,
-            exon_height,
-            arrow_color,
-            arrow_line_width,
-        )
-
 
 def plot_introns(
     sorted_exons,
@@ -443,18 +281,9 @@ def plot_introns(
     gene_ix,
     exon_color,
     chrom_ix,
-    strand,
-    genename,
-    intron_threshold,
-    exon_height,
-    arrow_color,
-    arrow_line_width,
-    arrow_size,
 ):
     """Plot intron lines as needed."""
 
-    dir_flag = []
-
     for i in range(len(sorted_exons) - 1):
         # define intron
         start = sorted_exons[END_COL].iloc[i]
@@ -543,31 +372,213 @@ def plot_introns(
                 # store interval end for next iteration
                 prev_tsend = row[ADJEND_COL]
 
-        # Plot DIRECTION ARROW in INTRONS if strand is known
-        intron_size = coord2percent(fig, chrom_ix + 1, start, stop)
-        incl = percent2coord(
-            fig, chrom_ix + 1, arrow_size / 2
-        )  # how long in the plot (OX)
 
-        dir_flag.append(
-            plot_direction(
-                fig,
-                strand,
-                genename,
-                intron_size,
-                intron_threshold,
-                start,
-                stop,
-                incl,
-                gene_ix,
-                chrom_ix,
-                exon_height,
-                arrow_color,
-                arrow_line_width,
+def shapes2path(*coords):
+    """Join the vertices of several shapes in one path, separating the shapes by gaps."""
+
+    path = np.column_stack(coords + (np.full(len(coords[0]), np.nan),))
+    return path.ravel()
+
+
+def arrows2trace(arrows, arrow_color, arrow_line_width, scatter):
+    """Create one trace with the direction arrows given."""
+
+    return scatter(
+        x=shapes2path(
+            arrows["x_end"].to_numpy(),
+            arrows["x_tip"].to_numpy(),
+            arrows["x_end"].to_numpy(),
+        ),
+        y=shapes2path(
+            arrows["y_low"].to_numpy(),
+            arrows["y"].to_numpy(),
+            arrows["y_high"].to_numpy(),
+        ),
+        mode="lines",
+        line={"color": arrow_color, "width": arrow_line_width},
+        showlegend=False,
+        hoverinfo="skip",
+    )
+
+
+def plot_arrows(fig, arrows, arrow_color, arrow_line_width):
+    """Plot the direction arrows as one trace per subplot."""
+
+    for chrom_ix, chrom_arrows in arrows.groupby("chrom_ix", sort=False):
+        fig.add_trace(
+            arrows2trace(chrom_arrows, arrow_color, arrow_line_width, go.Scatter),
+            row=chrom_ix + 1,
+            col=1,
+        )
+
+
+def plot_batched(
+    subdf,
+    fig,
+    chrmd_df_grouped,
+    genesmd_df,
+    ts_data,
+    id_col,
+    showinfo,
+    legend,
+    transcript_str,
+    text,
+    text_size,
+    exon_height,
+    exon_border,
+    transcript_utr_width,
+    arrow_line_width,
+    arrow_color,
+    arrow_size_min,
+    arrow_size,
+    arrow_intron_threshold,
+    webgl=False,
+):
+    """Plot the elements of all genes as one trace per style and subplot."""
+
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    # Get the geometry of all genes
+    items = get_items(subdf, genesmd_df, chrmd_df_grouped, id_col, exon_border)
+    items["gene_info"] = get_genes_info(items, "gene", items["strand"], "<br>")
+    rows, utrs = get_rows(items, transcript_str, exon_height, transcript_utr_width)
+    rects = get_rects(rows, utrs, transcript_utr_width, showinfo, "<br>")
+    introns = get_introns(items)
+    lines = get_intron_lines(introns, ts_data, chrmd_df_grouped)
+    arrows = get_arrows(
+        introns,
+        rows,
+        exon_height,
+        arrow_intron_threshold,
+        arrow_size,
+        arrow_size_min,
+    )
+
+    traces = []
+    subplots = []
+
+    # Plot INTRON lines, one trace per color and line style
+    for (chrom_ix, color, dashed), style_lines in lines.groupby(
+        ["chrom_ix", "gene_color", "dashed"], sort=False
+    ):
+        y = style_lines["gene_ix"].to_numpy()
+        traces.append(
+            scatter(
+                x=shapes2path(
+                    style_lines["x0"].to_numpy(), style_lines["x1"].to_numpy()
+                ),
+                y=shapes2path(y, y),
+                mode="lines",
+                line={
+                    "color": color,
+                    "width": 0.7,
+                    "dash": "dash" if dashed else "solid",
+                },
+                hoverinfo="skip",
+                showlegend=False,
             )
         )
+        subplots.append(chrom_ix)
 
-    if 1 in dir_flag:
-        return 1
-    else:
-        return 0
+    # Plot DIRECTION ARROWS of introns below the rectangles
+    intron_arrows = arrows[arrows["intron"]]
+    for chrom_ix, chrom_arrows in intron_arrows.groupby("chrom_ix", sort=False):
+        traces.append(
+            arrows2trace(chrom_arrows, arrow_color, arrow_line_width, scatter)
+        )
+        subplots.append(chrom_ix)
+
+    # Plot EXONS and utrs as rectangles, one trace per colors and legend tag
+    shown_tags = set()
+    for (chrom_ix, fillcolor, linecolor, tag), style_rects in rects.groupby(
+        ["chrom_ix", "fillcolor", "linecolor", "tag"], sort=False, dropna=False
+    ):
+        x0, x1 = style_rects["x0"].to_numpy(), style_rects["x1"].to_numpy()
+        y0, y1 = style_rects["y0"].to_numpy(), style_rects["y1"].to_numpy()
+        traces.append(
+            scatter(
+                x=shapes2path(x0, x1, x1, x0, x0),
+                y=shapes2path(y0, y0, y1, y1, y0),
+                fill="toself",
+                fillcolor=fillcolor,
+                mode="lines",
+                line={"color": linecolor},
+                hoverinfo="skip",
+                name=tag,
+                legendgroup=tag,
+                showlegend=legend and tag not in shown_tags,
+            )
+        )
+        subplots.append(chrom_ix)
+        shown_tags.add(tag)
+
+    # Plot DIRECTION ARROWS of intervals
+    exon_arrows = arrows[~arrows["intron"]]
+    for chrom_ix, chrom_arrows in exon_arrows.groupby("chrom_ix", sort=False):
+        traces.append(
+            arrows2trace(chrom_arrows, arrow_color, arrow_line_width, scatter)
+        )
+        subplots.append(chrom_ix)
+
+    # Add hover information on points along intervals and introns
+    hover = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "chrom_ix": np.repeat(rects["chrom_ix"].to_numpy(), 3),
+                    "x": np.column_stack(
+                        [rects["x0"], (rects["x0"] + rects["x1"]) / 2, rects["x1"]]
+                    ).ravel(),
+                    "y": np.repeat(((rects["y0"] + rects["y1"]) / 2).to_numpy(), 3),
+                    "info": np.repeat(rects["info"].to_numpy(), 3),
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "chrom_ix": introns["chrom_ix"].to_numpy(),
+                    "x": ((introns["start"] + introns["stop"]) / 2).to_numpy(),
+                    "y": introns["gene_ix"].to_numpy(),
+                    "info": introns["gene_info"].to_numpy(),
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+    for chrom_ix, chrom_hover in hover.groupby("chrom_ix", sort=False):
+        traces.append(
+            scatter(
+                x=chrom_hover["x"].to_numpy(),
+                y=chrom_hover["y"].to_numpy(),
+                mode="markers",
+                marker={"opacity": 0},
+                text=chrom_hover["info"].tolist(),
+                hoverinfo="text",
+                showlegend=False,
+            )
+        )
+        subplots.append(chrom_ix)
+
+    fig.add_traces(
+        traces, rows=[int(ix) + 1 for ix in subplots], cols=[1] * len(subplots)
+    )
+
+    # Add ID annotations
+    if text:
+        texts = get_texts(rows, utrs, text)
+        annotations = [
+            {
+                "x": x,
+                "y": y,
+                "xref": "x" if chrom_ix == 0 else f"x{chrom_ix + 1}",
+                "yref": "y" if chrom_ix == 0 else f"y{chrom_ix + 1}",
+                "showarrow": False,
+                "text": str(ann),
+                "textangle": 0,
+                "xanchor": "right",
+                "font": {"size": text_size},
+            }
+            for chrom_ix, x, y, ann in texts[["chrom_ix", "x", "y", "text"]].itertuples(
+                index=False
+            )
+        ]
+        fig.update_layout(annotations=list(fig.layout.annotations) + annotations)
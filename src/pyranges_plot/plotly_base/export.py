@@ -0,0 +1,98 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def start_renderer():
+    """Render an empty figure, for the image renderer to be running."""
+
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    pio.to_image(go.Figure(), format="png", width=10, height=10)
+
+
+class ImageExporter:
+    """Export session writing the Plotly figures from one thread."""
+
+    def __init__(self):
+        self.executor = None
+        self.futures = {}  # file: writing of the deferred image
+        self.times = {}  # file: seconds taken to write it
+        self.deferred = False  # whether write returns before the image is written
+        self.pid = os.getpid()
+
+    def start(self):
+        """Start the exporting thread, which keeps the image renderer running."""
+
+        # forked processes do not run the thread of the parent, start a new session
+        if self.pid != os.getpid():
+            self.executor = None
+            self.futures = {}
+            self.pid = os.getpid()
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+            # start renderer before the first figure comes, errors raised when writing
+            self.executor.submit(start_renderer)
+
+    def write_image(self, fig, to_file):
+        """Write the figure to file, keeping the time it took."""
+
+        import plotly.io as pio
+
+        start = time.perf_counter()
+        pio.write_image(fig, to_file)
+        self.times[to_file] = time.perf_counter() - start
+
+    def write(self, fig, to_file):
+        """Write the figure to file, or queue it if exports are deferred."""
+
+        self.start()
+        future = self.executor.submit(self.write_image, fig, to_file)
+        if self.deferred:
+            self.futures[to_file] = future
+        else:
+            future.result()
+
+    def wait(self):
+        """Wait until the queued figures are written."""
+
+        wait(list(self.futures.values()))
+
+    def pop_error(self, to_file):
+        """Provide the exception raised writing a deferred image, if any."""
+
+        future = self.futures.pop(to_file, None)
+        if future is None:
+            return None
+        return future.exception()
+
+
+image_exporter = ImageExporter()
+
+
+def get_image_exporter():
+    """Provide the export session of the process."""
+
+    return image_exporter
+
+
+def get_export_times():
+    """
+    Shows the seconds taken to write each Plotly image exported in this process.
+
+    Examples
+    --------
+    >>> import pyranges_plot as prp
+
+    >>> prp.set_engine("plotly")
+
+    >>> prp.plot(p, to_file="my_plot.png")
+
+    >>> prp.get_export_times()
+    {'my_plot.png': 0.06}
+
+    """
+
+    return dict(image_exporter.times)
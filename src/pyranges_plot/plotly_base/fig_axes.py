@@ -63,9 +63,12 @@ def create_fig(
     v_spacer,
     exon_height,
     plot_border,
+    webgl=False,
 ):
     """Generate the figure and axes fitting the data."""
 
+    scatter = go.Scattergl if webgl else go.Scatter
+
     # Unify titles and start figure
     titles = [title_chr.format(**{"chrom": chrom}) for chrom in chrmd_df_grouped.index]
     titles = list(pd.Series(titles))
@@ -79,7 +82,7 @@ def create_fig(
     # one subplot per chromosome
     for i in range(len(titles)):
         chrom = chrmd_df_grouped.index[i]
-        fig.add_trace(go.Scatter(x=[], y=[]), row=i + 1, col=1)
+        fig.add_trace(scatter(x=[], y=[]), row=i + 1, col=1)
 
         # set title format if there are titles
         if fig.layout.annotations:
@@ -127,8 +130,7 @@ def create_fig(
                 to_add_val += original_ticks
 
             # compute new coordinates of conserved previous ticks
-            to_add = to_add_val.copy()
-            to_add = cumdelting(to_add, ts_data, chrom)
+            to_add = cumdelting(to_add_val, ts_data, chrom).tolist()
 
             # set new ticks
             x_ticks_val = sorted(to_add)
@@ -168,7 +170,7 @@ def create_fig(
 
         # Add shrink rectangles
         if ts_data:
-            rects_df = ts_data[chrom]
+            rects_df = ts_data[chrom].copy()
             rects_df["cumdelta_end"] = rects_df[CUM_DELTA_COL]
             rects_df["cumdelta_start"] = rects_df[CUM_DELTA_COL].shift(
                 periods=1, fill_value=0
@@ -185,7 +187,7 @@ def create_fig(
                 x0, x1 = a, b
                 y0, y1 = y_min - 1, y_max + 1
                 fig.add_trace(
-                    go.Scatter(
+                    scatter(
                         x=[x0, x1, x1, x0, x0],
                         y=[y0, y0, y1, y1, y0],
                         fill="toself",
@@ -1,39 +1,108 @@
 import plotly.graph_objects as go
-import plotly.io as pio
 import pandas as pd
 import numpy as np
-from pyranges.core.names import CHROM_COL, START_COL, END_COL, STRAND_COL
+from pyranges.core.names import CHROM_COL, START_COL, END_COL
 
-from .core import initialize_dash_app, coord2percent
+from .core import initialize_dash_app
+from ..core import cumdelting_interp
 from .fig_axes import create_fig
-from .data2plot import plot_introns, apply_gene_bridge
-from ..names import PR_INDEX_COL, BORDER_COLOR_COL
+from .export import get_image_exporter
+from .data2plot import plot_introns, apply_gene_bridge, plot_arrows, plot_batched
+from ..data_preparation import subdf_detail
+from ..geometry import get_texts_by_row, get_items, get_rows, get_introns, get_arrows
+from ..profiling import stage
+from ..names import PR_INDEX_COL, BORDER_COLOR_COL, GENE_INFO_COL
 
 
 def plot_exons_ply(
-    subdf,
+    plan,
     feat_dict,
-    genesmd_df,
-    chrmd_df,
-    chrmd_df_grouped,
-    ts_data,
-    id_col,
-    max_shown=25,
     transcript_str=False,
     tooltip=None,
     legend=False,
     y_labels=False,
     text=True,
     title_chr=None,
-    packed=True,
     to_file=None,
     file_size=None,
     warnings=None,
-    tick_pos_d=None,
-    ori_tick_pos_d=None,
+    browse_layout=None,
+    windows=None,
 ):
     """Create Plotly plot."""
 
+    def plot_plan(plan):
+        return build_fig(
+            plan,
+            feat_dict,
+            transcript_str,
+            tooltip,
+            legend,
+            y_labels,
+            text,
+            title_chr,
+            file_size,
+            warnings,
+        )
+
+    fig = plot_plan(plan)
+
+    # Provide output
+    if to_file is None:
+        # plot the visible windows again on zoom if browsing
+        on_relayout = None
+        if browse_layout is not None:
+            state = {"plan": plan, "windows": windows, "initial": windows}
+
+            def on_relayout(relayout_data):
+                return browse_windows(relayout_data, state, browse_layout, plot_plan)
+
+        app_instance = initialize_dash_app(fig, plan.max_shown, on_relayout)
+        app_instance.run(port=feat_dict["plotly_port"])
+
+    else:
+        with stage("export"):
+            fig.update_layout(width=file_size[0], height=file_size[1])
+            get_image_exporter().write(fig, to_file)
+
+
+def build_fig(
+    plan,
+    feat_dict,
+    transcript_str,
+    tooltip,
+    legend,
+    y_labels,
+    text,
+    title_chr,
+    file_size,
+    warnings,
+):
+    """Create Plotly figure of the prepared layout."""
+
+    # Get prepared layout
+    subdf = plan.subdf
+    genesmd_df = plan.genesmd_df
+    chrmd_df = plan.chrmd_df
+    chrmd_df_grouped = plan.chrmd_df_grouped
+    ts_data = plan.ts_data
+    tick_pos_d = plan.tick_pos_d
+    ori_tick_pos_d = plan.ori_tick_pos_d
+    id_col = plan.id_col
+    packed = plan.packed
+
+    # Collapse genes too small to show their structure
+    with stage("detail") as counts:
+        subdf = subdf_detail(
+            subdf,
+            chrmd_df_grouped,
+            id_col,
+            feat_dict["detail"],
+            feat_dict["detail_threshold"],
+            file_size[0],
+        )
+        counts["rows"] = len(subdf)
+
     # Get default plot features
     # tag_background = feat_dict['tag_background']
     fig_bkg = feat_dict["fig_bkg"]
@@ -46,7 +115,6 @@ def plot_exons_ply(
     transcript_utr_width = feat_dict["transcript_utr_width"]
     v_spacer = feat_dict["v_spacer"]
     text_size = feat_dict["text_size"]
-    plotly_port = feat_dict["plotly_port"]
     arrow_line_width = feat_dict["arrow_line_width"]
     arrow_color = feat_dict["arrow_color"]
     arrow_size_min = feat_dict["arrow_size_min"]
@@ -54,52 +122,99 @@ def plot_exons_ply(
     arrow_intron_threshold = feat_dict["arrow_intron_threshold"]
     shrinked_bkg = feat_dict["shrinked_bkg"]
     shrinked_alpha = feat_dict["shrinked_alpha"]
+    batched = feat_dict["batched"]
+    webgl = feat_dict["webgl"]
+    if webgl is None:
+        webgl = len(subdf) > feat_dict["webgl_threshold"]
 
     # Create figure and chromosome plots
-    fig = create_fig(
-        subdf,
-        chrmd_df,
-        chrmd_df_grouped,
-        genesmd_df,
-        ts_data,
-        title_chr,
-        title_dict_ply,
-        grid_color,
-        packed,
-        y_labels,
-        tick_pos_d,
-        ori_tick_pos_d,
-        shrinked_bkg,
-        shrinked_alpha,
-        v_spacer,
-        exon_height,
-        plot_border,
-    )
-
-    # Plot genes
-    subdf.groupby(id_col + [PR_INDEX_COL], group_keys=False, observed=True).apply(
-        lambda subdf: gby_plot_exons(
+    with stage("create_fig"):
+        fig = create_fig(
             subdf,
-            fig,
+            chrmd_df,
             chrmd_df_grouped,
             genesmd_df,
             ts_data,
-            tooltip,
-            legend,
-            transcript_str,
-            text,
-            text_size,
+            title_chr,
+            title_dict_ply,
+            grid_color,
+            packed,
+            y_labels,
+            tick_pos_d,
+            ori_tick_pos_d,
+            shrinked_bkg,
+            shrinked_alpha,
+            v_spacer,
             exon_height,
-            exon_border,
-            transcript_utr_width,
-            plot_bkg,
-            arrow_line_width,
-            arrow_color,
-            arrow_size_min,
-            arrow_size,
-            arrow_intron_threshold,
+            plot_border,
+            webgl,
         )
-    )  # .reset_index(level=PR_INDEX_COL)
+
+    # Plot genes
+    with stage("draw") as counts:
+        if batched or webgl:
+            plot_batched(
+                subdf,
+                fig,
+                chrmd_df_grouped,
+                genesmd_df,
+                ts_data,
+                id_col,
+                tooltip,
+                legend,
+                transcript_str,
+                text,
+                text_size,
+                exon_height,
+                exon_border,
+                transcript_utr_width,
+                arrow_line_width,
+                arrow_color,
+                arrow_size_min,
+                arrow_size,
+                arrow_intron_threshold,
+                webgl,
+            )
+        else:
+            subdf = get_texts_by_row(subdf, id_col, tooltip, text, "<br>")
+
+            # Plot DIRECTION ARROWS of all genes at once, introns below the rectangles
+            items = get_items(subdf, genesmd_df, chrmd_df_grouped, id_col, exon_border)
+            rows, _ = get_rows(items, transcript_str, exon_height, transcript_utr_width)
+            arrows = get_arrows(
+                get_introns(items),
+                rows,
+                exon_height,
+                arrow_intron_threshold,
+                arrow_size,
+                arrow_size_min,
+            )
+            plot_arrows(fig, arrows[arrows["intron"]], arrow_color, arrow_line_width)
+
+            subdf.groupby(
+                id_col + [PR_INDEX_COL], group_keys=False, observed=True
+            ).apply(
+                lambda subdf: gby_plot_exons(
+                    subdf,
+                    fig,
+                    chrmd_df_grouped,
+                    genesmd_df,
+                    ts_data,
+                    legend,
+                    transcript_str,
+                    text,
+                    text_size,
+                    exon_height,
+                    exon_border,
+                    transcript_utr_width,
+                    plot_bkg,
+                )
+            )  # .reset_index(level=PR_INDEX_COL)
+
+            # Plot DIRECTION ARROWS of intervals above the rectangles
+            plot_arrows(fig, arrows[~arrows["intron"]], arrow_color, arrow_line_width)
+        counts["traces"] = len(fig.data)
+        counts["shapes"] = len(fig.layout.shapes)
 
     # Adjust plot display
     fig.update_layout(
@@ -123,8 +238,7 @@ def plot_exons_ply(
         color=plot_border,
     )
 
-    # Provide output
-    # insert silent information for warnings
+    # Insert silent information for warnings
     if warnings:
         fig.data[0].customdata = np.array([0, 0, 0])  # [tot_ngenes_l, 0, 0])
         if (
@@ -151,13 +265,56 @@ def plot_exons_ply(
     else:
         fig.data[0].customdata = np.array(["no warnings"])
 
-    if to_file is None:
-        app_instance = initialize_dash_app(fig, max_shown)
-        app_instance.run(port=plotly_port)
+    return fig
 
-    else:
-        fig.update_layout(width=file_size[0], height=file_size[1])
-        pio.write_image(fig, to_file)
+
+def browse_windows(relayout_data, state, browse_layout, plot_plan):
+    """Provide the figure of the windows zoomed or panned, None if they do not change."""
+
+    plan = state["plan"]
+    windows = dict(state["windows"])
+
+    # get the new windows in original coordinates
+    for i, chrom in enumerate(plan.chrmd_df_grouped.index):
+        axis = "xaxis" if i == 0 else f"xaxis{i + 1}"
+        if f"{axis}.range[0]" in relayout_data:
+            x_range = [
+                relayout_data[f"{axis}.range[0]"],
+                relayout_data[f"{axis}.range[1]"],
+            ]
+        elif f"{axis}.range" in relayout_data:
+            x_range = relayout_data[f"{axis}.range"]
+        elif relayout_data.get(f"{axis}.autorange"):
+            windows[str(chrom)] = state["initial"][str(chrom)]
+            continue
+        else:
+            continue
+        if plan.ts_data:
+            x_range = cumdelting_interp(x_range, plan.ts_data, chrom, inverse=True)
+        windows[str(chrom)] = (int(np.floor(x_range[0])), int(np.ceil(x_range[1])))
+
+    if windows == state["windows"]:
+        return None
+
+    # keep the figure if some window has no intervals, not to remove its subplot
+    new_plan = browse_layout(windows)
+    if new_plan is None or len(new_plan.chrmd_df_grouped) != len(plan.chrmd_df_grouped):
+        return None
+    state["plan"], state["windows"] = new_plan, windows
+
+    # the app already shows the windows as selected, unless shrinking moves them
+    fig = plot_plan(new_plan)
+    for i, chrom in enumerate(new_plan.chrmd_df_grouped.index):
+        x_range = windows[str(chrom)]
+        if not new_plan.ts_data:
+            fig.update_xaxes(range=None, row=i + 1, col=1)
+            continue
+        if None in x_range:
+            continue
+        x_range = cumdelting_interp(x_range, new_plan.ts_data, chrom)
+        fig.update_xaxes(range=list(x_range), row=i + 1, col=1)
+
+    return fig
 
 
 def gby_plot_exons(
@@ -166,7 +323,6 @@ def gby_plot_exons(
     chrmd_df_grouped,
     genesmd_df,
     ts_data,
-    showinfo,
     legend,
     transcript_str,
     text,
@@ -175,11 +331,6 @@ def gby_plot_exons(
     exon_border,
     transcript_utr_width,
     plot_background,
-    arrow_line_width,
-    arrow_color,
-    arrow_size_min,
-    arrow_size,
-    arrow_intron_threshold,
 ):
     """Plot elements corresponding to the df rows of one gene."""
 
@@ -203,17 +354,8 @@ def gby_plot_exons(
 
     chrom_ix = chrmd_df_grouped.loc[chrom]["chrom_ix"]
 
-    if STRAND_COL in df.columns:
-        strand = df[STRAND_COL].unique()[0]
-    else:
-        strand = ""
-
-    # Get the gene information to print on hover
-    # default
-    if strand:
-        geneinfo = f"[{strand}] ({min(df.__oriStart__)}, {max(df.__oriEnd__)})<br>ID: {genename}"  # default with strand
-    else:
-        geneinfo = f"({min(df.__oriStart__)}, {max(df.__oriEnd__)})<br>ID: {genename}"  # default without strand
+    # Get the gene information to print on hover, made for all genes at once
+    geneinfo = df[GENE_INFO_COL].iloc[0]
 
     # add annotation for introns to plot
     x0, x1 = min(df[START_COL]), max(df[END_COL])
@@ -242,27 +384,13 @@ def gby_plot_exons(
     else:
         ts_chrom = pd.DataFrame()
 
-    if isinstance(arrow_intron_threshold, int):
-        arrow_intron_threshold = coord2percent(
-            fig, chrom_ix + 1, 0, arrow_intron_threshold
-        )
-    if isinstance(arrow_size, int):
-        arrow_size = coord2percent(fig, chrom_ix + 1, 0, arrow_size)
-
-    dir_flag = plot_introns(
+    plot_introns(
         sorted_exons,
         ts_chrom,
         fig,
         gene_ix,
         exon_border,
         chrom_ix,
-        strand,
-        genename,
-        arrow_intron_threshold,
-        exon_height,
-        arrow_color,
-        arrow_line_width,
-        arrow_size,
     )
 
     # Plot the gene rows
@@ -272,19 +400,12 @@ def gby_plot_exons(
         text_size,
         df,
         fig,
-        strand,
-        genename,
         gene_ix,
         exon_border,  # this works as "exon_color" used for utr (not interval)
         exon_border,
         chrom_ix,
         geneinfo,
-        showinfo,
         exon_height,
         transcript_utr_width,
         legend,
-        arrow_size_min,
-        arrow_color,
-        arrow_line_width,
-        dir_flag,
     )
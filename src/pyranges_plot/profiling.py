@@ -0,0 +1,105 @@
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger("pyranges_plot")
+
+# profile of the plot being made, None if not profiling
+active_profile = None
+
+# columns of every stage, the rest are counts of some stages
+STAGE_COLUMNS = ["stage", "time", "peak_memory"]
+
+
+class PlotProfile:
+    """Wall time, peak memory and counts of each stage of a plot, in the order they were run."""
+
+    def __init__(self):
+        # dicts of stage, seconds, peak bytes allocated over the ones at the stage start and counts
+        self.stages = []
+
+    def add(self, record):
+        """Add the record of a stage."""
+
+        self.stages.append(record)
+
+    def to_frame(self):
+        """Provide the stages as a DataFrame, with missing counts as NA."""
+
+        df = pd.DataFrame(self.stages)
+        counts = [col for col in df.columns if col not in STAGE_COLUMNS]
+        df[counts] = df[counts].convert_dtypes()
+        return df
+
+    @property
+    def total_time(self):
+        """Seconds spent in all stages."""
+
+        return sum(record["time"] for record in self.stages)
+
+    def log(self, level=logging.INFO):
+        """Emit one message per stage to the pyranges_plot logger."""
+
+        for record in self.stages:
+            counts = "".join(
+                f", {key}={value}"
+                for key, value in record.items()
+                if key not in STAGE_COLUMNS
+            )
+            logger.log(
+                level,
+                "plot stage %s: %.3f s, peak memory %.1f MB%s",
+                record["stage"],
+                record["time"],
+                record["peak_memory"] / 2**20,
+                counts,
+            )
+
+    def __repr__(self):
+        return repr(self.to_frame())
+
+
+@contextmanager
+def profiling():
+    """Make a profile of the stages run inside, tracing memory if not traced already."""
+
+    global active_profile
+    profile = PlotProfile()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    active_profile = profile
+    try:
+        yield profile
+    finally:
+        active_profile = None
+        if started:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name):
+    """Record the stage run inside in the active profile, yielding a dict to store its counts."""
+
+    counts = {}
+    if active_profile is None:
+        yield counts
+        return
+
+    tracemalloc.reset_peak()
+    memory = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        active_profile.add(
+            {
+                "stage": name,
+                "time": time.perf_counter() - start,
+                "peak_memory": tracemalloc.get_traced_memory()[1] - memory,
+                **counts,
+            }
+        )
@@ -0,0 +1,244 @@
+import csv
+import os
+import re
+import string
+
+import pandas as pd
+import pyranges as pr
+from pyranges.core.names import CHROM_COL, END_COL, START_COL, STRAND_COL
+
+from .data_preparation import parse_region
+
+GFF_COLUMNS = [
+    CHROM_COL,
+    "Source",
+    "Feature",
+    START_COL,
+    END_COL,
+    "Score",
+    STRAND_COL,
+    "Frame",
+    "Attribute",
+]
+BED_COLUMNS = [
+    CHROM_COL,
+    START_COL,
+    END_COL,
+    "Name",
+    "Score",
+    STRAND_COL,
+    "ThickStart",
+    "ThickEnd",
+    "ItemRGB",
+    "BlockCount",
+    "BlockSizes",
+    "BlockStarts",
+]
+
+# columns read when available, besides the requested ones
+PLOT_COLUMNS = [CHROM_COL, START_COL, END_COL, STRAND_COL, "Feature"]
+
+# value of an attribute, given its key
+GTF_ATTRIBUTE = r'(?:^|;)\s*{key}\s+"?([^";]*)'
+GFF_ATTRIBUTE = r"(?:^|;)\s*{key}=([^;]*)"
+
+
+def is_file(data):
+    """Whether the data is given as the path to an annotation file."""
+
+    return isinstance(data, (str, os.PathLike))
+
+
+def file_format(path):
+    """Provide the format of the annotation file from its extension."""
+
+    name = os.fspath(path).lower().removesuffix(".gz")
+    for ext, fmt in [
+        (".gtf", "gtf"),
+        (".gff", "gff"),
+        (".gff3", "gff"),
+        (".bed", "bed"),
+    ]:
+        if name.endswith(ext):
+            return fmt
+    raise ValueError(
+        "The annotation file should have either '.gtf', '.gff', '.gff3' or '.bed' extension, optionally followed by '.gz'."
+    )
+
+
+def template_columns(*templates):
+    """Provide the data columns referenced in '{column}' templates such as tooltip or text."""
+
+    columns = []
+    for template in templates:
+        if not isinstance(template, str):
+            continue
+        for _, field, _, _ in string.Formatter().parse(template):
+            if field:
+                columns.append(re.match(r"\w*", field).group())
+
+    return columns
+
+
+def attribute_values(attributes, pattern):
+    """Provide the value of an attribute in each attributes string, None if missing."""
+
+    # not str.extract, which leaves garbage until the next collection
+    values = [
+        match.group(1) if (match := pattern.search(line)) else None
+        for line in attributes.fillna("")
+    ]
+    return pd.Series(values, index=attributes.index, dtype=object)
+
+
+def read_annotation(
+    path,
+    *,
+    columns=None,
+    region=None,
+    id_col=None,
+    ids=None,
+    features=None,
+    chunksize=100000,
+):
+    """
+    Read the intervals of an annotation file needed for a plot, scanning it in chunks.
+
+    Only the rows matching the region, ids and features are kept, and only the plotted columns are parsed, so
+    memory use depends on the rows kept rather than on the file size.
+
+    Parameters
+    ----------
+    path: str
+        GTF, GFF3 or BED file, optionally gzipped.
+
+    columns: list, default None
+        Columns to read besides Chromosome, Start, End, Strand, Feature and id_col. For GTF and GFF3 files they
+        can be attributes, like 'gene_name'.
+
+    region: {None, str, dict}, default None
+        Genomic window to read as accepted by plot.
+
+    id_col: str, default None
+        Name of the column containing gene ID.
+
+    ids: list, default None
+        Values of id_col to read.
+
+    features: list, default None
+        Values of the Feature column to read, like ['exon', 'CDS']. Not available for BED files.
+
+    chunksize: int, default 100000
+        Number of lines scanned at a time.
+
+    Returns
+    -------
+    pyranges.PyRanges
+        Intervals with 0-based starts, the requested columns missing in the file are not included.
+
+    Examples
+    --------
+    >>> import pyranges_plot as prp
+
+    >>> p = prp.read_annotation("genes.gtf.gz", id_col="transcript_id", ids=["ENST00000456328"], features=["exon", "CDS"])
+
+    >>> prp.plot(p, id_col="transcript_id")
+
+    >>> prp.plot("genes.gtf.gz", id_col="transcript_id", region="17:7661779-7687538", tooltip="{gene_name}")
+    """
+
+    fmt = file_format(path)
+    names = BED_COLUMNS if fmt == "bed" else GFF_COLUMNS
+    if features is not None and fmt == "bed":
+        raise ValueError("BED files have no Feature column to select features from.")
+
+    # Split requested columns in file columns and attributes
+    if isinstance(id_col, list):
+        requested_ids = id_col
+        id_col = id_col[0] if len(id_col) == 1 else None
+    else:
+        requested_ids = [id_col]
+    if ids is not None and id_col is None:
+        raise ValueError("Selecting ids requires a single id_col.")
+    requested = list(dict.fromkeys(PLOT_COLUMNS + requested_ids + list(columns or [])))
+    requested = [col for col in requested if col is not None]
+    file_cols = [col for col in names if col in requested and col != "Attribute"]
+    attributes = [col for col in requested if col not in names and fmt != "bed"]
+    attribute_pattern = GTF_ATTRIBUTE if fmt == "gtf" else GFF_ATTRIBUTE
+    patterns = {
+        col: re.compile(attribute_pattern.format(key=re.escape(col)))
+        for col in attributes
+    }
+    usecols = file_cols + ["Attribute"] * bool(attributes)
+
+    if region is not None:
+        region = parse_region(region)
+    if ids is not None:
+        ids = pd.Index(ids).astype(str)
+
+    # Scan file keeping the matching rows
+    reader = pd.read_csv(
+        path,
+        sep="\t",
+        header=None,
+        names=names,
+        usecols=None if fmt == "bed" else usecols,  # bed lines may lack columns
+        dtype=str,
+        quoting=csv.QUOTE_NONE,
+        chunksize=chunksize,
+    )
+    dfs = []
+    for chunk in reader:
+        chunk = chunk[usecols]
+
+        # drop headers, comments and other non interval lines
+        starts = pd.to_numeric(chunk[START_COL], errors="coerce")
+        ends = pd.to_numeric(chunk[END_COL], errors="coerce")
+        keep = (
+            starts.notna()
+            & ends.notna()
+            & ~chunk[CHROM_COL].fillna("#").str.startswith("#")
+        )
+        chunk = chunk[keep].assign(
+            **{
+                START_COL: starts[keep].astype("int64"),
+                END_COL: ends[keep].astype("int64"),
+            }
+        )
+        if fmt != "bed":
+            chunk[START_COL] -= 1  # 1-based to 0-based
+
+        if region is not None:
+            keep = pd.Series(False, index=chunk.index)
+            for chrom, (start, end) in region.items():
+                in_region = chunk[CHROM_COL] == chrom
+                if start is not None:
+                    in_region &= chunk[END_COL] > start
+                if end is not None:
+                    in_region &= chunk[START_COL] < end
+                keep |= in_region
+            chunk = chunk[keep]
+
+        if features is not None:
+            chunk = chunk[chunk["Feature"].isin(features)]
+
+        # parse attributes of the rows kept, id first to select ids
+        for col in sorted(attributes, key=lambda col: col != id_col):
+            chunk = chunk.assign(
+                **{col: attribute_values(chunk["Attribute"], patterns[col])}
+            )
+            if col == id_col and ids is not None:
+                chunk = chunk[chunk[col].isin(ids)]
+        if ids is not None and id_col not in attributes:
+            chunk = chunk[chunk[id_col].isin(ids)]
+
+        dfs.append(chunk.drop(columns="Attribute", errors="ignore"))
+
+    df = pd.concat(dfs, ignore_index=True)
+    df = df[[col for col in requested if col in df.columns]]
+
+    # columns not in the file
+    if not df.empty:
+        df = df.dropna(axis=1, how="all")
+
+    return pr.PyRanges(df)
@@ -1,5 +1,48 @@
+import subprocess
+import sys
+import time
+
+import pandas as pd
 import pyranges as pr
-from pyranges_plot.data_preparation import make_subset
+import pytest
+
+from pyranges_plot import data_preparation
+from pyranges_plot.core import (
+    cumdelting,
+    cumdelting_interp,
+    get_warnings,
+    set_engine,
+    set_warnings,
+)
+from pyranges_plot.data_preparation import (
+    clear_layout_cache,
+    clear_region_index,
+    genesmd_packed,
+    get_colormap_colors,
+    get_layout_cache_info,
+    make_subset,
+    parse_region,
+    region_subset,
+    subdf_assigncolor,
+    subdf_detail,
+)
+from pyranges_plot.geometry import (
+    get_arrows,
+    get_genes_info,
+    get_intron_lines,
+    get_introns,
+    get_items,
+    get_rects,
+    get_rows,
+    get_texts,
+    get_texts_by_row,
+)
+from pyranges_plot.introns_off import introns_resize
+from pyranges_plot.matplotlib_base import core as plt_core
+from pyranges_plot.plot_main import plot, prepare_layout
+from pyranges_plot.plot_many import plot_many
+from pyranges_plot.plotly_base.export import get_image_exporter
+from pyranges_plot.read_files import read_annotation
 
 
 def test_subset():
@@ -127,3 +170,776 @@ def test_subset():
     )
 
     assert len(result_subset_5) == len(expected_subset_5)
+
+    # Data has several id columns and ids out of order
+    df_6 = pr.PyRanges(
+        {
+            "Chromosme": [1, 1, 1, 1, 1],
+            "Start": [i for i in range(5)],
+            "End": [i + 10 for i in range(5)],
+            "gene_id": ["G2", "G1", "G1", "G2", "G1"],
+            "transcript_id": ["T1", "T2", "T1", "T1", "T2"],
+        }
+    )
+
+    result_subset_6, tot_ngenes_6 = make_subset(df_6, ["gene_id", "transcript_id"], 2)
+
+    assert list(result_subset_6["Start"]) == [1, 2, 4]
+    assert tot_ngenes_6 == 2
+    assert list(df_6.columns) == [
+        "Chromosme",
+        "Start",
+        "End",
+        "gene_id",
+        "transcript_id",
+    ]
+
+    # Rows with missing id are kept
+    df_7 = pr.PyRanges(
+        {
+            "Chromosome": [1, 1, 1, 1, 1],
+            "Start": [i for i in range(5)],
+            "End": [i + 10 for i in range(5)],
+            "transcript_id": ["T2", None, "T1", "T3", None],
+        }
+    )
+
+    result_subset_7, tot_ngenes_7 = make_subset(df_7, "transcript_id", 2)
+
+    assert list(result_subset_7["Start"]) == [0, 1, 2, 4]
+    assert tot_ngenes_7 == 2
+
+
+def test_genesmd_packed():
+    genesmd_df = pd.DataFrame(
+        {
+            "chrix": [0, 0, 0, 0, 0, 1, 1],
+            "__pr_ix__": [0, 0, 0, 0, 1, 0, 0],
+            "Start": [10, 15, 25, 40, 12, 5, 8],
+            "End": [30, 25, 40, 50, 18, 9, 20],
+        },
+        index=["T1", "T2", "T3", "T4", "T5", "T6", "T7"],
+    )
+
+    result = genesmd_packed(genesmd_df)
+
+    # touching genes share row, overlapping ones go to the lowest free row
+    assert list(result["ycoord"]) == [0, 1, 1, 0, 0, 0, 1]
+
+    # genes placed in data order, not start order, filling gaps between genes
+    genesmd_df = pd.DataFrame(
+        {
+            "chrix": [0, 0, 0, 0],
+            "__pr_ix__": [0, 0, 0, 0],
+            "Start": [50, 0, 10, 40],
+            "End": [60, 100, 40, 50],
+        },
+        index=["T1", "T2", "T3", "T4"],
+    )
+
+    result = genesmd_packed(genesmd_df)
+    assert list(result["ycoord"]) == [0, 1, 0, 0]
+
+
+def test_cumdelting():
+    # two shrinked regions of 100 and 50 positions reduced to 10
+    ts_data = {
+        "1": pd.DataFrame(
+            {
+                "Chromosome": ["1", "1"],
+                "Start": [100, 300],
+                "End": [200, 350],
+                "__Start_adj__": [100, 210],
+                "__End_adj__": [110, 220],
+                "__cumdelta__": [90, 130],
+            }
+        ),
+        "2": pd.DataFrame(
+            columns=["Chromosome", "Start", "End", "__cumdelta__", "__End_adj__"]
+        ),
+    }
+
+    result = cumdelting([50, 150, 200, 250, 400], ts_data, "1")
+    assert list(result) == [50, 150, 110, 160, 270]
+
+    result = cumdelting([50, 110, 160, 270], ts_data, "1", inverse=True)
+    assert list(result) == [50, 200, 250, 400]
+
+    # nothing shrinked in chromosome
+    assert list(cumdelting([5, 10], ts_data, "2")) == [5, 10]
+
+    # coordinates within shrinked regions are interpolated
+    result = cumdelting_interp([50, 150, 250, 325, 400], ts_data, "1")
+    assert list(result) == [50, 105, 160, 215, 270]
+    result = cumdelting_interp([105, 215, 270], ts_data, "1", inverse=True)
+    assert list(result) == [150, 325, 400]
+
+
+def test_introns_resize():
+    df = pd.DataFrame(
+        {
+            "Chromosome": ["1", "1", "1", "1", "2", "2"],
+            "Start": [0, 50, 60, 500, 1000, 1005],
+            "End": [10, 100, 80, 550, 1010, 1020],
+            "__shrink_threshold__": [20, 20, 20, 20, 20, 20],
+        }
+    )
+    ts_data = {}
+
+    result = introns_resize(df, ts_data)
+
+    # gaps (10, 50) and (100, 500) shrinked to 20 positions
+    assert list(ts_data["1"]["Start"]) == [10, 100]
+    assert list(ts_data["1"]["End"]) == [50, 500]
+    assert list(ts_data["1"]["__cumdelta__"]) == [20, 400]
+    assert list(ts_data["1"]["__Start_adj__"]) == [10, 80]
+    assert list(ts_data["1"]["__End_adj__"]) == [30, 100]
+    assert ts_data["2"].empty
+
+    assert list(result["__Start_adj__"]) == [0, 30, 40, 100, 1000, 1005]
+    assert list(result["__End_adj__"]) == [10, 80, 60, 150, 1010, 1020]
+
+
+def test_get_intron_lines():
+    items = pd.DataFrame(
+        {
+            "Start": [0, 30, 100, 200, 260],
+            "End": [10, 60, 120, 250, 300],
+            "gene": [0, 0, 0, 1, 1],
+            "chrom_ix": [0, 0, 0, 0, 0],
+        }
+    )
+    ts_data = {
+        "1": pd.DataFrame({"__Start_adj__": [15, 70], "__End_adj__": [20, 100]}),
+    }
+    chrmd_df_grouped = pd.DataFrame({"chrom_ix": [0]}, index=["1"])
+
+    introns = get_introns(items)
+    assert list(zip(introns["start"], introns["stop"])) == [
+        (10, 30),
+        (60, 100),
+        (250, 260),
+    ]
+
+    lines = get_intron_lines(introns, ts_data, chrmd_df_grouped)
+    fixed = lines[~lines["dashed"]]
+    dashed = lines[lines["dashed"]]
+
+    # intron (60, 100) ends with a shrinked region, so no empty fixed line after it
+    assert list(zip(fixed["x0"], fixed["x1"])) == [
+        (10, 15),
+        (20, 30),
+        (60, 70),
+        (250, 260),
+    ]
+    assert list(zip(dashed["x0"], dashed["x1"])) == [(15, 20), (70, 100)]
+
+
+def test_get_arrows():
+    rows = pd.DataFrame(
+        {
+            "Start": [0, 100, 200, 260],
+            "End": [40, 120, 250, 300],
+            "gene": [0, 0, 1, 1],
+            "chrom_ix": [0, 0, 0, 0],
+            "strand": ["+", "+", "-", "-"],
+            "gene_ix": [0.5, 0.5, 1.5, 1.5],
+            "x_span": [330.0] * 4,
+            "height": [0.4] * 4,
+        }
+    )
+    introns = get_introns(rows)
+
+    # big intron of gene 0 gets the arrow, gene 1 falls back to its intervals
+    arrows = get_arrows(introns, rows, 0.4, 50, 10, 0.005)
+    assert list(arrows["intron"]) == [True, False, False]
+    assert list(arrows["x_tip"]) == [75.0, 223.75, 279.0]
+    assert list(arrows["x_end"]) == [65.0, 226.25, 281.0]
+    assert list(arrows["y_high"].round(2)) == [0.69, 1.69, 1.69]
+
+
+def test_region_subset():
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1", "2", "1", "1", "2", "1"],
+            "Start": [10, 10, 50, 100, 60, 30],
+            "End": [200, 20, 60, 150, 70, 40],
+            "transcript_id": ["T1", "T2", "T3", "T4", "T5", "T6"],
+        }
+    )
+
+    # 1-based strings, 0-based dicts
+    region = parse_region("1:46-100")
+    assert region == {"1": (45, 100)} == parse_region({1: (45, 100)})
+
+    # overlapping intervals in data order, not including touching ones
+    result = region_subset(df, region)
+    assert list(result["transcript_id"]) == ["T1", "T3"]
+
+    result = region_subset(df, parse_region({"2": (None, 65), "3": None}))
+    assert list(result["transcript_id"]) == ["T2", "T5"]
+
+    # index rebuilt after setting a coordinate column again
+    df["Chromosome"] = df["Chromosome"].replace({"2": "3"})
+    result = region_subset(df, parse_region({"2": None, "3": None}))
+    assert list(result["transcript_id"]) == ["T2", "T5"]
+
+    # or after clearing it, when values are changed in place
+    df.loc[0, "Start"] = 55
+    clear_region_index(df)
+    result = region_subset(df, parse_region({"1": (45, 52)}))
+    assert list(result["transcript_id"]) == ["T3"]
+
+
+def test_prepare_layout():
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1", "1", "1", "1"],
+            "Strand": ["+", "+", "-", "-"],
+            "Start": [10, 1000, 50, 2000],
+            "End": [20, 1010, 60, 2010],
+            "transcript_id": ["T1", "T1", "T2", "T2"],
+        }
+    )
+
+    plan = prepare_layout(df, id_col="transcript_id", shrink=True, exon_height=0.4)
+    assert plan.id_col == ["transcript_id"]
+    assert plan.layout_feat["exon_height"] == 0.4
+    assert list(plan.genesmd_df.index) == ["T1", "T2"]
+    assert not plan.ts_data["1"].empty
+    assert plan.tick_pos_d["1"] and plan.ori_tick_pos_d["1"]
+
+    # only the plotted and given columns are kept
+    df["gene_name"] = ["A", "A", "B", "B"]
+    df["extra"] = 0
+    plan = prepare_layout(df, id_col="transcript_id", columns=["gene_name"])
+    assert "gene_name" in plan.subdf.columns and "extra" not in plan.subdf.columns
+    assert plan.subdf["Chromosome"].dtype == "category"
+    assert plan.subdf["Start"].dtype == "int32" and plan.subdf["End"].dtype == "int32"
+
+    # coordinates not fitting in int32 are kept
+    df["End"] = [20, 1010, 60, 2**32]
+    plan = prepare_layout(df, id_col="transcript_id")
+    assert plan.subdf["Start"].dtype == "int32" and plan.subdf["End"].dtype == "int64"
+
+
+def test_subdf_assigncolor(monkeypatch):
+    df = pd.DataFrame({"gene_id": ["G2", "G1", "G2", "G3"], "n": [1, 1, 1, 2]})
+
+    # colors iterate over the list by order of appearance
+    result = subdf_assigncolor(df.copy(), ["red", "blue"], ["gene_id"], None)
+    assert list(result["__color_col__"]) == ["red", "blue", "red", "red"]
+
+    # tags of several columns, missing ones are black
+    colormap = {"('G2', 1)": "red", "('G1', 1)": "blue"}
+    result = subdf_assigncolor(df.copy(), colormap, ["gene_id", "n"], None)
+    assert list(result["__color_tag__"])[-1] == "('G3', 2)"
+    assert list(result["__color_col__"]) == ["red", "blue", "red", "black"]
+
+    # colormap names resolved once to hex colors
+    colors = get_colormap_colors("Dark2", 3)
+    assert colors[0] == "#1b9e77" and get_colormap_colors("Dark2", 3) is colors
+    result = subdf_assigncolor(df.copy(), "Blues", ["gene_id"], None)
+    assert result["__color_col__"].iloc[0] == "#f7fbff"
+
+    # plt colormaps first, continuous ones sampled across the map
+    assert get_colormap_colors("Blues", 3) == ("#f7fbff", "#6aaed6", "#08306b")
+    assert get_colormap_colors("Blues", 1) == ("#f7fbff",)
+
+    # plotly names do not need matplotlib
+    monkeypatch.setitem(sys.modules, "matplotlib", None)
+    monkeypatch.setattr(data_preparation, "colormap_registry", {})
+    assert get_colormap_colors("Alphabet", 3)[0] == "#AA0DFE"
+
+
+def test_get_texts_by_row():
+    df = pd.DataFrame(
+        {
+            "Strand": ["+", "+", "-"],
+            "gene_id": ["G1", "G1", "G2"],
+            "__pr_ix__": [0, 0, 0],
+            "__oriStart__": [10, 50, 5],
+            "__oriEnd__": [20, 60, 8],
+            "__id_col_2count__": ["G1", "G1", "G2"],
+            "score": [1.5, 2.25, 3],
+        }
+    )
+
+    result = get_texts_by_row(df, ["gene_id"], "{score:.1f}", "{gene_id}!", "<br>")
+    assert list(result["__row_info__"]) == [
+        "[+] (10, 20)<br>ID: G1<br>1.5",
+        "[+] (50, 60)<br>ID: G1<br>2.2",
+        "[-] (5, 8)<br>ID: G2<br>3.0",
+    ]
+    assert result["__gene_info__"].iloc[1] == "[+] (10, 60)<br>ID: G1"
+    assert list(result["__text__"]) == ["G1!", "G1!", "G2!"]
+
+    # no strand and default text
+    result = get_texts_by_row(df.drop(columns="Strand"), ["gene_id"], None, True, "\n")
+    assert list(result["__row_info__"]) == [
+        "(10, 20)\nID: G1",
+        "(50, 60)\nID: G1",
+        "(5, 8)\nID: G2",
+    ]
+    assert list(result["__text__"]) == ["G1", "G1", "G2"]
+
+
+def test_texts_batched_as_by_row():
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1"] * 4,
+            "Start": [10, 50, 5, 30],
+            "End": [20, 60, 8, 40],
+            "Strand": ["+", "+", "-", "-"],
+            "transcript_id": ["T1", "T1", "T2", "T2"],
+            "score": [1.5, 2.25, 3, 4],
+        }
+    )
+    plan = prepare_layout(df, id_col="transcript_id")
+    id_col = ["transcript_id"]
+    by_row = get_texts_by_row(
+        plan.subdf, id_col, "{score:.1f}", "{transcript_id}!", "\n"
+    )
+
+    # the batched path gives the same strings for the same intervals
+    items = get_items(plan.subdf, plan.genesmd_df, plan.chrmd_df_grouped, id_col, None)
+    rows, utrs = get_rows(items, None, 0.6, 0.3)
+    rects = get_rects(rows, utrs, 0.3, "{score:.1f}", "\n")
+    assert list(rects["info"]) == list(by_row["__row_info__"])
+    genes_info = get_genes_info(items, "gene", items["strand"], "\n")
+    assert list(genes_info) == list(by_row["__gene_info__"])
+    texts = get_texts(rows, utrs, "{transcript_id}!")
+    assert list(texts["text"]) == list(by_row["__text__"].drop_duplicates())
+
+
+def test_chromosome_limits():
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1", "1", "2"],
+            "Start": [10, 5000, 30],
+            "End": [20, 5010, 40],
+            "transcript_id": ["T1", "T1", "T2"],
+        }
+    )
+    limits_pr = pr.PyRanges(
+        {"Chromosome": ["1", "1"], "Start": [5, 0], "End": [50, 100]}
+    )
+
+    for limits, expected in [
+        (None, [[10, 5010], [30, 40]]),
+        ((None, 300), [[10, 300], [30, 300]]),
+        ({"1": (None, 300), "2": None}, [[10, 300], [30, 40]]),
+        (limits_pr, [[0, 100], [30, 40]]),
+    ]:
+        plan = prepare_layout(df, id_col="transcript_id", limits=limits)
+        assert plan.chrmd_df_grouped["min_max"].tolist() == expected
+
+    # given upper limits are shrinked like the data
+    plan = prepare_layout(df, id_col="transcript_id", limits=(0, 6000), shrink=True)
+    upper = plan.chrmd_df_grouped.loc["1", "min_max"][1]
+    assert upper == cumdelting([6000], plan.ts_data, "1")[0] < 6000
+
+
+def test_layout_cache():
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1", "1", "2"],
+            "Start": [10, 50, 10],
+            "End": [20, 60, 20],
+            "transcript_id": ["T1", "T1", "T2"],
+        }
+    )
+    clear_layout_cache()
+
+    # disabled by default
+    prepare_layout(df, id_col="transcript_id")
+    assert get_layout_cache_info() == {"hits": 0, "misses": 0, "size": 0}
+
+    plan = prepare_layout(df, id_col="transcript_id", layout_cache_size=1)
+    hit = prepare_layout(df.copy(), id_col="transcript_id", layout_cache_size=1)
+    assert get_layout_cache_info() == {"hits": 1, "misses": 1, "size": 1}
+    assert hit.subdf.equals(plan.subdf) and hit.genesmd_df.equals(plan.genesmd_df)
+
+    # plans given are copies, changing them does not change the cached one
+    hit.subdf.loc[:, "Start"] = 0
+    hit = prepare_layout(df, id_col="transcript_id", layout_cache_size=1)
+    assert hit.subdf.equals(plan.subdf)
+
+    # modified data or layout parameters are not hits, only the last one is kept
+    df.loc[0, "End"] = 30
+    prepare_layout(df, id_col="transcript_id", layout_cache_size=1)
+    prepare_layout(df, id_col="transcript_id", packed=False, layout_cache_size=1)
+    assert get_layout_cache_info() == {"hits": 2, "misses": 3, "size": 1}
+    clear_layout_cache()
+
+    # a hit only fingerprints the data, much cheaper than preparing the layout
+    n = 200000
+    big = pr.PyRanges(
+        {
+            "Chromosome": ["1", "2"] * (n // 2),
+            "Start": range(0, 10 * n, 10),
+            "End": range(5, 10 * n + 5, 10),
+            "transcript_id": [f"T{i // 3}" for i in range(n)],
+            "name": [f"name{i}" for i in range(n)],
+        }
+    )
+    times = []
+    for _ in range(2):
+        start = time.perf_counter()
+        prepare_layout(big, id_col="transcript_id", layout_cache_size=1)
+        times.append(time.perf_counter() - start)
+    assert get_layout_cache_info()["hits"] == 1
+    assert times[1] < times[0] / 2
+
+    # any changed label makes a different layout
+    other = big.copy()
+    other.loc[1, "name"] = "other"
+    prepare_layout(other, id_col="transcript_id", layout_cache_size=1)
+    assert get_layout_cache_info() == {"hits": 1, "misses": 2, "size": 1}
+    clear_layout_cache()
+
+
+def test_plot_plan_twice(tmp_path):
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1", "1", "1", "2"],
+            "Start": [10, 50, 70, 10],
+            "End": [20, 60, 90, 20],
+            "Strand": ["+", "+", "-", "-"],
+            "transcript_id": ["T1", "T1", "T2", "T3"],
+        }
+    )
+    plan = prepare_layout(df, id_col="transcript_id", shrink=True)
+    frames = [plan.subdf.copy(), plan.genesmd_df.copy(), plan.chrmd_df.copy()]
+
+    # rendering does not change the plan, so renders from it are the same
+    for engine in ["plt", "ply"]:
+        set_engine(engine)
+        plot(plan, to_file=str(tmp_path / f"{engine}_1.png"), tooltip="{Strand}")
+        plot(plan, to_file=str(tmp_path / f"{engine}_2.png"), tooltip="{Strand}")
+        first = (tmp_path / f"{engine}_1.png").read_bytes()
+        assert first == (tmp_path / f"{engine}_2.png").read_bytes()
+    set_engine("plt")
+    assert plan.subdf.equals(frames[0])
+    assert plan.genesmd_df.equals(frames[1])
+    assert plan.chrmd_df.equals(frames[2])
+
+
+def test_plot_batched(monkeypatch):
+    figs = []
+    monkeypatch.setattr(
+        get_image_exporter(), "write", lambda fig, to_file: figs.append(fig)
+    )
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1", "1", "1"],
+            "Start": [10, 50, 30],
+            "End": [20, 60, 40],
+            "Strand": ["+", "+", "-"],
+            "transcript_id": ["T1", "T1", "T2"],
+        }
+    )
+    set_engine("ply")
+    plot(df, id_col="transcript_id", batched=True, to_file="batched.png")
+    plot(df, id_col="transcript_id", webgl_threshold=2, to_file="webgl.png")
+    set_engine("plt")
+
+    def path(coords):
+        return [None if pd.isna(coord) else coord for coord in coords]
+
+    # one trace per style, WebGL when there are more intervals than the threshold
+    for fig, trace_type in zip(figs, ["scatter", "scattergl"]):
+        assert len(fig.data) == 7
+        assert {trace.type for trace in fig.data} == {trace_type}
+
+        # rectangles of a style in one path, separated by gaps
+        exons = {trace.name: trace for trace in fig.data if trace.fill == "toself"}
+        exon_x = [10, 20, 20, 10, 10, None, 50, 60, 60, 50, 50, None]
+        assert path(exons["T1"].x) == exon_x
+        assert path(exons["T1"].y) == [0.2, 0.2, 0.8, 0.8, 0.2, None] * 2
+        assert path(exons["T2"].x) == [30, 40, 40, 30, 30, None]
+        assert path(fig.data[1].x) == [20, 50, None]  # intron
+
+
+def test_browse_window(monkeypatch):
+    import dash
+
+    apps = []
+    monkeypatch.setattr(dash.Dash, "run", lambda app, **kargs: apps.append(app))
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1"] * 6,
+            "Start": [10, 30, 1000, 1030, 2000, 2050],
+            "End": [20, 40, 1010, 1040, 2010, 2060],
+            "Strand": ["+"] * 6,
+            "transcript_id": ["T1", "T1", "T2", "T2", "T3", "T3"],
+        }
+    )
+    set_engine("ply")
+    for shrink in [False, True]:
+        plot(
+            df,
+            id_col="transcript_id",
+            max_shown=1,
+            packed=False,
+            shrink=shrink,
+            browse=True,
+        )
+    set_engine("plt")
+
+    # zooming patches the traces of the genes in the window
+    for app, shrink in zip(apps, [False, True]):
+        update_window = app.callback_map["genes-plot.figure"]["callback"].__wrapped__
+        patch = update_window({"xaxis.range[0]": 900, "xaxis.range[1]": 1100})
+        operations = {
+            tuple(operation["location"]): operation["params"]["value"]
+            for operation in patch.to_plotly_json()["operations"]
+        }
+        names = {trace.get("name") for trace in operations[("data",)]}
+        assert "T2" in names and "T1" not in names
+
+        # the layout is kept, unless shrinking changes the axes
+        if shrink:
+            assert operations[("layout", "yaxis", "ticktext")] == ["T2"]
+            assert ("layout", "xaxis", "tickvals") in operations
+        else:
+            assert list(operations) == [("data",)]
+
+            # the same window is not plotted again
+            with pytest.raises(dash.exceptions.PreventUpdate):
+                update_window({"xaxis.range[0]": 900, "xaxis.range[1]": 1100})
+
+            # nor a window without intervals
+            with pytest.raises(dash.exceptions.PreventUpdate):
+                update_window({"xaxis.range[0]": 500, "xaxis.range[1]": 600})
+
+
+def test_subdf_detail():
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1", "1", "1", "1", "1"],
+            "Start": [0, 100, 900, 1000, 2000],
+            "End": [50, 200, 950, 5000, 9000],
+            "transcript_id": ["T1", "T1", "T1", "T2", "T2"],
+        }
+    )
+    plan = prepare_layout(df, id_col="transcript_id")
+    subdf = plan.subdf
+
+    # nothing changes with full detail
+    assert (
+        subdf_detail(subdf, plan.chrmd_df_grouped, ["transcript_id"], "full", 2, 1000)
+        is subdf
+    )
+
+    # one interval spanning each gene
+    result = subdf_detail(
+        subdf, plan.chrmd_df_grouped, ["transcript_id"], "genes", 2, 1000
+    )
+    assert list(zip(result["Start"], result["End"])) == [(0, 950), (1000, 9000)]
+
+    # 1000 px for ~10000 positions, T1 has ~32 px per interval and T2 ~400
+    result = subdf_detail(
+        subdf, plan.chrmd_df_grouped, ["transcript_id"], "auto", 50, 1000
+    )
+    assert list(zip(result["Start"], result["End"])) == [
+        (0, 950),
+        (1000, 5000),
+        (2000, 9000),
+    ]
+
+
+def test_plot_many(tmp_path, monkeypatch):
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1", "1", "2"],
+            "Start": [10, 50, 10],
+            "End": [20, 60, 20],
+            "transcript_id": ["T1", "T1", "T2"],
+        }
+    )
+    set_engine("plt")
+
+    stats = plot_many(df, ["1:0-100", "3"], tmp_path / "plots", id_col="transcript_id")
+    assert list(stats["file"]) == [
+        str(tmp_path / "plots" / "1_0-100.png"),
+        str(tmp_path / "plots" / "3.png"),
+    ]
+    assert (tmp_path / "plots" / "1_0-100.png").exists()
+
+    # regions without intervals are reported, not plotted
+    assert stats["error"].isna().tolist() == [True, False]
+
+    # no warning popups while plotting, the setting is kept afterwards
+    popups = []
+    monkeypatch.setattr(plt_core, "plt_popup_warning", popups.append)
+    set_warnings(True)
+    genes = df.assign(transcript_id=["T1", "T3", "T2"])
+    plot_many(
+        genes, ["1"], tmp_path / "plots", id_col="transcript_id", colormap=["red"]
+    )
+    assert popups == [] and get_warnings()
+
+    # plotly images are written while plotting next regions
+    set_engine("ply")
+    stats = plot_many(df, ["1:0-100", "2"], tmp_path / "ply", id_col="transcript_id")
+    assert stats["error"].isna().all()
+    assert stats["export_time"].notna().all()
+    assert (tmp_path / "ply" / "2.png").exists()
+
+    # workers started after exporting in this process write their own images
+    stats = plot_many(
+        df, ["1:0-100", "2"], tmp_path / "ply2", id_col="transcript_id", workers=2
+    )
+    assert stats["error"].isna().all()
+    assert (tmp_path / "ply2" / "2.png").exists()
+    set_engine("plt")
+
+
+def test_read_annotation(tmp_path):
+    gtf = tmp_path / "genes.gtf"
+    gtf.write_text(
+        "#!genome-build test\n"
+        '1\tt\texon\t11\t20\t.\t+\t.\tgene_id "G1"; transcript_id "T1"; gene_name "A";\n'
+        '1\tt\tCDS\t13\t18\t.\t+\t.\tgene_id "G1"; transcript_id "T1"; gene_name "A";\n'
+        '1\tt\texon\t101\t200\t.\t-\t.\tgene_id "G2"; transcript_id "T2";\n'
+        '2\tt\texon\t11\t20\t.\t+\t.\tgene_id "G3"; transcript_id "T3"; gene_name "C";\n'
+    )
+
+    p = read_annotation(gtf, id_col="transcript_id", columns=["gene_name"], chunksize=2)
+    assert list(p.columns) == [
+        "Chromosome",
+        "Start",
+        "End",
+        "Strand",
+        "Feature",
+        "transcript_id",
+        "gene_name",
+    ]
+    assert p["Start"].tolist() == [10, 12, 100, 10]  # 0-based
+    assert p["gene_name"].isna().tolist() == [False, False, True, False]
+
+    p = read_annotation(gtf, id_col="transcript_id", region="1:50-150")
+    assert p["transcript_id"].tolist() == ["T2"]
+    p = read_annotation(gtf, id_col="transcript_id", region="1:20-30")  # 1-based
+    assert p["transcript_id"].tolist() == ["T1"]
+
+    p = read_annotation(gtf, id_col="transcript_id", ids=["T1"], features=["exon"])
+    assert p["End"].tolist() == [20]
+
+    plan = prepare_layout(gtf, id_col="transcript_id", region="1")
+    assert set(plan.subdf["transcript_id"]) == {"T1", "T2"}
+
+    # plot scans the file keeping only the rows of the ids and features given
+    set_engine("plt")
+    profile = plot(
+        gtf,
+        id_col="transcript_id",
+        ids=["T1", "T3"],
+        features=["exon"],
+        to_file=str(tmp_path / "p.png"),
+        profile=True,
+    )
+    assert profile.to_frame().set_index("stage").loc["read", "rows"] == 2
+
+    # same selection of data in memory
+    p = read_annotation(gtf, id_col="transcript_id")
+    plan = prepare_layout(p, id_col="transcript_id", ids=["T1"], features=["CDS"])
+    assert plan.subdf["Start"].tolist() == [12]
+
+
+def test_plot_profile(tmp_path):
+    df = pr.PyRanges(
+        {
+            "Chromosome": ["1", "1", "2"],
+            "Start": [10, 50, 10],
+            "End": [20, 60, 20],
+            "transcript_id": ["T1", "T1", "T2"],
+        }
+    )
+    set_engine("plt")
+
+    profile = plot(
+        df, id_col="transcript_id", to_file=str(tmp_path / "p.png"), profile=True
+    )
+    stages = profile.to_frame().set_index("stage")
+    assert list(stages.index) == [
+        "subset",
+        "colors",
+        "genes_metadata",
+        "chromosome_metadata",
+        "arrange",
+        "detail",
+        "create_fig",
+        "draw",
+        "export",
+    ]
+    assert stages.loc["subset", "rows"] == 3
+    assert stages.loc["genes_metadata", "genes"] == 2
+    assert stages.loc["draw", "artists"] > 0
+    assert (stages["time"] >= 0).all()
+
+
+def test_lazy_imports():
+    # Engines and their libraries are not loaded by importing the package
+    code = (
+        "import sys, pyranges_plot; "
+        "print(*[m for m in ['matplotlib.pyplot', 'plotly.graph_objects', 'dash', 'tkinter'] "
+        "if m in sys.modules])"
+    )
+    loaded = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.split()
+    assert loaded == []
+
+
+def test_hover_index_find():
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.add_subplot()
+    ax.set_xlim(0, 100)
+    ax.set_ylim(0, 10)
+    hover = plt_core.HoverIndex(fig, "black")
+    hover.add(ax, [10, 15], [30, 20], [1, 1], [2, 2], ["A", "B"])
+    hover.add(ax, [40], [60], [5], [5], ["L"])
+
+    # overlapping items give the last added one
+    assert hover.find(ax, 17, 1.5) == "B"
+    assert hover.find(ax, 25, 1.5) == "A"
+
+    # points in a gap or in an axes without items
+    assert hover.find(ax, 35, 1.5) is None
+    assert hover.find(ax, 17, 3) is None
+    assert hover.find(fig.add_subplot(212), 17, 1.5) is None
+
+    # lines are found within a few pixels only
+    assert hover.find(ax, 50, 5.05) == "L"
+    assert hover.find(ax, 50, 6) is None
+
+    # adding after the index was built makes the new item findable
+    hover.add(ax, [45], [55], [4.9], [5.1], ["R"])
+    assert hover.find(ax, 50, 5) == "R"
+    assert hover.find(ax, 42, 5) == "L"
+
+
+def test_browse_windows_errors():
+    from pyranges_plot.plotly_base.plot_exons_ply import browse_windows
+
+    df = pr.PyRanges(
+        {"Chromosome": ["1"], "Start": [10], "End": [20], "transcript_id": ["T1"]}
+    )
+    plan = prepare_layout(df, id_col="transcript_id")
+    state = {"plan": plan, "windows": {"1": (None, None)}}
+    relayout_data = {"xaxis.range[0]": 500, "xaxis.range[1]": 600}
+
+    # a window without intervals keeps the figure
+    assert browse_windows(relayout_data, state, lambda windows: None, None) is None
+    assert state["plan"] is plan
+
+    # other errors are not hidden
+    def browse_layout(windows):
+        raise ValueError("broken layout")
+
+    with pytest.raises(ValueError, match="broken layout"):
+        browse_windows(relayout_data, state, browse_layout, None)